@@ -9,11 +9,16 @@ See Wikipedia article (https://en.wikipedia.org/wiki/A*_search_algorithm)
 
 """
 
+import heapq
 import math
+import time
+from array import array
 
 import matplotlib.pyplot as plt
+import numpy as np
 
-from generate_map import generate_map_from_json
+from distance_field import FIELD_EPS
+from generate_map import MAP_CACHE_DIR, generate_map_from_json
 
 show_animation = False
 
@@ -35,10 +40,56 @@ class AStarPlanner:
         self.min_x, self.min_y = 0, 0
         self.max_x, self.max_y = 0, 0
         self.obstacle_map = None
+        self.free_map = None
         self.x_width, self.y_width = 0, 0
         self.motion = self.get_motion_model()
+        self.n_expanded = 0  # nodes expanded by the last planning call
+        self.planning_time = 0.0  # wall-clock time of the last call [s]
         self.calc_obstacle_map(ox, oy)
 
+    @classmethod
+    def from_grid(cls, grid, resolution, rr, distance_field=None, window=None):
+        """
+        Build a planner from a generate_map grid (1 = wall)
+
+        grid: 2-D array, OccupancyGrid or TiledMap indexed [row, col]; a
+              wall cell (i, j) becomes the obstacle point x = j, y = i
+        resolution: grid resolution [m]
+        rr: robot radius[m]
+        distance_field: optional distance-to-nearest-wall field of the grid
+              (see distance_field.py); with resolution 1 the obstacle map
+              is read from it instead of inflating every obstacle
+        window: optional (row0, row1, col0, col1); only that part of the
+              grid is read (for a TiledMap only the tiles it covers), so
+              the obstacle map stays small on maps larger than memory.
+              Coordinates stay those of the whole grid; paths cannot
+              leave the bounding box of the walls inside the window.
+
+        The planner's bounds come from the walls, so a grid (or window)
+        without any wall cell raises ValueError.
+        """
+        row0, row1, col0, col1 = window if window is not None else (0, None, 0, None)
+        if distance_field is not None and resolution == 1:
+            walls = np.asarray(distance_field[row0:row1, col0:col1]) == 0
+            rows = np.nonzero(walls.any(axis=1))[0] + row0
+            cols = np.nonzero(walls.any(axis=0))[0] + col0
+            if len(rows) == 0:
+                raise ValueError("from_grid: no wall cells in the grid/window")
+            # only the corners of the wall bounding box: they fix the bounds
+            planner = cls([cols[0], cols[-1]], [rows[0], rows[-1]], resolution, rr)
+            planner.calc_obstacle_map_from_field(distance_field)
+            return planner
+        if window is not None:
+            oy, ox = np.nonzero(np.asarray(grid[row0:row1, col0:col1]) == 1)
+            ox, oy = ox + col0, oy + row0
+        elif hasattr(grid, "obstacle_points"):
+            ox, oy = grid.obstacle_points()  # no dense copy of the whole grid
+        else:
+            oy, ox = np.nonzero(np.asarray(grid) == 1)
+        if len(ox) == 0:
+            raise ValueError("from_grid: no wall cells in the grid/window")
+        return cls(ox, oy, resolution, rr)
+
     class Node:
         def __init__(self, x, y, cost, parent_index):
             self.x = x  # index of grid
@@ -54,6 +105,12 @@ class AStarPlanner:
         """
         A star path search
 
+        The open set is a binary heap with lazy deletion; g-costs, parent
+        indices and the closed flags live in flat buffers indexed like
+        calc_grid_index, so no Node is allocated per expansion. Ties are
+        broken by discovery order, which gives the same path as
+        planning_legacy.
+
         input:
             s_x: start x position [m]
             s_y: start y position [m]
@@ -65,6 +122,119 @@ class AStarPlanner:
             ry: y position list of the final path
         """
 
+        t0 = time.perf_counter()
+        start_x = self.calc_xy_index(sx, self.min_x)
+        start_y = self.calc_xy_index(sy, self.min_y)
+        goal_x = self.calc_xy_index(gx, self.min_x)
+        goal_y = self.calc_xy_index(gy, self.min_y)
+
+        x_width, y_width = self.x_width, self.y_width
+        n_cells = x_width * y_width
+        free_map = self.free_map
+        motion = [(int(dx), int(dy), cost) for dx, dy, cost in self.motion]
+        hypot = math.hypot
+
+        cost = array("d", [math.inf]) * n_cells
+        parent = array("l", [-1]) * n_cells
+        order = array("l", [0]) * n_cells
+        closed = bytearray(n_cells)
+
+        start_id = start_y * x_width + start_x
+        cost[start_id] = 0.0
+        open_heap = [(hypot(goal_x - start_x, goal_y - start_y), 0, 0.0,
+                      start_id)]
+        n_discovered = 1
+        n_closed = 0
+        goal_parent = -1
+
+        while True:
+            if not open_heap:
+                print("Open set is empty..")
+                break
+
+            _, _, c_cost, c_id = heapq.heappop(open_heap)
+            if closed[c_id] or c_cost != cost[c_id]:
+                continue  # stale heap entry
+            cx, cy = c_id % x_width, c_id // x_width
+
+            # show graph
+            if show_animation:  # pragma: no cover
+                plt.plot(self.calc_grid_position(cx, self.min_x),
+                         self.calc_grid_position(cy, self.min_y), "xc")
+                # for stopping simulation with the esc key.
+                plt.gcf().canvas.mpl_connect('key_release_event',
+                                             lambda event: [exit(
+                                                 0) if event.key == 'escape' else None])
+                if n_closed % 10 == 0:
+                    plt.pause(0.001)
+
+            if cx == goal_x and cy == goal_y:
+                print("Find goal")
+                goal_parent = parent[c_id]
+                break
+
+            closed[c_id] = 1
+            n_closed += 1
+
+            # expand_grid search grid based on motion model
+            for dx, dy, move_cost in motion:
+                nx, ny = cx + dx, cy + dy
+                if not (0 <= nx < x_width and 0 <= ny < y_width):
+                    continue
+                n_id = ny * x_width + nx
+
+                # If the node is not safe or already closed, do nothing
+                if not free_map[n_id] or closed[n_id]:
+                    continue
+
+                n_cost = c_cost + move_cost
+                old_cost = cost[n_id]
+                if old_cost == math.inf:
+                    # discovered a new node
+                    order[n_id] = n_discovered
+                    n_discovered += 1
+                elif old_cost <= n_cost:
+                    continue
+                # This path is the best until now. record it
+                cost[n_id] = n_cost
+                parent[n_id] = c_id
+                heapq.heappush(open_heap, (
+                    n_cost + hypot(goal_x - nx, goal_y - ny),
+                    order[n_id], n_cost, n_id))
+
+        rx, ry = [self.calc_grid_position(goal_x, self.min_x)], [
+            self.calc_grid_position(goal_y, self.min_y)]
+        parent_index = goal_parent
+        while parent_index != -1:
+            rx.append(self.calc_grid_position(parent_index % x_width,
+                                              self.min_x))
+            ry.append(self.calc_grid_position(parent_index // x_width,
+                                              self.min_y))
+            parent_index = parent[parent_index]
+
+        self.n_expanded = n_closed
+        self.planning_time = time.perf_counter() - t0
+        return rx, ry
+
+    def planning_legacy(self, sx, sy, gx, gy):
+        """
+        A star path search (reference implementation)
+
+        Picks the next node with a linear scan over a dict open set and
+        allocates a Node per expansion. Kept for comparison with planning().
+
+        input:
+            s_x: start x position [m]
+            s_y: start y position [m]
+            gx: goal x position [m]
+            gy: goal y position [m]
+
+        output:
+            rx: x position list of the final path
+            ry: y position list of the final path
+        """
+
+        t0 = time.perf_counter()
         start_node = self.Node(self.calc_xy_index(sx, self.min_x),
                                self.calc_xy_index(sy, self.min_y), 0.0, -1)
         goal_node = self.Node(self.calc_xy_index(gx, self.min_x),
@@ -131,6 +301,8 @@ class AStarPlanner:
 
         rx, ry = self.calc_final_path(goal_node, closed_set)
 
+        self.n_expanded = len(closed_set)
+        self.planning_time = time.perf_counter() - t0
         return rx, ry
 
     def calc_final_path(self, goal_node, closed_set):
@@ -189,11 +361,21 @@ class AStarPlanner:
         return True
 
     def calc_obstacle_map(self, ox, oy):
+        """
+        Rasterize the obstacle points onto the grid and inflate them by rr
 
-        self.min_x = round(min(ox))
-        self.min_y = round(min(oy))
-        self.max_x = round(max(ox))
-        self.max_y = round(max(oy))
+        Each obstacle is snapped to its nearest grid node and stamped with
+        a precomputed disk kernel of node offsets; only the nodes of the
+        kernel get the exact distance check d <= rr, so the cost is
+        O(obstacles x kernel) instead of O(nodes x obstacles).
+        """
+        ox = np.asarray(ox, dtype=float)
+        oy = np.asarray(oy, dtype=float)
+
+        self.min_x = round(float(ox.min()))
+        self.min_y = round(float(oy.min()))
+        self.max_x = round(float(ox.max()))
+        self.max_y = round(float(oy.max()))
         print("min_x:", self.min_x)
         print("min_y:", self.min_y)
         print("max_x:", self.max_x)
@@ -205,17 +387,65 @@ class AStarPlanner:
         print("y_width:", self.y_width)
 
         # obstacle map generation
-        self.obstacle_map = [[False for _ in range(self.y_width)]
-                             for _ in range(self.x_width)]
-        for ix in range(self.x_width):
-            x = self.calc_grid_position(ix, self.min_x)
-            for iy in range(self.y_width):
-                y = self.calc_grid_position(iy, self.min_y)
-                for iox, ioy in zip(ox, oy):
-                    d = math.hypot(iox - x, ioy - y)
-                    if d <= self.rr:
-                        self.obstacle_map[ix][iy] = True
-                        break
+        self.obstacle_map = np.zeros((self.x_width, self.y_width), dtype=bool)
+        points = np.unique(np.stack([ox, oy], axis=1), axis=0)
+        ox, oy = points[:, 0], points[:, 1]
+        base_x = np.rint((ox - self.min_x) / self.resolution).astype(int)
+        base_y = np.rint((oy - self.min_y) / self.resolution).astype(int)
+        for kx, ky in self.get_disk_kernel(self.rr, self.resolution):
+            ix = base_x + kx
+            iy = base_y + ky
+            d = np.hypot(ox - self.calc_grid_position(ix, self.min_x),
+                         oy - self.calc_grid_position(iy, self.min_y))
+            hit = ((d <= self.rr) & (ix >= 0) & (ix < self.x_width)
+                   & (iy >= 0) & (iy < self.y_width))
+            self.obstacle_map[ix[hit], iy[hit]] = True
+
+        self.calc_free_map()
+
+    def calc_obstacle_map_from_field(self, distance_field):
+        """
+        Set obstacle_map from a distance-to-nearest-wall field (resolution 1)
+
+        Node (ix, iy) sits on grid cell (min_y + iy, min_x + ix), so it is
+        within rr of an obstacle iff the field there is <= rr: one lookup
+        per node for any robot radius.
+        """
+        field = np.asarray(distance_field[self.min_y:self.min_y + self.y_width,
+                                          self.min_x:self.min_x + self.x_width])
+        self.obstacle_map = field.T <= self.rr + FIELD_EPS
+        self.calc_free_map()
+
+    def calc_free_map(self):
+        """
+        Flatten obstacle_map and the bounds check of verify_node into a
+        bytes buffer indexed by y * x_width + x (1 = node is safe).
+        Call again after editing obstacle_map.
+        """
+        obstacle = np.asarray(self.obstacle_map, dtype=bool).reshape(
+            self.x_width, self.y_width)
+        in_x = np.arange(self.x_width) * self.resolution + self.min_x < self.max_x
+        in_y = np.arange(self.y_width) * self.resolution + self.min_y < self.max_y
+        free = ~obstacle.T & in_y[:, None] & in_x[None, :]
+        self.free_map = free.astype(np.uint8).tobytes()
+
+    @staticmethod
+    def get_disk_kernel(rr, resolution):
+        """
+        Grid node offsets that can lie within rr of an obstacle snapped to
+        the node at offset (0, 0), i.e. at most half a cell away from it.
+
+        :return: list of (dx, dy) index offsets
+        """
+        reach = math.ceil(rr / resolution) + 1
+        kernel = []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                gap = math.hypot(max(abs(dx) - 0.5, 0.0),
+                                 max(abs(dy) - 0.5, 0.0)) * resolution
+                if gap <= rr:
+                    kernel.append((dx, dy))
+        return kernel
 
     @staticmethod
     def get_motion_model():
@@ -243,26 +473,17 @@ def main():
     grid_size = 2.0  # [m]
     robot_radius = 1.0  # [m]
 
-    map, _ = generate_map_from_json("map1.json")
-    # set obstacle positions
-    ox, oy = [], []
-    for i in range(map.shape[0]):
-        for j in range(map.shape[1]):
-            if map[i, j] == 1:
-                ox.append(j)
-                oy.append(i)
-
-
-
+    map, _ = generate_map_from_json("map1.json", cache_dir=MAP_CACHE_DIR)
 
     if show_animation:  # pragma: no cover
+        oy, ox = np.nonzero(map == 1)
         plt.plot(ox, oy, ".k")
         plt.plot(sx, sy, "og")
         plt.plot(gx, gy, "xb")
         plt.grid(True)
         plt.axis("equal")
 
-    a_star = AStarPlanner(ox, oy, grid_size, robot_radius)
+    a_star = AStarPlanner.from_grid(map, grid_size, robot_radius)
     rx, ry = a_star.planning(sx, sy, gx, gy)
     print(rx[1], ry[1])
     if show_animation:  # pragma: no cover
@@ -0,0 +1,220 @@
+"""
+批量无界面探索
+
+用进程池对一个目录下的地图JSON（1.json / map1.json 的线段格式）并行执行
+自动探索和寻找出口，把每张地图的指标写入CSV/JSON：步数、探索格子数、
+寻路搜索次数、雷达射线数以及各阶段耗时。
+
+用法: python batch_explore.py 目录 [--pattern "*.json"] [--workers 4] [--timeout 60]
+                             [--csv results.csv] [--json results.json]
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from distance_field import distance_field_from_json
+from explorer import Explorer
+from generate_map import MAP_CACHE_DIR, generate_map_from_json
+
+FIELDS = [
+    'map', 'status', 'height', 'width', 'free_cells',
+    'steps', 'cells_explored', 'coverage', 'finished',
+    'exits', 'exit_path_length', 'exit_steps',
+    'field_searches', 'search_expansions', 'search_pushes', 'search_time',
+    'replans', 'path_searches', 'radar_scans', 'radar_rays',
+    'load_time', 'explore_time', 'exit_time', 'total_time', 'error',
+]
+
+
+def explore_map(path, radar_range=30, scan_angle_step=3, scan_method='numpy', timeout=None,
+                resolution=5, wall_thickness=1, cache_dir=None, robot_radius=0, path_planner='bfs',
+                explore_planner='search'):
+    """
+    在一张地图上无界面地探索并走到最近出口（进程池中执行）
+
+    超时是协作式的，限制的是整张地图（读取、探索和走到出口）的总时间：
+    探索和走向出口时每走一步检查一次，因此最多超出一步探索加一次出口寻路
+    的时间。探索超时后仍然求出口路径并记录其长度，但不再沿路径行走，
+    status为'timeout'。探索的步数和覆盖率在走向出口之前记录。需要距离场时（robot_radius > 0 或
+    'sdf'扫描）距离场和地图一起从缓存读取。
+
+    Returns:
+        指标字典，键见FIELDS
+    """
+    result = dict.fromkeys(FIELDS)
+    result['map'] = os.path.basename(path)
+    t_start = time.perf_counter()
+    try:
+        t0 = time.perf_counter()
+        field = None
+        if robot_radius > 0 or scan_method == 'sdf':
+            maze, start_pos, field = distance_field_from_json(path, resolution, wall_thickness, cache_dir)
+        else:
+            maze, start_pos = generate_map_from_json(path, resolution=resolution,
+                                                     wall_thickness=wall_thickness, cache_dir=cache_dir)
+        explorer = Explorer(maze, start_pos, radar_range=radar_range,
+                            scan_angle_step=scan_angle_step, scan_method=scan_method,
+                            verbose=False, robot_radius=robot_radius, distance_field=field,
+                            path_planner=path_planner, explore_planner=explore_planner)
+        result['load_time'] = time.perf_counter() - t0
+
+        deadline = None if timeout is None else t_start + timeout
+
+        t0 = time.perf_counter()
+        explorer.run(timeout=remaining(deadline))
+        if not explorer.finished:
+            explorer.find_exits()
+        result['explore_time'] = time.perf_counter() - t0
+        # 探索阶段的指标（不含走向出口时雷达新扫描到的格子）
+        free_cells = int((maze == 0).sum())
+        result.update(
+            steps=explorer.moves,
+            cells_explored=int(explorer.explored_map.sum()),
+            coverage=float((explorer.explored_map & (maze == 0)).sum() / max(free_cells, 1)),
+        )
+
+        t0 = time.perf_counter()
+        timed_out = not explorer.finished
+        exit_path = explorer.path_to_exit() if explorer.exits else None
+        if exit_path:
+            result['exit_path_length'] = len(exit_path) - 1
+            if not timed_out:
+                result['exit_steps'] = explorer.follow_path(exit_path, timeout=remaining(deadline))
+                timed_out = (result['exit_steps'] < len(exit_path) - 1 and
+                             deadline is not None and time.perf_counter() > deadline)
+        result['exit_time'] = time.perf_counter() - t0
+
+        result.update(
+            status='timeout' if timed_out else 'ok',
+            height=maze.shape[0],
+            width=maze.shape[1],
+            free_cells=free_cells,
+            finished=explorer.finished,
+            exits=len(explorer.exits),
+            field_searches=explorer.search_stats['field_searches'],
+            search_expansions=explorer.search_stats['search_expansions'],
+            search_pushes=explorer.search_stats['search_pushes'],
+            search_time=explorer.search_stats['search_time'],
+            replans=explorer.search_stats['replans'],
+            path_searches=explorer.search_stats['path_searches'],
+            radar_scans=explorer.radar_stats['scans'],
+            radar_rays=explorer.radar_stats['rays'],
+        )
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f'{type(e).__name__}: {e}'
+    result['total_time'] = time.perf_counter() - t_start
+    return result
+
+
+def remaining(deadline):
+    """距deadline的剩余秒数（不小于0），deadline为None时返回None"""
+    return None if deadline is None else max(deadline - time.perf_counter(), 0.0)
+
+
+def run_batch(paths, workers=None, **kwargs):
+    """
+    用进程池并行探索多张地图
+
+    Args:
+        paths: 地图JSON文件路径列表
+        workers: 进程数，None表示CPU核数；为1时在当前进程中依次执行
+        **kwargs: 传给explore_map的参数
+
+    Returns:
+        results: 按paths顺序的指标字典列表
+        wall_time: 总耗时（秒）
+    """
+    t0 = time.perf_counter()
+    results = [None] * len(paths)
+    if workers == 1:
+        for i, path in enumerate(paths):
+            results[i] = explore_map(path, **kwargs)
+            print_result(results[i])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(explore_map, path, **kwargs): i for i, path in enumerate(paths)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                print_result(results[futures[future]])
+    return results, time.perf_counter() - t0
+
+
+def print_result(result):
+    print(f"{result['map']:<20}{result['status']:<8}"
+          f"步数 {result['steps']}  耗时 {result['total_time']:.2f}s", flush=True)
+
+
+def write_csv(results, filename):
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def write_json(results, summary, filename):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump({'summary': summary, 'maps': results}, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量无界面探索')
+    parser.add_argument('directory', help='地图JSON所在目录')
+    parser.add_argument('--pattern', default='*.json', help='地图文件名匹配模式')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认CPU核数')
+    parser.add_argument('--timeout', type=float, default=None, help='每张地图的时间上限（秒，含读取、探索和走到出口）')
+    parser.add_argument('--radar-range', type=int, default=30)
+    parser.add_argument('--angle-step', type=int, default=3)
+    parser.add_argument('--scan-method', default='numpy', choices=['numpy', 'loop', 'dda', 'sdf'])
+    parser.add_argument('--resolution', type=float, default=5, help='每个JSON坐标单位对应的格子数')
+    parser.add_argument('--wall-thickness', type=int, default=1, help='墙壁厚度（格子数）')
+    parser.add_argument('--robot-radius', type=float, default=0, help='寻路时的机器人半径（格子数）')
+    parser.add_argument('--path-planner', default='bfs', choices=['bfs', 'hpa'],
+                        help='去出口的寻路方式（hpa为分层寻路，路径是近似最短）')
+    parser.add_argument('--explore-planner', default='search', choices=['search', 'dstar'],
+                        help='探索时选择frontier的方式（dstar为D* Lite增量重规划）')
+    parser.add_argument('--cache-dir', default=MAP_CACHE_DIR, help='地图缓存目录，空字符串表示不缓存')
+    parser.add_argument('--csv', default='batch_results.csv', help='CSV输出文件')
+    parser.add_argument('--json', default=None, help='JSON输出文件（含汇总）')
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.directory, args.pattern)))
+    if not paths:
+        print(f"{args.directory} 中没有匹配 {args.pattern} 的地图")
+        return
+
+    workers = args.workers or os.cpu_count()
+    print(f"共 {len(paths)} 张地图，{workers} 个进程")
+    results, wall_time = run_batch(
+        paths, workers=workers, radar_range=args.radar_range,
+        scan_angle_step=args.angle_step, scan_method=args.scan_method, timeout=args.timeout,
+        resolution=args.resolution, wall_thickness=args.wall_thickness, cache_dir=args.cache_dir or None,
+        robot_radius=args.robot_radius, path_planner=args.path_planner,
+        explore_planner=args.explore_planner)
+
+    summary = {
+        'maps': len(results),
+        'workers': workers,
+        'wall_time': wall_time,
+        'maps_per_hour': len(results) / wall_time * 3600 if wall_time > 0 else None,
+        'ok': sum(r['status'] == 'ok' for r in results),
+        'timeout': sum(r['status'] == 'timeout' for r in results),
+        'error': sum(r['status'] == 'error' for r in results),
+        'cpu_time': sum(r['total_time'] for r in results),
+    }
+    write_csv(results, args.csv)
+    if args.json:
+        write_json(results, summary, args.json)
+
+    print(f"完成 {summary['ok']} 张，超时 {summary['timeout']} 张，出错 {summary['error']} 张")
+    print(f"总耗时 {wall_time:.2f}s，吞吐量 {summary['maps_per_hour']:.0f} 张/小时，"
+          f"并行加速 {summary['cpu_time'] / wall_time:.2f}x")
+    print(f"结果已保存到 {args.csv}" + (f" 和 {args.json}" if args.json else ''))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+
+Benchmark of the A* planners in a_star.py
+
+Compares AStarPlanner.planning (heap open set, flat buffers) with
+AStarPlanner.planning_legacy (dict open set) on map1.json and on
+synthetic maze-like grids, and checks that both return the same path.
+Then compares node expansions and time of A* and JPSPlanner on the
+corridor maps 1.json - 3.json and the synthetic grids.
+
+usage: python benchmark_a_star.py [--sizes 100 200 400] [--legacy-limit 200]
+
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from a_star import AStarPlanner
+from generate_map import generate_map_from_json
+from jps import JPSPlanner
+
+
+def quiet():
+    """Swallow the planners' progress prints"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def time_call(func, *args, repeat=1):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        with quiet():
+            t0 = time.perf_counter()
+            result = func(*args)
+            best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def map1_planner():
+    grid, _ = generate_map_from_json("map1.json")
+    oy, ox = np.nonzero(grid == 1)
+    with quiet():
+        return AStarPlanner(ox.tolist(), oy.tolist(), 2.0, 1.0)
+
+
+def synthetic_obstacle_map(size, seed=0):
+    """
+    Maze-like obstacle map [ix][iy]: a vertical wall every 10 cells with a
+    few random gaps, plus random blocks.
+    """
+    rng = np.random.default_rng(seed)
+    obstacle = np.zeros((size, size), dtype=bool)
+    for ix in range(10, size - 1, 10):
+        obstacle[ix, :] = True
+        for gap in rng.integers(1, size - 1, size=max(1, size // 50)):
+            obstacle[ix, gap:gap + 3] = False
+    blocks = rng.integers(0, size, size=(size // 5, 2))
+    for bx, by in blocks:
+        obstacle[bx:bx + 3, by:by + 3] = True
+    obstacle[:3, :3] = False
+    obstacle[-3:, -3:] = False
+    return obstacle
+
+
+def synthetic_planner(size, seed=0, planner_class=AStarPlanner):
+    # build on the bounding box only, then install the synthetic map
+    with quiet():
+        planner = planner_class([0.0, float(size)], [0.0, float(size)], 1.0, 0.0)
+    planner.obstacle_map = synthetic_obstacle_map(size, seed)
+    planner.calc_free_map()
+    return planner
+
+
+def compare(name, planner, start, goal, run_legacy, repeat):
+    t_new, (rx, ry) = time_call(planner.planning, *start, *goal,
+                                repeat=repeat)
+    line = f"{name:<20} new {t_new * 1000:9.1f} ms  path {len(rx):5d}"
+    if run_legacy:
+        t_old, (lx, ly) = time_call(planner.planning_legacy, *start, *goal)
+        same = (lx, ly) == (rx, ry)
+        line += (f"  legacy {t_old * 1000:9.1f} ms"
+                 f"  speedup {t_old / t_new:7.1f}x  same path {same}")
+    print(line)
+
+
+def path_cost(rx, ry):
+    return sum(np.hypot(np.diff(rx), np.diff(ry)))
+
+
+def far_goal(planner, sx, sy):
+    """Free node farthest from the start, as a corridor-length query"""
+    free = np.frombuffer(planner.free_map, dtype=np.uint8).reshape(
+        planner.y_width, planner.x_width)
+    iy, ix = np.nonzero(free)
+    k = np.argmax(np.hypot(ix - sx, iy - sy))
+    return float(ix[k]), float(iy[k])
+
+
+def compare_jps(name, a_star_planner, jps_planner, start, goal):
+    with quiet():
+        rx, ry = a_star_planner.planning(*start, *goal)
+        jx, jy = jps_planner.planning(*start, *goal)
+    same_cost = abs(path_cost(rx, ry) - path_cost(jx, jy)) < 1e-6
+    print(f"{name:<20} A* {a_star_planner.n_expanded:7d} expanded"
+          f" {a_star_planner.planning_time * 1000:8.1f} ms"
+          f"  JPS {jps_planner.n_expanded:5d} expanded"
+          f" {jps_planner.planning_time * 1000:8.1f} ms"
+          f"  same cost {same_cost}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 200, 400, 1000])
+    parser.add_argument("--legacy-limit", type=int, default=200,
+                        help="skip planning_legacy on grids larger than this")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    compare("map1.json", map1_planner(), (10.0, 12.0), (48.0, 50.0),
+            True, args.repeat)
+    for size in args.sizes:
+        planner = synthetic_planner(size)
+        compare(f"synthetic {size}x{size}", planner,
+                (1.0, 1.0), (size - 2.0, size - 2.0),
+                size <= args.legacy_limit, args.repeat)
+
+    print()
+    for json_file in ["1.json", "2.json", "3.json"]:
+        grid, (row, col) = generate_map_from_json(json_file)
+        with quiet():
+            a_star_planner = AStarPlanner.from_grid(grid, 1.0, 0.5)
+            jps_planner = JPSPlanner.from_grid(grid, 1.0, 0.5)
+        start = (float(col), float(row))
+        compare_jps(json_file, a_star_planner, jps_planner, start,
+                    far_goal(a_star_planner, *start))
+    for size in args.sizes:
+        compare_jps(f"synthetic {size}x{size}", synthetic_planner(size),
+                    synthetic_planner(size, planner_class=JPSPlanner),
+                    (1.0, 1.0), (size - 2.0, size - 2.0))
+
+
+if __name__ == '__main__':
+    main()
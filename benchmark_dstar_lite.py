@@ -0,0 +1,83 @@
+"""
+增量重规划基准测试
+
+机器人在尺寸递增的合成迷宫（benchmark_a_star的synthetic_obstacle_map）中从
+左上角走向右下角，一开始不知道任何墙壁（未知格子视为可通行），每走一步
+感知周围 --sense 格以内的墙壁。沿同一条轨迹比较每步的规划耗时：
+    D* Lite    搜索状态保留，只按新感知到的墙壁修补
+    A*         每步在当前已知地图上从头搜索
+并检查两者每步求出的最短路径长度一致。
+
+用法: python benchmark_dstar_lite.py [--sizes 100 200] [--sense 5]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmark_a_star import synthetic_obstacle_map
+from dstar_lite import DStarLite
+from grid_search import astar_search
+
+
+def sense(walls, known, pos, radius):
+    """感知pos周围radius以内的墙壁，返回新知道的墙壁格子"""
+    row, col = pos
+    window = np.s_[max(row - radius, 0):row + radius + 1, max(col - radius, 0):col + radius + 1]
+    new = walls[window] & ~known[window]
+    known[window] |= new
+    rows, cols = np.nonzero(new)
+    return list(zip((rows + window[0].start).tolist(), (cols + window[1].start).tolist()))
+
+
+def benchmark(size, args):
+    walls = synthetic_obstacle_map(size, args.seed)
+    known = np.zeros_like(walls)
+    pos, goal = (1, 1), (size - 2, size - 2)
+    sense(walls, known, pos, args.sense)
+
+    t0 = time.perf_counter()
+    planner = DStarLite(known, pos, [goal])
+    planner.distance()
+    initial_time = time.perf_counter() - t0
+
+    dstar_time = astar_time = 0.0
+    steps = changes = 0
+    while pos != goal:
+        t0 = time.perf_counter()
+        next_cell = planner.next_cell()
+        t1 = time.perf_counter()
+        path = astar_search(known.astype(np.uint8), pos, goal)
+        t2 = time.perf_counter()
+        assert next_cell is not None and len(path) - 1 == planner.distance(), f'{size}: 路径长度不一致'
+        dstar_time += t1 - t0
+        astar_time += t2 - t1
+
+        pos = next_cell
+        planner.move_start(pos)
+        cells = sense(walls, known, pos, args.sense)
+        t0 = time.perf_counter()
+        changes += planner.update_cells(cells, [True] * len(cells))
+        dstar_time += time.perf_counter() - t0
+        steps += 1
+
+    print(f'{size:>5}x{size:<5}{steps:7d}{changes:9d}{initial_time * 1000:10.1f}ms'
+          f'{dstar_time / steps * 1000:10.3f}ms{astar_time / steps * 1000:10.3f}ms'
+          f'{astar_time / dstar_time:9.1f}x{planner.stats["expansions"] / steps:12.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='增量重规划基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 200])
+    parser.add_argument('--sense', type=int, default=5, help='每步感知墙壁的范围（格子数）')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'尺寸':>11}{'步数':>5}{'新墙壁':>6}{'首次规划':>8}{'D* Lite/步':>12}{'A*/步':>10}"
+          f"{'加速':>8}{'扩展数/步':>9}")
+    for size in args.sizes:
+        benchmark(size, args)
+
+
+if __name__ == "__main__":
+    main()
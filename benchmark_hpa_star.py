@@ -0,0 +1,80 @@
+"""
+分层寻路基准测试
+
+在尺寸递增的合成迷宫（benchmark_a_star的synthetic_obstacle_map）和地图JSON上，
+比较 HierarchicalPlanner.find_path 与整图 multi_target_bfs 的单次查询耗时、
+路径长度，以及抽象图的构建耗时和修改一个格子后的局部重建耗时。
+
+用法: python benchmark_hpa_star.py [--sizes 100 200 400 800] [--queries 20] [--cluster-size 16]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmark_a_star import synthetic_obstacle_map
+from generate_map import generate_map_from_json
+from grid_search import multi_target_bfs
+from hpa_star import CLUSTER_SIZE, HierarchicalPlanner
+
+
+def benchmark(name, maze, args, rng):
+    t0 = time.perf_counter()
+    planner = HierarchicalPlanner(maze, args.cluster_size)
+    build_time = time.perf_counter() - t0
+
+    free = [tuple(cell) for cell in np.argwhere(maze == 0).tolist()]
+    hpa_time = bfs_time = 0.0
+    hpa_length = bfs_length = 0
+    queries = 0
+    while queries < args.queries:
+        start, goal = rng.choice(free), rng.choice(free)
+        t0 = time.perf_counter()
+        path, _ = planner.find_path(start, [goal])
+        t1 = time.perf_counter()
+        best_path, _ = multi_target_bfs(maze, start, [goal])
+        t2 = time.perf_counter()
+        assert (path is None) == (best_path is None), f'{name}: 可达性不一致'
+        if best_path is None:
+            continue  # 只统计可达的查询
+        hpa_time += t1 - t0
+        bfs_time += t2 - t1
+        hpa_length += len(path) - 1
+        bfs_length += len(best_path) - 1
+        queries += 1
+
+    # 修改一个格子后只重建受影响的簇
+    cell = rng.choice(free)
+    maze[cell] = 1
+    t0 = time.perf_counter()
+    rebuilt = planner.update([cell], maze)
+    update_time = time.perf_counter() - t0
+
+    print(f'{name:<16}{maze.shape[0]:>5}x{maze.shape[1]:<5}{build_time:9.2f}s'
+          f'{hpa_time / queries * 1000:10.2f}ms{bfs_time / queries * 1000:10.2f}ms'
+          f'{bfs_time / hpa_time:9.1f}x{hpa_length / max(bfs_length, 1):10.3f}'
+          f'{update_time * 1000:10.2f}ms ({len(rebuilt)}簇)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分层寻路基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 200, 400, 800])
+    parser.add_argument('--queries', type=int, default=20, help='每张地图的可达查询数')
+    parser.add_argument('--cluster-size', type=int, default=CLUSTER_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{'地图':<16}{'尺寸':>11}{'构建':>10}{'HPA*':>12}{'BFS':>12}{'加速':>9}"
+          f"{'路径长度比':>10}{'局部重建':>12}")
+    for json_file in ['1.json', '2.json', '3.json']:
+        maze, _ = generate_map_from_json(json_file)
+        benchmark(json_file, np.array(maze, dtype=np.uint8), args, rng)
+    for size in args.sizes:
+        maze = synthetic_obstacle_map(size, args.seed).astype(np.uint8)
+        benchmark(f'synthetic {size}', maze, args, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+雷达扫描基准测试
+
+比较 Radar.scan_360 的逐步采样（loop）、向量化（numpy）、DDA精确遍历（dda）
+和距离场球面追踪（sdf，距离场在计时前算好）在不同最大距离下的耗时；由JSON生成的地图还比较直接与线段求交的
+SegmentRadar（segments列）。
+
+用法: python benchmark_radar.py [--angle-step 1] [--repeat 5]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from generate_map import generate_map_from_json
+from radar import Radar
+from segment_radar import SegmentRadar
+
+METHODS = ['loop', 'numpy', 'dda', 'sdf']
+
+
+def open_map(size=500, spacing=125):
+    """稀疏墙壁的大地图，射线较长"""
+    grid = np.zeros((size, size), dtype=int)
+    grid[::spacing, :] = 1
+    grid[:, ::spacing] = 1
+    grid[::spacing, spacing // 2::spacing] = 0
+    return grid
+
+
+def time_scan(radar, angle_step, method, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        if method == 'segments':
+            radar.scan_360(angle_step)
+        else:
+            radar.scan_360(angle_step, method=method, use_cache=False)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='雷达扫描基准测试')
+    parser.add_argument('--angle-step', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    maze, start_pos = generate_map_from_json('3.json')
+    cases = [
+        ('3.json', maze, [start_pos[0] + 5, start_pos[1]], '3.json'),
+        ('open 500x500', open_map(), [190, 190], None),
+    ]
+
+    print(f"{'地图':<14}{'最大距离':>10}" + ''.join(f'{m:>12}' for m in METHODS + ['segments']))
+    for name, grid, position, json_file in cases:
+        for max_range in [30, 100, None]:
+            radar = Radar(grid, position, max_range)
+            radar.get_distance_field()
+            times = [time_scan(radar, args.angle_step, m, args.repeat) for m in METHODS]
+            label = f'{radar.max_range}' + ('(对角线)' if max_range is None else '')
+            line = f'{name:<14}{label:>10}' + ''.join(f'{t * 1000:10.2f}ms' for t in times)
+            if json_file is not None:
+                segment_radar = SegmentRadar.from_json(json_file, position, radar.max_range)
+                line += f"{time_scan(segment_radar, args.angle_step, 'segments', args.repeat) * 1000:10.2f}ms"
+            else:
+                line += f"{'-':>12}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+线段空间索引基准测试
+
+在线段数递增的随机迷宫式地图（墙壁密度不变，地图面积随线段数增长）上，
+比较 SegmentIndex 的最近墙壁、半径和射线查询与遍历全部线段（暴力）的
+单次查询耗时，并检查两者结果一致。
+
+用法: python benchmark_spatial_index.py [--sizes 1000 10000 100000] [--queries 200]
+                                      [--radius 20] [--max-range 100] [--json 3.json]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from generate_map import segment_index_from_json
+from spatial_index import SegmentIndex, point_segment_distances, ray_segment_distances
+
+
+def random_segments(count, length=10, seed=0):
+    """平均每 length x length 一条水平或竖直线段的随机地图"""
+    rng = np.random.default_rng(seed)
+    side = int(math.sqrt(count)) * length
+    starts = rng.integers(0, side, size=(count, 2))
+    vertical = rng.random(count) < 0.5
+    ends = starts + np.where(vertical[:, None], [0, length], [length, 0])
+    return starts, ends
+
+
+def brute_nearest(index, point):
+    distances, _ = point_segment_distances(point, index.starts, index.ends)
+    return float(distances.min())
+
+
+def brute_radius(index, point, radius):
+    distances, _ = point_segment_distances(point, index.starts, index.ends)
+    return np.nonzero(distances <= radius)[0]
+
+
+def brute_ray(index, origin, direction, max_range):
+    t = ray_segment_distances(origin, [direction], index.starts, index.ends)[0].min()
+    return float(t) if t <= max_range else None
+
+
+def time_queries(function, queries):
+    """依次执行查询，返回 (结果列表, 平均每次耗时)"""
+    t0 = time.perf_counter()
+    results = [function(*query) for query in queries]
+    return results, (time.perf_counter() - t0) / max(len(queries), 1)
+
+
+def benchmark(name, index, args, rng):
+    lo, hi = index.min_corner, index.max_corner
+    points = rng.uniform(lo, hi, size=(args.queries, 2))
+    angles = rng.uniform(0, 2 * math.pi, size=args.queries)
+    directions = np.column_stack([np.cos(angles), np.sin(angles)])
+
+    rows = []
+    nearest, t_index = time_queries(lambda p: index.nearest(p)[0], [(p,) for p in points])
+    expected, t_brute = time_queries(lambda p: brute_nearest(index, p), [(p,) for p in points])
+    assert np.allclose(nearest, expected), f'{name}: 最近墙壁查询结果不一致'
+    rows.append(('nearest', t_index, t_brute))
+
+    within, t_index = time_queries(lambda p: index.within_radius(p, args.radius)[0],
+                                   [(p,) for p in points])
+    expected, t_brute = time_queries(lambda p: brute_radius(index, p, args.radius),
+                                     [(p,) for p in points])
+    assert all(np.array_equal(a, b) for a, b in zip(within, expected)), f'{name}: 半径查询结果不一致'
+    rows.append(('radius', t_index, t_brute))
+
+    queries = list(zip(points, directions))
+    hits, t_index = time_queries(lambda p, d: index.ray_cast(p, d, args.max_range)[0], queries)
+    expected, t_brute = time_queries(lambda p, d: brute_ray(index, p, d, args.max_range), queries)
+    assert all((a is None and b is None) or (a is not None and b is not None and math.isclose(a, b, abs_tol=1e-9))
+               for a, b in zip(hits, expected)), f'{name}: 射线查询结果不一致'
+    rows.append(('ray', t_index, t_brute))
+
+    for query, t_index, t_brute in rows:
+        print(f'{name:<16}{len(index):>10}{query:>10}{t_index * 1e6:12.1f}us{t_brute * 1e6:12.1f}us'
+              f'{t_brute / t_index:10.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='线段空间索引基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=200, help='每种查询的次数')
+    parser.add_argument('--radius', type=float, default=20, help='半径查询的半径')
+    parser.add_argument('--max-range', type=float, default=100, help='射线查询的最大距离')
+    parser.add_argument('--json', nargs='*', default=['3.json'], help='同时测试的地图JSON')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'地图':<16}{'线段数':>8}{'查询':>10}{'索引':>14}{'暴力':>14}{'加速':>10}")
+    cases = [(f'random {n}', lambda n=n: SegmentIndex(*random_segments(n, seed=args.seed)))
+             for n in args.sizes]
+    cases += [(json_file, lambda f=json_file: segment_index_from_json(f)[0]) for json_file in args.json]
+    for name, build in cases:
+        t0 = time.perf_counter()
+        index = build()
+        print(f'{name:<16}{len(index):>10}{"build":>10}{(time.perf_counter() - t0) * 1000:12.1f}ms'
+              f'  ({index.nx}x{index.ny} 桶，桶边长 {index.cell_size:.1f})')
+        benchmark(name, index, args, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+到最近墙壁的欧氏距离场
+
+每个格子到最近墙壁格子（格子中心之间）的精确欧氏距离，墙壁本身为0。
+用两遍可分离的精确距离变换（Felzenszwalb-Huttenlocher）计算：
+    第一遍  沿一个方向求到同一行/列最近墙壁的一维距离（累积最大/最小值，全向量化）
+    第二遍  沿另一个方向求抛物线下包络，逐列推进，所有行同时向量化计算
+总代价 O(格子数)。距离场按地图计算一次，之后规划器（任意机器人半径的
+障碍物膨胀）和雷达（球面追踪跳步）都只做O(1)查表。
+
+距离场可以和generate_map的地图缓存放在同一目录（文件名为地图缓存键加
+.edt.npy，float32），见distance_field_from_json。
+"""
+import os
+
+import numpy as np
+
+from generate_map import generate_map_from_json, map_cache_key
+
+# 缓存的距离场为float32，比较距离时留出的舍入余量
+FIELD_EPS = 1e-4
+
+# 第二遍中一块同时处理的 行数 x 列数 上限（限制下包络数组的内存）
+EDT_BLOCK_CELLS = 1 << 22
+
+
+def lower_envelope(f):
+    """
+    一维平方距离变换：d[r, q] = min_p (q - p)^2 + f[r, p]，对每一行求下包络
+
+    所有行同时逐列推进；各行的栈（v, z）按 [位置, 行] 展平存放，
+    第k个元素的下标为 k * 行数 + 行。
+
+    Args:
+        f: (行数, 列数) 数组，每行是一维采样函数（有限值）
+
+    Returns:
+        d: 与f形状相同的数组
+    """
+    rows_count, n = f.shape
+    rows = np.arange(rows_count)
+    ft = np.ascontiguousarray(f.T).ravel()                  # ft[p * 行数 + r] = f[r, p]
+    v = np.zeros(n * rows_count, dtype=np.int64)            # 下包络中各抛物线的顶点位置
+    z = np.empty((n + 1) * rows_count)                      # 各抛物线在下包络中的区间边界
+    z[:rows_count] = -np.inf
+    z[rows_count:2 * rows_count] = np.inf
+    k = np.zeros(rows_count, dtype=np.int64)                # 每行栈顶的位置
+
+    for q in range(1, n):
+        fq = ft[q * rows_count:(q + 1) * rows_count] + q * q
+        slot = k * rows_count + rows
+        vk = v[slot]
+        s = (fq - (ft[vk * rows_count + rows] + vk * vk)) / (2 * q - 2 * vk)
+        # 新抛物线完全覆盖了栈顶的抛物线：出栈（只处理需要出栈的行）
+        active = np.nonzero(s <= z[slot])[0]
+        while len(active):
+            k[active] -= 1
+            vk = v[k[active] * rows_count + active]
+            s[active] = (fq[active] - (ft[vk * rows_count + active] + vk * vk)) / (2 * q - 2 * vk)
+            active = active[s[active] <= z[k[active] * rows_count + active]]
+        k += 1
+        slot = k * rows_count + rows
+        v[slot] = q
+        z[slot] = s
+        z[slot + rows_count] = np.inf
+
+    d = np.empty((n, rows_count))
+    k[:] = 0
+    for q in range(n):
+        active = np.nonzero(z[(k + 1) * rows_count + rows] < q)[0]
+        while len(active):
+            k[active] += 1
+            active = active[z[(k[active] + 1) * rows_count + active] < q]
+        vk = v[k * rows_count + rows]
+        d[q] = (q - vk) ** 2 + ft[vk * rows_count + rows]
+    return d.T
+
+
+def compute_distance_field(grid):
+    """
+    计算到最近墙壁的精确欧氏距离场
+
+    Args:
+        grid: 二维数组（或OccupancyGrid等可转换为数组的栅格），1表示墙壁
+
+    Returns:
+        field: float64数组，形状与grid相同；墙壁为0，没有任何墙壁时为inf
+    """
+    walls = np.asarray(grid) == 1
+    # 第二遍沿较短的方向逐列推进，Python循环次数为 min(行数, 列数)
+    transposed = walls.shape[1] > walls.shape[0]
+    if transposed:
+        walls = walls.T
+    height, width = walls.shape
+    big = height + width  # 大于任何实际距离，代替inf避免 inf - inf
+
+    # 第一遍：每列中到上方/下方最近墙壁的距离
+    index = np.arange(height)[:, None]
+    last = np.maximum.accumulate(np.where(walls, index, -big), axis=0)
+    following = np.minimum.accumulate(np.where(walls, index, 2 * big)[::-1], axis=0)[::-1]
+    g = np.minimum(np.minimum(index - last, following - index), big).astype(np.float64)
+
+    # 第二遍：每行求下包络（逐列推进），按行分块
+    f = g * g
+    squared = np.empty_like(f)
+    block = max(1, EDT_BLOCK_CELLS // max(width, 1))
+    for begin in range(0, height, block):
+        squared[begin:begin + block] = lower_envelope(f[begin:begin + block])
+
+    field = np.sqrt(squared)
+    field[field >= big] = np.inf
+    return field.T if transposed else field
+
+
+def distance_field_from_json(json_file, resolution=5, wall_thickness=1, cache_dir=None):
+    """
+    生成地图及其距离场
+
+    指定cache_dir时距离场以float32的 <缓存键>.edt.npy 保存在地图缓存旁边，
+    之后直接以只读内存映射读取。
+
+    Args:
+        json_file: 地图JSON文件
+        resolution: 每个JSON坐标单位对应的格子数
+        wall_thickness: 墙壁厚度（格子数）
+        cache_dir: 地图缓存目录，None表示不缓存
+
+    Returns:
+        grid: 二维数组地图，0表示通道，1表示墙壁
+        start_pos: 起始位置 [row, col]
+        field: 距离场
+    """
+    grid, start_pos = generate_map_from_json(json_file, resolution, wall_thickness, cache_dir)
+    if cache_dir is None:
+        return grid, start_pos, compute_distance_field(grid)
+
+    with open(json_file, 'rb') as f:
+        json_bytes = f.read()
+    field_file = os.path.join(cache_dir, map_cache_key(json_bytes, resolution, wall_thickness) + '.edt.npy')
+    if not os.path.exists(field_file):
+        # 先写临时文件再改名，避免并发进程读到写了一半的缓存
+        tmp_file = field_file + f'.{os.getpid()}.tmp'
+        with open(tmp_file, 'wb') as f:
+            np.save(f, compute_distance_field(grid).astype(np.float32))
+        os.replace(tmp_file, field_file)
+    return grid, start_pos, np.load(field_file, mmap_mode='r')
+
+
+def clearance_mask(field, radius):
+    """离墙壁的距离大于radius的格子（半径为radius的机器人中心可以到达的位置）"""
+    return np.asarray(field) > radius + FIELD_EPS
+
+
+def main():
+    """打印地图的距离场统计"""
+    grid, start_pos, field = distance_field_from_json('1.json')
+    free = np.asarray(grid) == 0
+    print(f"地图 {grid.shape}，起点 {start_pos} 离墙 {field[start_pos[0], start_pos[1]]:.2f}")
+    print(f"通道格子离墙最大距离 {field[free].max():.2f}，平均 {field[free].mean():.2f}")
+    for radius in [1, 2, 3]:
+        print(f"半径 {radius}: 可到达 {int(clearance_mask(field, radius).sum())} / {int(free.sum())} 个通道格子")
+
+
+if __name__ == "__main__":
+    main()
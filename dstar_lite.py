@@ -0,0 +1,247 @@
+"""
+增量重规划（D* Lite）
+
+从目标向起点反向搜索：g[s] 是格子s到最近目标的步数，rhs[s] 是由邻居的g
+推出的一步前瞻值，两者不相等的格子在优先队列中等待处理。搜索状态在多次
+规划之间保留：
+    move_start    机器人移动后只累加km（不重排优先队列）
+    update_cells  格子的可通行性变化（新扫描到的墙壁、地图修改）后只更新这些
+                  格子及其邻居的rhs
+    set_goals     目标集合变化（如frontier增减）后只更新增减的目标及其邻居
+之后的compute只处理受影响的格子，每步的规划代价与变化的大小有关，
+而不是与地图大小有关。
+
+四邻域网格，每步代价为1；目标格子即使被标记为不可通行也可以作为终点进入，
+起点（机器人所在的格子）总可以离开。
+"""
+import heapq
+import math
+
+INF = math.inf
+
+
+class DStarLite:
+    """四邻域网格上的D* Lite（支持多个目标）"""
+
+    def __init__(self, blocked, start, goals):
+        """
+        Args:
+            blocked: 二维布尔数组，True表示不可通行（保存一份副本）
+            start: 起点 (row, col)
+            goals: 目标格子 [(row, col), ...]
+        """
+        self.height, self.width = blocked.shape
+        self.blocked = bytearray(blocked.astype(bool, copy=False).ravel().tobytes())
+        self.goals = set()
+        self.g = {}                # 格子 -> 到目标的步数（缺省为inf）
+        self.rhs = {}              # 格子 -> 一步前瞻值（缺省为inf）
+        self.heap = []             # (key1, key2, 格子)，过期的项出堆时跳过
+        self.queued = {}           # 在队列中的格子 -> 当前键
+        self.km = 0
+        self.start = self.index(start)
+        self.last = self.start
+        self.stats = {'expansions': 0, 'vertex_updates': 0, 'cell_changes': 0, 'computes': 0}
+        self.set_goals(goals)
+
+    def index(self, cell):
+        return int(cell[0]) * self.width + int(cell[1])
+
+    def cell(self, index):
+        return divmod(index, self.width)
+
+    def neighbors(self, s):
+        row, col = divmod(s, self.width)
+        result = []
+        if row > 0:
+            result.append(s - self.width)
+        if row + 1 < self.height:
+            result.append(s + self.width)
+        if col > 0:
+            result.append(s - 1)
+        if col + 1 < self.width:
+            result.append(s + 1)
+        return result
+
+    def passable(self, s):
+        # 起点（机器人当前所在的格子）总可以离开，例如膨胀后离墙太近的位置
+        return not self.blocked[s] or s in self.goals or s == self.start
+
+    def heuristic(self, s):
+        """到当前起点的曼哈顿距离（一致的下界）"""
+        row, col = divmod(s, self.width)
+        start_row, start_col = divmod(self.start, self.width)
+        return abs(row - start_row) + abs(col - start_col)
+
+    def calculate_key(self, s):
+        m = min(self.g.get(s, INF), self.rhs.get(s, INF))
+        return (m + self.heuristic(s) + self.km, m)
+
+    def update_vertex(self, s):
+        """按邻居重新计算rhs[s]，并据此把s放入或移出优先队列"""
+        self.stats['vertex_updates'] += 1
+        if not self.passable(s):
+            rhs = INF
+        elif s in self.goals:
+            rhs = 0
+        else:
+            g = self.g
+            rhs = INF
+            for n in self.neighbors(s):
+                if self.passable(n):
+                    value = g.get(n, INF) + 1
+                    if value < rhs:
+                        rhs = value
+        if rhs == INF:
+            self.rhs.pop(s, None)
+        else:
+            self.rhs[s] = rhs
+
+        if self.g.get(s, INF) != rhs:
+            key = self.calculate_key(s)
+            if self.queued.get(s) != key:
+                self.queued[s] = key
+                heapq.heappush(self.heap, (key[0], key[1], s))
+        else:
+            self.queued.pop(s, None)
+
+    def update_around(self, cells):
+        """格子本身的可通行性或目标身份变化后，更新它们及其邻居"""
+        affected = set(cells)
+        for s in cells:
+            affected.update(self.neighbors(s))
+        for s in affected:
+            self.update_vertex(s)
+
+    def top_key(self):
+        """队首的键（跳过过期项），队列为空时为 (inf, inf)"""
+        heap = self.heap
+        while heap:
+            k1, k2, s = heap[0]
+            if self.queued.get(s) == (k1, k2):
+                return (k1, k2)
+            heapq.heappop(heap)
+        return (INF, INF)
+
+    def compute(self):
+        """处理优先队列，直到起点的g值正确"""
+        self.stats['computes'] += 1
+        g, rhs, queued = self.g, self.rhs, self.queued
+        start = self.start
+        while True:
+            top = self.top_key()
+            if top >= self.calculate_key(start) and rhs.get(start, INF) == g.get(start, INF):
+                break
+            _, _, u = heapq.heappop(self.heap)
+            new_key = self.calculate_key(u)
+            if top < new_key:
+                # km增加后键变大：按新键重新入队
+                queued[u] = new_key
+                heapq.heappush(self.heap, (new_key[0], new_key[1], u))
+                continue
+            del queued[u]
+            self.stats['expansions'] += 1
+            g_u, rhs_u = g.get(u, INF), rhs.get(u, INF)
+            if g_u > rhs_u:
+                # 变得更近：只需把更小的值传给邻居
+                g[u] = rhs_u
+                value = rhs_u + 1
+                for n in self.neighbors(u):
+                    if n not in self.goals and self.passable(n) and value < rhs.get(n, INF):
+                        rhs[n] = value
+                        if g.get(n, INF) == value:
+                            queued.pop(n, None)
+                            continue
+                        key = self.calculate_key(n)
+                        queued[n] = key
+                        heapq.heappush(self.heap, (key[0], key[1], n))
+            else:
+                # 变得更远（或不可达）：u和以u为最优后继的邻居重新计算
+                g.pop(u, None)
+                for n in self.neighbors(u):
+                    if rhs.get(n, INF) == g_u + 1:
+                        self.update_vertex(n)
+                self.update_vertex(u)
+
+    def move_start(self, cell):
+        """机器人移动到cell后调用"""
+        s = self.index(cell)
+        if s == self.start:
+            return
+        previous = self.start
+        self.start = s
+        self.km += self.heuristic(self.last)
+        self.last = s
+        # 起点总可通行：离开或进入不可通行的格子时它们的可通行性随之变化
+        self.update_around([c for c in (previous, s) if self.blocked[c]])
+
+    def update_cells(self, cells, blocked):
+        """
+        更新格子的可通行性
+
+        Args:
+            cells: 格子 [(row, col), ...]
+            blocked: 对应的是否不可通行
+
+        Returns:
+            实际变化的格子数
+        """
+        changed = []
+        for cell, value in zip(cells, blocked):
+            s = self.index(cell)
+            if self.blocked[s] != bool(value):
+                self.blocked[s] = bool(value)
+                changed.append(s)
+        self.stats['cell_changes'] += len(changed)
+        self.update_around(changed)
+        return len(changed)
+
+    def set_goals(self, goals):
+        """替换目标集合，只更新增减的目标"""
+        goals = {self.index(cell) for cell in goals}
+        changed = goals ^ self.goals
+        self.goals = goals
+        self.update_around(changed)
+
+    def distance(self):
+        """起点到最近目标的步数，不可达时为inf"""
+        self.compute()
+        return self.g.get(self.start, INF)
+
+    def next_cell(self):
+        """
+        从起点出发的下一步
+
+        Returns:
+            下一个格子 (row, col)；已在目标上或没有可达目标时为None
+        """
+        if self.distance() == INF or self.start in self.goals:
+            return None
+        return self.cell(self.best_successor(self.start))
+
+    def best_successor(self, s):
+        """g值最小的可通行邻居（按邻居顺序打破平局）"""
+        best, best_g = None, INF
+        for n in self.neighbors(s):
+            if self.passable(n):
+                value = self.g.get(n, INF)
+                if value < best_g:
+                    best, best_g = n, value
+        return best
+
+    def path(self):
+        """
+        从起点到最近目标的路径 [(row, col), ...]，没有可达目标时为None
+
+        沿g值下降的方向走，长度等于g[起点] + 1。
+        """
+        steps = self.distance()
+        if steps == INF:
+            return None
+        s = self.start
+        path = [self.cell(s)]
+        for _ in range(int(steps)):
+            if s in self.goals:
+                break
+            s = self.best_successor(s)
+            path.append(self.cell(s))
+        return path
@@ -0,0 +1,524 @@
+import time
+import numpy as np
+from distance_field import clearance_mask
+from dstar_lite import DStarLite
+from frontier import FrontierTracker
+from grid_search import multi_target_bfs, nearest_target_search
+from hpa_star import HierarchicalPlanner
+from radar import Radar, get_ray_table, translate_ray_table
+
+
+class Explorer:
+    """
+    不依赖图形界面的迷宫探索核心
+
+    持有迷宫、雷达、探索地图、frontier集合和寻路，可以逐步执行（explore_step）
+    或一次运行到探索结束（run）。MazeWalker只是它之上的显示层。
+    """
+
+    def __init__(self, maze, start_pos, radar_range=30, scan_angle_step=3,
+                 scan_method='numpy', verbose=True, robot_radius=0, distance_field=None,
+                 path_planner='bfs', explore_planner='search'):
+        """
+        Args:
+            maze: 二维数组，0表示通道，1表示墙壁
+            start_pos: 起始位置 [row, col]
+            radar_range: 雷达最大距离
+            scan_angle_step: 雷达扫描角度步长
+            scan_method: 'numpy' 向量化扫描并直接标记 / 'sdf' 按距离场跳步的向量化扫描
+                         并直接标记（空旷地图上更快，狭窄迷宫中跳步很少，比'numpy'慢）/
+                         'loop'、'dda' 逐条射线扫描
+            verbose: 是否打印探索过程
+            robot_radius: 寻路（回家、去出口、自动移动）时的机器人半径，离墙壁不超过此距离的
+                          格子不可通行；0表示不膨胀
+            distance_field: 可选，迷宫的距离场（如distance_field_from_json的缓存），
+                            robot_radius > 0 或 'sdf' 扫描时使用，为None时按需计算
+            path_planner: 回家/去出口的寻路方式，'bfs' 每次整图BFS（最短路径）/
+                          'hpa' 分层寻路（抽象图构建一次，地图修改后只重建受影响的簇；
+                          路径和exit_distances是近似值，可能比最短路径长）
+            explore_planner: 探索时选择frontier的方式，'search' 每步从当前位置做一次
+                             距离场搜索（回避最近走过的位置）/ 'dstar' 用D* Lite增量
+                             维护到所有frontier的距离，每步只修补新扫描的格子
+        """
+        self.maze = maze
+        self.maze_height, self.maze_width = maze.shape
+        self.player_pos = list(start_pos)
+        self.start_pos = self.player_pos
+        self.verbose = verbose
+
+        # 雷达设置
+        self.radar_range = radar_range
+        self.scan_angle_step = scan_angle_step
+        self.scan_method = scan_method
+        self.radar = Radar(self.maze, self.player_pos, self.radar_range, distance_field)
+
+        # 寻路时的障碍物膨胀（按雷达持有的距离场计算，地图修改后重新计算）
+        self.robot_radius = robot_radius
+        self.inflated_maze = None
+        self.inflated_version = None
+
+        # 回家/去出口使用的分层规划器（第一次寻路时构建，之后由set_maze_cell增量更新）
+        self.path_planner = path_planner
+        self.hierarchical_planner = None
+
+        # D* Lite增量重规划：replanner沿已知地图走向固定目标（自动移动），
+        # explore_replanner在已探索通道上走向frontier；两次规划之间新扫描或
+        # 修改的格子记在replan_changes中。自动移动先沿已规划好的follow_path走，
+        # 只有已知的墙壁落在剩余路径上时才建立replanner
+        self.explore_planner = explore_planner
+        self.replanner = None
+        self.replan_goals = []
+        self.follow_path = None
+        self.follow_cells = {}  # follow_path上的格子 -> 在路径中的下标
+        self.follow_index = 0   # 当前位置在follow_path中的下标
+        self.explore_replanner = None
+        self.replan_changes = set()
+
+        # 创建探索地图（记录哪些区域被雷达扫描过）
+        self.explored_map = np.zeros(self.maze.shape, dtype=bool)
+
+        # 增量维护的frontier集合
+        self.frontier_tracker = FrontierTracker(self.maze, self.explored_map)
+
+        # 探索状态
+        self.moves = 0
+        self.finished = False  # 是否已没有可达frontier（探索结束）
+        self.last_positions = []  # 记录最近的位置，防止来回移动
+        self.player_trail = [tuple(self.player_pos)]  # 记录玩家轨迹
+        self.exits = []  # 记录找到的出口位置
+        self.exit_distances = {}  # 上次寻路时到每个出口的步数
+        self.search_stats = {
+            'field_searches': 0,     # 选择frontier时执行的距离场搜索次数
+            'searches_avoided': 0,   # 按曼哈顿距离逐个尝试A*时本需执行的搜索次数
+            'path_searches': 0,      # 回家/去出口的多目标BFS次数
+            'replans': 0,            # D* Lite修补搜索的次数
+            'search_expansions': 0,  # 距离场搜索扩展的节点总数
+            'search_pushes': 0,      # 距离场搜索的入堆总次数
+            'search_time': 0.0,      # 距离场搜索的总耗时（秒）
+        }
+        self.radar_stats = {'scans': 0, 'rays': 0}  # 雷达扫描次数和射线总数
+
+        # 初始雷达扫描
+        self.update_radar_scan()
+
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    def record_search_stats(self, stats):
+        """距离场搜索的统计回调（nearest_target_search的on_stats），累加到search_stats"""
+        self.search_stats['search_expansions'] += stats['expansions']
+        self.search_stats['search_pushes'] += stats['pushes']
+        self.search_stats['search_time'] += stats['time']
+
+    def set_radar_range(self, radar_range):
+        """修改雷达范围并重新扫描"""
+        self.radar_range = radar_range
+        self.radar = Radar(self.maze, self.player_pos, self.radar_range, self.radar.distance_field)
+        self.inflated_maze = None
+        self.update_radar_scan()
+
+    def update_radar_scan(self):
+        """更新雷达扫描并记录探索区域"""
+        self.radar.move_radar(self.player_pos)
+
+        if self.scan_method in ('numpy', 'sdf'):
+            # 一次向量化扫描，射线经过的格子直接写入explored_map
+            scan_data, cells = self.radar.scan_and_mark(self.scan_angle_step, self.explored_map,
+                                                        self.scan_method)
+            new_cells = [divmod(cell, self.maze_width) for cell in cells.tolist()]
+        else:
+            scan_data = self.radar.scan_360(self.scan_angle_step, method=self.scan_method)
+
+            # 标记雷达扫描过的区域
+            new_cells = []
+            for angle, (distance, hit_point) in scan_data.items():
+                new_cells.extend(self.mark_ray_path(self.player_pos, angle, distance))
+
+        self.radar_stats['scans'] += 1
+        self.radar_stats['rays'] += len(scan_data)
+
+        # 只重新判断新探索的格子及其邻居
+        self.frontier_tracker.update(new_cells)
+        if self.replanning():
+            self.replan_changes.update(new_cells)
+
+    def mark_ray_path(self, start_pos, angle, distance):
+        """标记射线路径上的所有点为已探索，返回新探索的格子"""
+        # 沿射线路径的格子直接由缓存的偏移表平移得到
+        table = get_ray_table(self.radar.max_range, self.scan_angle_step)
+        ray = angle // self.scan_angle_step
+        grid_y, grid_x = translate_ray_table(table, start_pos, [ray], 0, int(distance) + 1)
+        grid_y, grid_x = grid_y[0], grid_x[0]
+
+        inside = (grid_y >= 0) & (grid_y < self.maze_height) & (grid_x >= 0) & (grid_x < self.maze_width)
+        cells = np.unique(grid_y[inside] * self.maze_width + grid_x[inside])
+        cells = cells[~self.explored_map.flat[cells]]
+        self.explored_map.flat[cells] = True
+
+        return [divmod(cell, self.maze_width) for cell in cells.tolist()]
+
+    def in_bounds(self, row, col):
+        return 0 <= row < self.maze_height and 0 <= col < self.maze_width
+
+    def move(self, dy, dx):
+        """
+        移动一步并更新雷达扫描
+
+        Returns:
+            是否移动成功（越界或撞墙时为False）
+        """
+        new_row = self.player_pos[0] + dy
+        new_col = self.player_pos[1] + dx
+        if not self.in_bounds(new_row, new_col) or self.maze[new_row, new_col] != 0:
+            return False
+
+        self.player_pos = [new_row, new_col]
+        self.moves += 1
+
+        # 记录轨迹
+        self.player_trail.append(tuple(self.player_pos))
+        for replanner in (self.replanner, self.explore_replanner):
+            if replanner is not None:
+                replanner.move_start(self.player_pos)
+
+        # 更新雷达扫描
+        self.update_radar_scan()
+        return True
+
+    def explore_step(self):
+        """
+        向路径最近的可达frontier移动一步
+
+        没有可达frontier时探索结束，随即寻找出口。
+
+        Returns:
+            是否移动了一步（探索结束时为False）
+        """
+        # 所有frontier点（由雷达扫描增量维护）
+        frontiers = list(self.frontier_tracker.frontiers)
+
+        if frontiers:
+            # 在已探索的通道上求路径最近的可达frontier（一次BFS距离场搜索，或D* Lite增量修补）
+            current_pos = tuple(self.player_pos)
+            reachable = {f for f in frontiers if self.maze[f[0], f[1]] == 0}
+            if self.explore_planner == 'dstar':
+                path = self.frontier_replan(reachable)
+            else:
+                known_free = self.explored_map & (self.maze == 0)
+                path, _ = nearest_target_search(known_free, current_pos, reachable,
+                                                penalty_cells=self.last_positions[-3:],
+                                                on_stats=self.record_search_stats)
+                self.search_stats['field_searches'] += 1
+
+            if path and len(path) >= 2:
+                # 旧策略会先对曼哈顿距离更近的frontier逐个执行A*
+                target_dist = self.calc_dist(path[-1][0], path[-1][1], current_pos[0], current_pos[1])
+                self.search_stats['searches_avoided'] += sum(
+                    1 for f in frontiers
+                    if self.calc_dist(f[0], f[1], current_pos[0], current_pos[1]) < target_dist)
+
+                self.log(f"到达frontier: {path[-1]}, 当前位置: {self.player_pos}")
+                # 向目标移动一步
+                next_pos = path[1]  # path[0]是当前位置，path[1]是下一步
+                dy = next_pos[0] - self.player_pos[0]  # 行的变化
+                dx = next_pos[1] - self.player_pos[1]  # 列的变化
+
+                self.log(f"下一步位置: {next_pos}, 移动方向: dy={dy}, dx={dx}")
+
+                # 记录当前位置，防止来回移动
+                if current_pos not in self.last_positions[-3:]:  # 避免最近3步的重复
+                    self.last_positions.append(current_pos)
+                    if len(self.last_positions) > 10:  # 只保留最近10个位置
+                        self.last_positions.pop(0)
+
+                return self.move(dy, dx)
+
+        # 没有可达的frontier，探索结束
+        self.finished = True
+        self.explore_replanner = None
+        self.find_exits()
+        return False
+
+    def run(self, max_steps=None, timeout=None):
+        """
+        一直探索到没有可达frontier为止（之后finished为True）
+
+        Args:
+            max_steps: 最多移动的步数，None表示不限制
+            timeout: 最长运行时间（秒），每步之间检查，None表示不限制
+
+        Returns:
+            本次移动的步数
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if not self.explore_step():
+                break
+            steps += 1
+        return steps
+
+    def calc_dist(self, i1, j1, i2, j2):
+        return abs(i1 - i2) + abs(j1 - j2)
+
+    def is_frontier(self, i, j):
+        return self.frontier_tracker.is_frontier(i, j)
+
+    def planning_grid(self):
+        """
+        寻路使用的迷宫（不复制，调用方不能修改）
+
+        robot_radius > 0 时离墙壁不超过robot_radius的格子也视为墙壁（查距离场，
+        与半径无关的O(1)）。起点和终点不必是通道：搜索总可以离开起点，
+        终点可以作为终点进入。
+        """
+        if self.robot_radius <= 0:
+            return self.maze
+        if self.inflated_maze is None or self.inflated_version != self.radar.map_version:
+            field = self.radar.get_distance_field()
+            self.inflated_maze = (~clearance_mask(field, self.robot_radius)).astype(np.uint8)
+            self.inflated_version = self.radar.map_version
+        return self.inflated_maze
+
+    def get_hierarchical_planner(self):
+        """分层规划器（第一次调用时构建）"""
+        if self.hierarchical_planner is None:
+            self.hierarchical_planner = HierarchicalPlanner(self.planning_grid())
+        return self.hierarchical_planner
+
+    def known_blocked(self, key, unknown_free):
+        """
+        按当前已知信息判断格子是否不可通行
+
+        Args:
+            key: numpy索引，... 表示整张地图，(rows, cols) 表示一批格子
+            unknown_free: True时只有已探索的墙壁（及膨胀格子）不可通行，未探索的格子
+                          视为可通行（走向固定目标）；False时只有已探索的通道可通行
+                          （走向frontier）
+        """
+        if unknown_free:
+            return self.explored_map[key] & (self.planning_grid()[key] != 0)
+        return ~(self.explored_map[key] & (self.maze[key] == 0))
+
+    def replanning(self):
+        """是否有进行中的自动移动或D* Lite规划（需要记录新扫描或修改的格子）"""
+        return (self.replanner is not None or self.follow_path is not None or
+                self.explore_replanner is not None)
+
+    def is_known_wall(self, cell):
+        return bool(self.explored_map[cell] and self.maze[cell] != 0)
+
+    def sync_replanners(self):
+        """
+        把上次规划之后新扫描或修改的格子交给D* Lite，只修补受影响的部分
+
+        沿follow_path移动时只检查这些格子是否让剩余路径不可通行，是才建立replanner。
+        """
+        if not self.replan_changes:
+            return
+        rows, cols = np.array(sorted(self.replan_changes)).T
+        self.replan_changes = set()
+        cells = list(zip(rows.tolist(), cols.tolist()))
+        for replanner, unknown_free in ((self.replanner, True), (self.explore_replanner, False)):
+            if replanner is not None:
+                replanner.update_cells(cells, self.known_blocked((rows, cols), unknown_free).tolist())
+        if self.follow_path is not None and self.follow_path_blocked(cells):
+            self.start_replanner()
+        if self.replanner is not None:
+            # 目标本身总可以进入：已知变成墙壁的目标要去掉，否则会一直往里撞
+            goals = [goal for goal in self.replan_goals if not self.is_known_wall(goal)]
+            if len(goals) < len(self.replan_goals):
+                self.replan_goals = goals
+                self.replanner.set_goals(goals)
+
+    def follow_path_blocked(self, cells):
+        """cells中是否有已知不可通行的格子落在follow_path的剩余部分（目标只看是否是墙壁）"""
+        for cell in cells:
+            if self.follow_cells.get(cell, -1) <= self.follow_index:
+                continue
+            if cell in self.replan_goals:
+                if self.is_known_wall(cell):
+                    return True
+            elif self.explored_map[cell] and self.planning_grid()[cell] != 0:
+                return True
+        return False
+
+    def start_replanner(self):
+        """不再沿follow_path移动，在当前的已知地图上建立D* Lite"""
+        self.follow_path = None
+        self.follow_cells = {}
+        self.replan_goals = [goal for goal in self.replan_goals if not self.is_known_wall(goal)]
+        self.replanner = DStarLite(self.known_blocked(..., True), self.player_pos, self.replan_goals)
+        self.search_stats['replans'] += 1
+
+    def start_replanning(self, goals, path=None):
+        """
+        开始走向goals（之后每次调用replan_step走一步）
+
+        给出path（从当前位置出发、已按整张地图规划好的路径，如path_home的结果）时
+        先沿它移动，不再重复一次完整搜索；新扫描或修改的格子让剩余路径不可通行时
+        才在已知地图上建立D* Lite（未探索的格子视为可通行），之后只修补受影响的
+        部分搜索。
+
+        Returns:
+            当前规划的路径，没有可达目标时为None
+        """
+        # 先把未同步的格子交给仍在进行的规划，新规划直接按当前的已知地图构建
+        self.stop_replanning()
+        self.sync_replanners()
+        self.replan_goals = [tuple(goal) for goal in goals]
+        if path is not None and tuple(path[0]) == tuple(self.player_pos):
+            self.follow_path = [tuple(cell) for cell in path]
+            self.follow_cells = {cell: i for i, cell in enumerate(self.follow_path)}
+            self.follow_index = 0
+            return self.follow_path
+        self.start_replanner()
+        return self.replanner.path()
+
+    def replan_path(self):
+        """当前规划的剩余路径（没有进行中的规划或不可达时为None）"""
+        if self.replanner is None and self.follow_path is None:
+            return None
+        self.sync_replanners()
+        if self.replanner is not None:
+            return self.replanner.path()
+        return self.follow_path[self.follow_index:]
+
+    def replan_step(self):
+        """
+        沿当前路径走一步
+
+        先按新扫描或修改的格子修补搜索（或检查follow_path）再选下一步；撞到还没
+        扫描到的墙壁时把它记为已探索并重新选择。
+
+        Returns:
+            是否移动了一步（已到达目标、没有可达目标、下一步是已知走不进的格子
+            或没有进行中的规划时为False）
+        """
+        if self.replanner is None and self.follow_path is None:
+            return False
+        while True:
+            self.sync_replanners()
+            if self.replanner is None and self.follow_path[self.follow_index] != tuple(self.player_pos):
+                self.start_replanner()  # 期间被手动移动过，离开了路径
+            if self.replanner is not None:
+                self.search_stats['replans'] += 1
+                next_cell = self.replanner.next_cell()
+            elif self.follow_index + 1 < len(self.follow_path):
+                next_cell = self.follow_path[self.follow_index + 1]
+            else:
+                next_cell = None
+            if next_cell is None:
+                return False
+            if self.move(next_cell[0] - self.player_pos[0], next_cell[1] - self.player_pos[1]):
+                if self.replanner is None:
+                    self.follow_index += 1
+                return True
+            if self.explored_map[next_cell]:
+                return False  # 已知的格子仍然走不进去，不再重试
+            self.explored_map[next_cell] = True
+            self.frontier_tracker.update([next_cell])
+            self.replan_changes.add(next_cell)
+
+    def stop_replanning(self):
+        self.replanner = None
+        self.replan_goals = []
+        self.follow_path = None
+        self.follow_cells = {}
+
+    def frontier_replan(self, reachable):
+        """
+        用D* Lite求到最近frontier的路径（explore_planner='dstar'）
+
+        搜索状态在各步之间保留，每步只按新扫描的格子和frontier的增减修补。
+        """
+        if self.explore_replanner is None:
+            self.sync_replanners()
+            self.explore_replanner = DStarLite(self.known_blocked(..., False), self.player_pos, reachable)
+        else:
+            self.sync_replanners()
+            self.explore_replanner.set_goals(reachable)
+        self.search_stats['replans'] += 1
+        return self.explore_replanner.path()
+
+    def find_exits(self):
+        """寻找迷宫的可能出口：离起点足够远的可通行边界点"""
+        self.exits = []
+
+        # 检查四个边界上的可通行点
+        for i in range(self.maze_height):
+            for j in range(self.maze_width):
+                # 只检查边界位置
+                is_boundary = (i == 0 or i == self.maze_height - 1 or
+                               j == 0 or j == self.maze_width - 1)
+
+                if is_boundary and self.maze[i, j] == 0 and self.calc_dist(self.start_pos[0], self.start_pos[1], i, j) > 10:  # 可通行的边界点
+                    self.exits.append((i, j))
+
+        self.log(f"找到 {len(self.exits)} 个可能的出口: {self.exits}")
+
+    def path_home(self):
+        """回到起始位置的路径，找不到时为None"""
+        self.search_stats['path_searches'] += 1
+        if self.path_planner == 'hpa':
+            path, _ = self.get_hierarchical_planner().find_path(self.player_pos, [self.start_pos])
+            return path
+        path, _ = multi_target_bfs(self.planning_grid(), tuple(self.player_pos), [tuple(self.start_pos)])
+        return path
+
+    def path_to_exit(self):
+        """
+        到最近出口的路径，找不到时为None
+
+        一次多目标搜索求出到所有出口的距离（保存在exit_distances中）和最近出口的路径；
+        path_planner='hpa'时距离是分层图上的上界，选出的出口不一定是真正最近的
+        """
+        self.search_stats['path_searches'] += 1
+        if self.path_planner == 'hpa':
+            path, self.exit_distances = self.get_hierarchical_planner().find_path(self.player_pos, self.exits)
+            return path
+        path, self.exit_distances = multi_target_bfs(self.planning_grid(), tuple(self.player_pos), self.exits)
+        return path
+
+    def follow_path(self, path, timeout=None):
+        """
+        沿路径逐步移动（path[0]为当前位置）
+
+        Args:
+            timeout: 最长运行时间（秒），每步之间检查，None表示不限制
+
+        Returns:
+            实际移动的步数（遇到障碍或超时时提前停止）
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        steps = 0
+        for next_pos in path[1:]:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if not self.move(next_pos[0] - self.player_pos[0], next_pos[1] - self.player_pos[1]):
+                break
+            steps += 1
+        return steps
+
+    def clear_trail(self):
+        """清空轨迹"""
+        self.player_trail = [tuple(self.player_pos)]
+
+    def set_maze_cell(self, row, col, value):
+        """修改迷宫中的一个格子（0通道，1墙壁），雷达缓存和frontier随之更新"""
+        self.radar.set_cell(row, col, value)
+        self.frontier_tracker.update([(row, col)])
+        if not self.replanning() and self.hierarchical_planner is None:
+            return
+        # 膨胀时离该格子robot_radius以内的格子的可通行性都可能变化
+        reach = int(np.ceil(self.robot_radius))
+        cells = [(r, c)
+                 for r in range(max(row - reach, 0), min(row + reach + 1, self.maze_height))
+                 for c in range(max(col - reach, 0), min(col + reach + 1, self.maze_width))]
+        if self.hierarchical_planner is not None:
+            self.hierarchical_planner.update(cells, self.planning_grid())
+        if self.replanning():
+            self.replan_changes.update(cells)
@@ -0,0 +1,84 @@
+import numpy as np
+
+# 四邻域方向
+NEIGHBORS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+def compute_frontier_mask(explored_map, maze):
+    """
+    向量化计算frontier掩码
+
+    frontier定义：未探索、且至少有一个四邻域邻居是已探索通道的格子。
+
+    Args:
+        explored_map: 二维布尔数组，True表示已探索
+        maze: 二维数组，0表示通道，1表示墙壁
+
+    Returns:
+        mask: 二维布尔数组，True表示frontier
+    """
+    known_free = explored_map & (maze == 0)
+    adjacent = np.zeros_like(known_free)
+    adjacent[1:, :] |= known_free[:-1, :]
+    adjacent[:-1, :] |= known_free[1:, :]
+    adjacent[:, 1:] |= known_free[:, :-1]
+    adjacent[:, :-1] |= known_free[:, 1:]
+    return adjacent & ~explored_map
+
+
+class FrontierTracker:
+    """增量维护frontier集合，只重新判断新探索格子及其邻居"""
+
+    def __init__(self, maze, explored_map, bulk_ratio=0.05):
+        """
+        Args:
+            maze: 二维数组，0表示通道，1表示墙壁
+            explored_map: 二维布尔数组（与调用方共享，原地更新）
+            bulk_ratio: 一次更新的格子数超过地图的该比例时改用整图向量化重算
+        """
+        self.maze = maze
+        self.explored_map = explored_map
+        self.height, self.width = maze.shape
+        self.bulk_threshold = max(1, int(bulk_ratio * maze.size))
+        self.frontiers = set()
+        self.recompute()
+
+    def recompute(self):
+        """整图向量化重算frontier集合"""
+        mask = compute_frontier_mask(self.explored_map, self.maze)
+        self.frontiers = set(map(tuple, np.argwhere(mask).tolist()))
+
+    def is_frontier(self, i, j):
+        if self.explored_map[i, j]:
+            return False
+        for dy, dx in NEIGHBORS:
+            r, c = i + dy, j + dx
+            if 0 <= r < self.height and 0 <= c < self.width:
+                if self.explored_map[r, c] and self.maze[r, c] == 0:
+                    return True
+        return False
+
+    def update(self, new_cells):
+        """
+        新探索了一批格子后更新frontier集合
+
+        Args:
+            new_cells: 新标记为已探索的格子 [(row, col), ...]
+        """
+        if len(new_cells) > self.bulk_threshold:
+            self.recompute()
+            return
+
+        candidates = set()
+        for i, j in new_cells:
+            candidates.add((i, j))
+            for dy, dx in NEIGHBORS:
+                r, c = i + dy, j + dx
+                if 0 <= r < self.height and 0 <= c < self.width:
+                    candidates.add((r, c))
+
+        for cell in candidates:
+            if self.is_frontier(*cell):
+                self.frontiers.add(cell)
+            else:
+                self.frontiers.discard(cell)
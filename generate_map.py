@@ -1,6 +1,15 @@
+import hashlib
 import json
+import os
 import numpy as np
 
+from spatial_index import SegmentIndex
+from tiled_map import TILE_SIZE, TiledMap
+
+# 地图缓存的默认目录；栅格化方式改变时递增版本号使旧缓存失效
+MAP_CACHE_DIR = '.map_cache'
+MAP_CACHE_VERSION = 1
+
 def draw_line(grid, start, end):
     """使用Bresenham算法在网格上绘制线段"""
     x0, y0 = start
@@ -34,51 +43,243 @@ def draw_line(grid, start, end):
             error += dx
             y += y_step
 
-def generate_map_from_json(json_file):
-    """从JSON文件生成二维数组地图"""
-    resolution = 5
-    # 读取JSON文件
-    with open(json_file, 'r') as f:
-        data = json.load(f)
+def rasterize_segments(grid, starts, ends):
+    """
+    在网格上一次绘制所有线段，结果与逐条调用draw_line完全相同
+
+    水平和竖直线段直接用切片赋值；其余线段一起计算Bresenham像素：
+    沿主轴第i步时副轴偏移为 (2*i*副轴长度 + 主轴长度 - 1) // (2*主轴长度)
+    （与draw_line一样在恰好一半时向下取整），最后一次花式索引赋值。
+
+    Args:
+        grid: 二维数组，原地修改
+        starts: 线段起点数组 (N, 2)，每行为 [x, y]
+        ends: 线段终点数组 (N, 2)，每行为 [x, y]
+    """
+    starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=np.int64).reshape(-1, 2)
+    height, width = grid.shape
+    
+    # 水平/竖直线段（包括单点）：切片赋值，超出网格的部分裁掉
+    axis_aligned = (starts[:, 0] == ends[:, 0]) | (starts[:, 1] == ends[:, 1])
+    lo = np.minimum(starts[axis_aligned], ends[axis_aligned])
+    hi = np.maximum(starts[axis_aligned], ends[axis_aligned])
+    for x0, y0, x1, y1 in np.hstack([lo, hi]).tolist():
+        if x1 < 0 or y1 < 0 or x0 >= width or y0 >= height:
+            continue
+        grid[max(y0, 0):y1 + 1, max(x0, 0):x1 + 1] = 1
+    
+    # 斜线段：所有像素一起计算
+    starts = starts[~axis_aligned]
+    ends = ends[~axis_aligned]
+    if len(starts) == 0:
+        return
+    delta = ends - starts
+    length = np.abs(delta)
+    step = np.sign(delta)
+    x_major = length[:, 0] >= length[:, 1]
+    major = np.where(x_major, length[:, 0], length[:, 1])
+    minor = np.where(x_major, length[:, 1], length[:, 0])
     
+    # 第k条线段有major[k] + 1个像素，i为像素在线段内的序号
+    counts = major + 1
+    segment = np.repeat(np.arange(len(starts)), counts)
+    i = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    minor_offset = (2 * i * minor[segment] + major[segment] - 1) // (2 * major[segment])
+    
+    x_major = x_major[segment]
+    xs = starts[segment, 0] + step[segment, 0] * np.where(x_major, i, minor_offset)
+    ys = starts[segment, 1] + step[segment, 1] * np.where(x_major, minor_offset, i)
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    grid[ys[inside], xs[inside]] = 1
+
+def thicken_walls(grid, wall_thickness):
+    """
+    把墙壁加粗为wall_thickness像素（以原线条为中心的方形膨胀，超出网格的部分裁掉）
+
+    Args:
+        grid: 二维数组，1表示墙壁
+        wall_thickness: 墙壁厚度（像素），1表示不加粗
+
+    Returns:
+        加粗后的新数组
+    """
+    walls = grid == 1
+    thick = walls.copy()
+    height, width = grid.shape
+    for dy in range(-((wall_thickness - 1) // 2), wall_thickness // 2 + 1):
+        for dx in range(-((wall_thickness - 1) // 2), wall_thickness // 2 + 1):
+            thick[max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)] |= \
+                walls[max(-dy, 0):height + min(-dy, 0), max(-dx, 0):width + min(-dx, 0)]
+    return thick.astype(grid.dtype)
+
+def map_cache_key(json_bytes, resolution, wall_thickness):
+    """地图缓存的键：JSON内容和生成参数的哈希"""
+    digest = hashlib.sha256(json_bytes)
+    digest.update(f'|resolution={float(resolution)!r}|wall_thickness={int(wall_thickness)}|v{MAP_CACHE_VERSION}'.encode())
+    return digest.hexdigest()
+
+def scale_segments(data, resolution=5):
+    """
+    把JSON中的线段按分辨率放大到格子坐标
+
+    Args:
+        data: JSON数据，包含segments和可选的start_point
+        resolution: 每个JSON坐标单位对应的格子数
+
+    Returns:
+        starts, ends: 线段起点和终点数组 (N, 2)，每行为 [x, y]
+        shape: 地图形状 (行数, 列数)
+        start_pos: 起始位置 [row, col]
+    """
     segments = data['segments']
     start_point = data.get('start_point', [0, 0])  # 获取起始点
     
-    # 找到所有坐标的边界，并放大10倍
-    max_x = 0
-    max_y = 0
+    # 坐标按分辨率放大（坐标格式是[x, y]，但数组索引是[行, 列] = [y, x]）
+    starts = np.rint(np.array([segment['start'] for segment in segments]).reshape(-1, 2) * resolution).astype(np.int64)
+    ends = np.rint(np.array([segment['end'] for segment in segments]).reshape(-1, 2) * resolution).astype(np.int64)
     
-    for segment in segments:
-        start = segment['start']
-        end = segment['end']
-        
-        # 坐标放大10倍
-        start_scaled = [start[0] * resolution, start[1] * resolution]
-        end_scaled = [end[0] * resolution, end[1] * resolution]
-        
-        max_x = max(max_x, start_scaled[0], end_scaled[0])
-        max_y = max(max_y, start_scaled[1], end_scaled[1])
+    # 找到所有坐标的边界（行数 = max_y + 1, 列数 = max_x + 1）
+    max_x = max(0, starts[:, 0].max(initial=0), ends[:, 0].max(initial=0))
+    max_y = max(0, starts[:, 1].max(initial=0), ends[:, 1].max(initial=0))
     
-    # 创建二维数组（行数 = max_y + 1, 列数 = max_x + 1）
-    grid = np.zeros((max_y + 1, max_x + 1), dtype=int)
+    # 计算起始位置（放大resolution倍）
+    start_pos = [int(round(start_point[1] * resolution)), int(round(start_point[0] * resolution))]  # [row, col]
     
-    # 绘制所有线段
-    for segment in segments:
-        start = segment['start']
-        end = segment['end']
-        
-        # 坐标放大10倍
-        start_scaled = [start[0] * resolution, start[1] * resolution]
-        end_scaled = [end[0] * resolution, end[1] * resolution]
-        
-        # 绘制线段（注意：坐标格式是[x, y]，但数组索引是[行, 列] = [y, x]）
-        draw_line(grid, start_scaled, end_scaled)
+    return starts, ends, (int(max_y) + 1, int(max_x) + 1), start_pos
+
+def build_map(data, resolution=5, wall_thickness=1):
+    """
+    由JSON数据栅格化出二维数组地图
+
+    Args:
+        data: JSON数据，包含segments和可选的start_point
+        resolution: 每个JSON坐标单位对应的格子数
+        wall_thickness: 墙壁厚度（格子数）
+
+    Returns:
+        grid: 二维数组，0表示通道，1表示墙壁
+        start_pos: 起始位置 [row, col]
+    """
+    starts, ends, shape, start_pos = scale_segments(data, resolution)
     
-    # 计算起始位置（放大10倍）
-    start_pos = [start_point[1] * resolution, start_point[0] * resolution]  # [row, col] = [* resolution, * resolution]
+    # 创建二维数组并绘制所有线段
+    grid = np.zeros(shape, dtype=np.uint8)
+    rasterize_segments(grid, starts, ends)
+    if wall_thickness > 1:
+        grid = thicken_walls(grid, wall_thickness)
     
     return grid, start_pos
 
+def generate_tiled_map_from_json(json_file, path, resolution=5, wall_thickness=1, tile_size=TILE_SIZE):
+    """
+    从JSON文件生成瓦片地图（见tiled_map.TiledMap），适用于放不进内存的大地图
+
+    按瓦片行逐带栅格化：每一带只绘制与之相交的线段（加粗墙壁时多画上下
+    若干行再裁掉），写入内存映射文件后释放，峰值内存只有一行瓦片。
+    结果与generate_map_from_json完全相同。
+
+    Args:
+        json_file: 地图JSON文件
+        path: 瓦片地图目录
+        resolution: 每个JSON坐标单位对应的格子数
+        wall_thickness: 墙壁厚度（格子数）
+        tile_size: 瓦片边长
+
+    Returns:
+        以'r+'模式打开的TiledMap
+    """
+    with open(json_file, 'r') as f:
+        data = json.load(f)
+    starts, ends, (height, width), start_pos = scale_segments(data, resolution)
+    tiled = TiledMap.create(path, height, width, tile_size, start_pos)
+    
+    # 加粗后第y行的墙壁来自第 y - below .. y + above 行的线条
+    above, below = (wall_thickness - 1) // 2, wall_thickness // 2
+    top = np.minimum(starts[:, 1], ends[:, 1])
+    bottom = np.maximum(starts[:, 1], ends[:, 1])
+    for row0 in range(0, height, tile_size):
+        row1 = min(row0 + tile_size, height)
+        band0, band1 = max(row0 - below, 0), min(row1 + above, height)
+        selected = (bottom >= band0) & (top < band1)
+        offset = np.array([0, band0])
+        band = np.zeros((band1 - band0, width), dtype=np.uint8)
+        rasterize_segments(band, starts[selected] - offset, ends[selected] - offset)
+        if wall_thickness > 1:
+            band = thicken_walls(band, wall_thickness)
+        tiled.write_rows(row0, band[row0 - band0:row1 - band0])
+    tiled.flush()
+    return tiled
+
+def generate_map_from_json(json_file, resolution=5, wall_thickness=1, cache_dir=None):
+    """
+    从JSON文件生成二维数组地图
+
+    指定cache_dir时，生成的地图以uint8的.npy保存在该目录下，文件名为JSON内容
+    和参数的哈希；之后再次调用直接以mmap_mode='c'（写时复制，修改不会写回
+    文件）内存映射该文件，不再栅格化。
+
+    Args:
+        json_file: 地图JSON文件
+        resolution: 每个JSON坐标单位对应的格子数
+        wall_thickness: 墙壁厚度（格子数）
+        cache_dir: 地图缓存目录，None表示不缓存
+
+    Returns:
+        grid: 二维数组，0表示通道，1表示墙壁（使用缓存时为uint8内存映射数组）
+        start_pos: 起始位置 [row, col]
+    """
+    # 读取JSON文件
+    with open(json_file, 'rb') as f:
+        json_bytes = f.read()
+    
+    if cache_dir is None:
+        return build_map(json.loads(json_bytes), resolution, wall_thickness)
+    
+    key = map_cache_key(json_bytes, resolution, wall_thickness)
+    grid_file = os.path.join(cache_dir, key + '.npy')
+    meta_file = os.path.join(cache_dir, key + '.json')
+    if os.path.exists(grid_file) and os.path.exists(meta_file):
+        with open(meta_file, 'r') as f:
+            start_pos = json.load(f)['start_pos']
+        return np.load(grid_file, mmap_mode='c'), start_pos
+    
+    grid, start_pos = build_map(json.loads(json_bytes), resolution, wall_thickness)
+    
+    # 先写临时文件再改名，避免并发进程读到写了一半的缓存
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_suffix = f'.{os.getpid()}.tmp'
+    with open(grid_file + tmp_suffix, 'wb') as f:
+        np.save(f, grid.astype(np.uint8))
+    with open(meta_file + tmp_suffix, 'w') as f:
+        json.dump({'start_pos': start_pos, 'shape': list(grid.shape),
+                   'resolution': resolution, 'wall_thickness': wall_thickness}, f)
+    os.replace(grid_file + tmp_suffix, grid_file)
+    os.replace(meta_file + tmp_suffix, meta_file)
+    
+    return np.load(grid_file, mmap_mode='c'), start_pos
+
+def segment_index_from_json(json_file, resolution=5, cell_size=None):
+    """
+    从JSON文件构建墙壁线段的空间索引（不生成栅格地图）
+
+    线段坐标与generate_map_from_json生成的地图一致（格子坐标 [x, y] = [列, 行]）。
+
+    Args:
+        json_file: 地图JSON文件
+        resolution: 每个JSON坐标单位对应的格子数
+        cell_size: 索引的桶边长，None时自动选择
+
+    Returns:
+        index: SegmentIndex
+        shape: 对应栅格地图的形状 (行数, 列数)
+        start_pos: 起始位置 [row, col]
+    """
+    with open(json_file, 'r') as f:
+        data = json.load(f)
+    starts, ends, shape, start_pos = scale_segments(data, resolution)
+    return SegmentIndex(starts, ends, cell_size), shape, start_pos
+
 def print_map(grid):
     """打印地图（可选：用于小地图的可视化）"""
     print(f"地图大小: {grid.shape[0]} 行 x {grid.shape[1]} 列")
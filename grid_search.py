@@ -0,0 +1,242 @@
+import heapq
+import time
+from collections import deque
+from array import array
+import numpy as np
+
+# 四邻域移动方向（与MazeWalker中的顺序一致）
+NEIGHBORS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+def reconstruct_path(parent, end, width):
+    """
+    根据父节点数组重构路径
+
+    Args:
+        parent: 一维父节点数组，起点的父节点为-1
+        end: 终点的一维索引
+        width: 地图宽度
+
+    Returns:
+        path: 从起点到终点的路径 [(row, col), ...]
+    """
+    path = []
+    index = end
+    while index != -1:
+        path.append(divmod(index, width))
+        index = parent[index]
+    return path[::-1]
+
+
+def multi_target_bfs(maze, start, targets):
+    """
+    多目标最短路：从起点做一次BFS，求到所有目标点的距离
+
+    所有目标都被访问到（或可达区域搜索完）后停止，因此一次搜索即可
+    得到最近目标的路径以及到每个目标的步数。起点和目标可以不是通道
+    （例如膨胀后离墙太近的格子）：起点总可以离开，目标只能作为终点进入。
+
+    Args:
+        maze: 二维数组，0表示通道，1表示墙壁
+        start: 起点 (row, col)
+        targets: 目标点列表 [(row, col), ...]
+
+    Returns:
+        best_path: 到最近目标的路径（距离相同时取targets中靠前的），不可达则为None
+        distances: 字典，键为目标点，值为步数，不可达则为None
+    """
+    height, width = maze.shape
+    free = (np.asarray(maze) == 0).ravel().tobytes()
+    parent = array('l', [-1]) * (height * width)
+    dist = array('l', [-1]) * (height * width)
+
+    start_index = start[0] * width + start[1]
+    dist[start_index] = 0
+
+    target_set = {t[0] * width + t[1] for t in targets
+                  if 0 <= t[0] < height and 0 <= t[1] < width}
+    remaining = set(target_set)
+    remaining.discard(start_index)
+
+    queue = deque([start_index])
+    while queue and remaining:
+        current = queue.popleft()
+        if not free[current] and current != start_index:
+            continue  # 不可通行的目标只作为终点
+        row, col = divmod(current, width)
+        for dy, dx in NEIGHBORS:
+            r, c = row + dy, col + dx
+            if not (0 <= r < height and 0 <= c < width):
+                continue
+            neighbor = r * width + c
+            if dist[neighbor] != -1 or (not free[neighbor] and neighbor not in target_set):
+                continue
+            dist[neighbor] = dist[current] + 1
+            parent[neighbor] = current
+            remaining.discard(neighbor)
+            queue.append(neighbor)
+
+    distances = {}
+    best_path = None
+    best_distance = None
+    for target in targets:
+        row, col = target
+        d = None
+        if 0 <= row < height and 0 <= col < width:
+            d = dist[row * width + col]
+            d = None if d == -1 else d
+        distances[tuple(target)] = d
+        if d is not None and (best_distance is None or d < best_distance):
+            best_distance = d
+            best_path = reconstruct_path(parent, row * width + col, width)
+
+    return best_path, distances
+
+
+def nearest_target_search(passable, start, targets, penalty_cells=(), penalty=5, on_stats=None):
+    """
+    从起点做一次BFS距离场搜索，找到路径最近的目标点
+
+    只在passable格子上扩展；目标点可以不在passable中（例如未探索的frontier），
+    但只能作为终点进入。按距离从小到大出队，第一个出队的目标就是真正
+    路径最近的目标，搜索随即结束，路径由父节点数组直接得到。
+
+    Args:
+        passable: 二维布尔数组，True表示可通行（如已探索的通道）
+        start: 起点 (row, col)
+        targets: 目标点集合 {(row, col), ...}
+        penalty_cells: 需要额外代价的格子（如最近走过的位置）
+        penalty: 进入penalty_cells的额外代价（存在惩罚时按Dijkstra扩展）
+        on_stats: 回调函数，每次调用结束时传入统计字典（同astar_search）
+                  {'expansions': 扩展节点数, 'pushes': 入堆次数, 'time': 耗时(秒)}
+
+    Returns:
+        path: 到最近目标的路径 [(row, col), ...]，没有可达目标时为None
+        settled: 出队（定下距离）的格子数
+    """
+    t0 = time.perf_counter()
+    height, width = passable.shape
+    free = np.asarray(passable, dtype=bool).ravel().tobytes()
+    target_set = {r * width + c for r, c in targets}
+    penalty_set = {r * width + c for r, c in penalty_cells}
+
+    start_index = start[0] * width + start[1]
+    dist = array('l', [-1]) * (height * width)
+    parent = array('l', [-1]) * (height * width)
+    dist[start_index] = 0
+
+    heap = [(0, start_index)]
+    settled = 0
+    pushes = 1
+    path = None
+    while heap:
+        d, current = heapq.heappop(heap)
+        if d != dist[current]:
+            continue
+        settled += 1
+        if current in target_set and current != start_index:
+            path = reconstruct_path(parent, current, width)
+            break
+
+        row, col = divmod(current, width)
+        for dy, dx in NEIGHBORS:
+            r, c = row + dy, col + dx
+            if not (0 <= r < height and 0 <= c < width):
+                continue
+            neighbor = r * width + c
+            if not free[neighbor] and neighbor not in target_set:
+                continue
+            nd = d + 1
+            if neighbor in penalty_set:
+                nd += penalty
+            if dist[neighbor] == -1 or nd < dist[neighbor]:
+                dist[neighbor] = nd
+                parent[neighbor] = current
+                heapq.heappush(heap, (nd, neighbor))
+                pushes += 1
+
+    if on_stats is not None:
+        on_stats({'expansions': settled, 'pushes': pushes,
+                  'time': time.perf_counter() - t0})
+    return path, settled
+
+
+def astar_search(maze, start, goal, penalty_cells=(), penalty=5, on_stats=None):
+    """
+    四邻域A*寻路（曼哈顿启发）
+
+    开放列表为带惰性删除的二叉堆：g值变小时直接压入新条目，出队时跳过
+    已关闭或过期的条目；in_open记录格子是否在开放列表中，g值保存在
+    NumPy数组中，不再在每次扩展时遍历整个堆。
+
+    Args:
+        maze: 二维数组，0表示通道，1表示墙壁
+        start: 起点 (row, col)
+        goal: 终点 (row, col)
+        penalty_cells: 需要额外代价的格子（如最近走过的位置）
+        penalty: 进入penalty_cells的额外代价
+        on_stats: 回调函数，每次调用结束时传入统计字典
+                  {'expansions': 扩展节点数, 'pushes': 入堆次数, 'time': 耗时(秒)}
+
+    Returns:
+        path: 路径 [(row, col), ...]，没有找到路径时为None
+    """
+    t0 = time.perf_counter()
+    height, width = maze.shape
+    free = (np.asarray(maze) == 0).ravel().tobytes()
+    penalty_set = {r * width + c for r, c in penalty_cells}
+    goal_row, goal_col = goal
+    goal_index = goal_row * width + goal_col
+    start_index = start[0] * width + start[1]
+
+    g_score = np.full(height * width, np.inf)
+    parent = array('l', [-1]) * (height * width)
+    in_open = bytearray(height * width)
+    closed = bytearray(height * width)
+
+    g_score[start_index] = 0
+    heap = [(abs(start[0] - goal_row) + abs(start[1] - goal_col), start_index)]
+    in_open[start_index] = 1
+    expansions = 0
+    pushes = 1
+    path = None
+
+    while heap:
+        _, current = heapq.heappop(heap)
+        if closed[current]:
+            continue  # 过期条目（该格子已用更小的g值扩展过）
+
+        if current == goal_index:
+            path = reconstruct_path(parent, current, width)
+            break
+
+        in_open[current] = 0
+        closed[current] = 1
+        expansions += 1
+        current_g = g_score[current]
+
+        row, col = divmod(current, width)
+        for dy, dx in NEIGHBORS:
+            r, c = row + dy, col + dx
+            if not (0 <= r < height and 0 <= c < width):
+                continue
+            neighbor = r * width + c
+            if not free[neighbor] or closed[neighbor]:
+                continue
+
+            tentative_g = current_g + 1
+            if neighbor in penalty_set:
+                tentative_g += penalty
+
+            if in_open[neighbor] and tentative_g >= g_score[neighbor]:
+                continue
+            parent[neighbor] = current
+            g_score[neighbor] = tentative_g
+            in_open[neighbor] = 1
+            heapq.heappush(heap, (tentative_g + abs(r - goal_row) + abs(c - goal_col), neighbor))
+            pushes += 1
+
+    if on_stats is not None:
+        on_stats({'expansions': expansions, 'pushes': pushes,
+                  'time': time.perf_counter() - t0})
+    return path
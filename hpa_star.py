@@ -0,0 +1,361 @@
+"""
+分层寻路（HPA*）
+
+地图切成 cluster_size x cluster_size 的簇。相邻两簇的公共边界上，两侧都可
+通行的连续格子段是一个入口：短段取中点，长段取两端，入口两侧的格子成为
+抽象图的节点，跨边界的一对节点之间代价为1。每个簇内用BFS预先求出节点
+两两之间（只在簇内走）的步数作为簇内边。
+
+查询时把起点和终点在各自簇内连到节点上（目标的连接按簇缓存），在抽象图上
+用A*搜索，再把选中的抽象边逐段细化为格子路径（簇内BFS，结果缓存）。
+搜索的是抽象节点而不是格子，比整图BFS快得多，但耗时仍随簇数增长（只有
+一层抽象）。路径接近最短但不保证最短（簇内走法最优，跨簇只能经过入口）。
+
+地图修改后调用update(格子)或sync(新地图)：只重建这些格子所在的簇、它们的
+边界入口，以及入口发生变化的相邻簇。
+"""
+import heapq
+from array import array
+from collections import deque
+
+import numpy as np
+
+CLUSTER_SIZE = 16
+# 入口段长度超过此值时在两端各放一个入口，否则只在中点放一个
+ENTRANCE_SPLIT = 6
+
+
+class HierarchicalPlanner:
+    """四邻域网格上的HPA*，0表示通道，非0表示墙壁"""
+
+    def __init__(self, maze, cluster_size=CLUSTER_SIZE):
+        """
+        Args:
+            maze: 二维数组，0表示通道，1表示墙壁（保存一份可通行掩码的副本）
+            cluster_size: 簇的边长（格子数）
+        """
+        self.free = np.asarray(maze) == 0
+        self.height, self.width = self.free.shape
+        self.cluster_size = cluster_size
+        self.clusters_y = -(-self.height // cluster_size)
+        self.clusters_x = -(-self.width // cluster_size)
+
+        self.border_links = {}   # 边界 (簇, 右/下相邻簇) -> [(本侧格子, 对侧格子), ...]
+        self.inter = {}          # 节点 -> {跨边界相连的节点}
+        self.cluster_nodes = {}  # 簇 -> {节点}
+        self.intra = {}          # 簇 -> {节点: {同簇节点: 簇内步数}}
+        self.path_cache = {}     # 簇 -> {(节点a, 节点b): 簇内路径}
+        self.connections = {}    # 簇 -> {格子: {节点: 簇内步数}}，簇重建时清空
+        self.stats = {'clusters_built': 0, 'borders_built': 0, 'queries': 0,
+                      'abstract_expansions': 0, 'connect_searches': 0}
+        self.build()
+
+    def build(self):
+        """完整构建抽象图"""
+        for cy in range(self.clusters_y):
+            for cx in range(self.clusters_x):
+                for key in self.cluster_borders((cy, cx)):
+                    if key[0] == (cy, cx):
+                        self.build_border(key)
+        for cy in range(self.clusters_y):
+            for cx in range(self.clusters_x):
+                self.build_cluster((cy, cx))
+
+    def cluster_of(self, cell):
+        return (cell[0] // self.cluster_size, cell[1] // self.cluster_size)
+
+    def cluster_bounds(self, cluster):
+        """簇覆盖的范围 [row0, row1) x [col0, col1)"""
+        size = self.cluster_size
+        row0, col0 = cluster[0] * size, cluster[1] * size
+        return row0, min(row0 + size, self.height), col0, min(col0 + size, self.width)
+
+    def cluster_borders(self, cluster):
+        """簇的四条边界，键为 (上/左侧簇, 下/右侧簇)"""
+        cy, cx = cluster
+        keys = []
+        if cx + 1 < self.clusters_x:
+            keys.append(((cy, cx), (cy, cx + 1)))
+        if cx > 0:
+            keys.append(((cy, cx - 1), (cy, cx)))
+        if cy + 1 < self.clusters_y:
+            keys.append(((cy, cx), (cy + 1, cx)))
+        if cy > 0:
+            keys.append(((cy - 1, cx), (cy, cx)))
+        return keys
+
+    def build_border(self, key):
+        """
+        重新计算一条边界上的入口
+
+        Returns:
+            入口是否发生了变化
+        """
+        (cy, cx), (cy2, cx2) = key
+        row0, row1, col0, col1 = self.cluster_bounds((cy, cx))
+        if cx2 != cx:
+            # 竖直边界：左簇最右一列与右簇最左一列
+            open_pairs = self.free[row0:row1, col1 - 1] & self.free[row0:row1, col1]
+            make = lambda i: ((row0 + i, col1 - 1), (row0 + i, col1))
+        else:
+            # 水平边界：上簇最下一行与下簇最上一行
+            open_pairs = self.free[row1 - 1, col0:col1] & self.free[row1, col0:col1]
+            make = lambda i: ((row1 - 1, col0 + i), (row1, col0 + i))
+
+        links = []
+        edges = np.diff(np.concatenate([[0], open_pairs.astype(np.int8), [0]]))
+        for begin, end in zip(np.nonzero(edges == 1)[0].tolist(), np.nonzero(edges == -1)[0].tolist()):
+            if end - begin > ENTRANCE_SPLIT:
+                links.extend([make(begin), make(end - 1)])
+            else:
+                links.append(make((begin + end - 1) // 2))
+
+        old = self.border_links.get(key, [])
+        if old == links:
+            return False
+        for a, b in old:
+            self.inter[a].discard(b)
+            self.inter[b].discard(a)
+        for a, b in links:
+            self.inter.setdefault(a, set()).add(b)
+            self.inter.setdefault(b, set()).add(a)
+        self.border_links[key] = links
+        self.stats['borders_built'] += 1
+        return True
+
+    def build_cluster(self, cluster):
+        """重新收集簇的节点并用簇内BFS计算节点之间的步数"""
+        nodes = set()
+        for key in self.cluster_borders(cluster):
+            side = 0 if key[0] == cluster else 1
+            nodes.update(link[side] for link in self.border_links.get(key, []))
+        self.cluster_nodes[cluster] = nodes
+        # 簇内步数是对称的：每个节点只需搜索排在它后面的节点
+        ordered = sorted(nodes)
+        edges = {node: {} for node in ordered}
+        for i, node in enumerate(ordered):
+            dist, _ = self.cluster_bfs(cluster, node, ordered[i + 1:])
+            for other, d in dist.items():
+                edges[node][other] = d
+                edges[other][node] = d
+        self.intra[cluster] = edges
+        self.path_cache[cluster] = {}
+        self.connections[cluster] = {}
+        self.stats['clusters_built'] += 1
+
+    def cluster_bfs(self, cluster, source, targets):
+        """
+        只在簇内走的BFS，起点和targets中的格子本身视为可通行（只作为端点，
+        不从墙壁格子继续扩展）
+
+        在簇的局部一维下标（(row - row0) * 簇宽 + (col - col0)）上搜索，
+        找到targets中所有（可达的）格子后停止。
+
+        Returns:
+            dist: {到达的目标格子: 步数}
+            parent: 局部下标的父节点数组（起点为-1），用于重构路径
+        """
+        row0, row1, col0, col1 = self.cluster_bounds(cluster)
+        width = col1 - col0
+        size = (row1 - row0) * width
+        free = self.free[row0:row1, col0:col1].tobytes()
+        start = (source[0] - row0) * width + source[1] - col0
+        remaining = {(t[0] - row0) * width + t[1] - col0: t for t in targets if t != source}
+        found = {source: 0} if source in targets else {}
+        dist = array('l', [-1]) * size
+        parent = array('l', [-1]) * size
+        dist[start] = 0
+        queue = deque([start])
+        while queue and remaining:
+            current = queue.popleft()
+            d = dist[current] + 1
+            col = current % width
+            # 顺序与NEIGHBORS相同：上、下、左、右
+            for neighbor in (current - width if current >= width else -1,
+                             current + width if current + width < size else -1,
+                             current - 1 if col > 0 else -1,
+                             current + 1 if col < width - 1 else -1):
+                if neighbor < 0 or dist[neighbor] != -1:
+                    continue
+                target = remaining.pop(neighbor, None)
+                if target is None and not free[neighbor]:
+                    continue
+                dist[neighbor] = d
+                parent[neighbor] = current
+                if target is not None:
+                    found[target] = d
+                if free[neighbor]:
+                    queue.append(neighbor)
+        return found, parent
+
+    def cluster_path(self, cluster, a, b, cache=True):
+        """簇内从a到b的最短路径（a, b都在簇内），不可达时为None"""
+        cached = self.path_cache[cluster].get((a, b)) if cache else None
+        if cached is not None:
+            return cached
+        dist, parent = self.cluster_bfs(cluster, a, {b})
+        if b not in dist:
+            return None
+        row0, _, col0, col1 = self.cluster_bounds(cluster)
+        width = col1 - col0
+        index = (b[0] - row0) * width + b[1] - col0
+        path = []
+        while index != -1:
+            row, col = divmod(index, width)
+            path.append((row0 + row, col0 + col))
+            index = parent[index]
+        path.reverse()
+        if cache:
+            self.path_cache[cluster][(a, b)] = path
+        return path
+
+    def update(self, cells, maze=None):
+        """
+        地图中的cells已修改：重建这些格子所在的簇及其边界，入口发生变化的
+        相邻簇也重建
+
+        Args:
+            cells: 修改过的格子 [(row, col), ...]
+            maze: 修改后的地图，给出时从中读取cells的新值；否则self.free须已更新
+
+        Returns:
+            重建的簇的集合
+        """
+        if maze is not None:
+            for row, col in cells:
+                self.free[row, col] = maze[row, col] == 0
+        dirty = {self.cluster_of(cell) for cell in cells}
+        rebuild = set(dirty)
+        for cluster in dirty:
+            for key in self.cluster_borders(cluster):
+                if self.build_border(key):
+                    rebuild.update(key)
+        for cluster in rebuild:
+            self.build_cluster(cluster)
+        return rebuild
+
+    def sync(self, maze):
+        """
+        与新的地图比较，只按发生变化的格子更新
+
+        Returns:
+            重建的簇的集合
+        """
+        free = np.asarray(maze) == 0
+        changed = np.argwhere(free != self.free)
+        if len(changed) == 0:
+            return set()
+        self.free = free
+        return self.update([tuple(cell) for cell in changed.tolist()])
+
+    def connect(self, cell):
+        """点到所在簇各节点的簇内步数（按簇缓存，簇重建后重新计算）"""
+        cluster = self.cluster_of(cell)
+        cache = self.connections[cluster]
+        dist = cache.get(cell)
+        if dist is None:
+            dist, _ = self.cluster_bfs(cluster, cell, self.cluster_nodes[cluster])
+            cache[cell] = dist
+            self.stats['connect_searches'] += 1
+        return dist
+
+    def find_path(self, start, goals):
+        """
+        从起点到多个目标中最近者的路径
+
+        Args:
+            start: 起点 (row, col)
+            goals: 目标点列表 [(row, col), ...]
+
+        Returns:
+            best_path: 到最近目标的路径（距离相同时取goals中靠前的），不可达则为None
+            distances: 字典，键为目标点，值为分层图上的步数（不短于真实最短距离），
+                       不可达则为None
+        """
+        self.stats['queries'] += 1
+        start = tuple(start)
+        goals = [tuple(goal) for goal in goals]
+        goal_set = {goal for goal in goals
+                    if 0 <= goal[0] < self.height and 0 <= goal[1] < self.width}
+
+        # 目标点到所在簇各节点的反向连接（缓存）
+        goal_links = {}  # 节点 -> [(目标, 步数)]
+        for goal in goal_set:
+            for node, d in self.connect(goal).items():
+                goal_links.setdefault(node, []).append((goal, d))
+
+        # 起点的出边：一次簇内BFS求出到所在簇各节点，以及同簇目标的直接步数
+        start_cluster = self.cluster_of(start)
+        same_cluster = {goal for goal in goal_set if self.cluster_of(goal) == start_cluster}
+        dist, _ = self.cluster_bfs(start_cluster, start, self.cluster_nodes[start_cluster] | same_cluster)
+        start_links = [(cell, d) for cell, d in dist.items() if cell != start]
+
+        # 抽象图上的A*：启发为到所有目标包围盒的曼哈顿距离（一致的下界，
+        # 只有一个目标时就是到它的曼哈顿距离）
+        if goal_set:
+            rows = [goal[0] for goal in goal_set]
+            cols = [goal[1] for goal in goal_set]
+            top, bottom, left, right = min(rows), max(rows), min(cols), max(cols)
+        else:
+            top = bottom = left = right = 0
+        heuristic = lambda cell: (max(top - cell[0], 0, cell[0] - bottom) +
+                                  max(left - cell[1], 0, cell[1] - right))
+        cost = {start: 0}
+        parent = {start: None}
+        heap = [(heuristic(start), 0, start)]
+        settled = set()
+        remaining = set(goal_set)
+        remaining.discard(start)
+        while heap and remaining:
+            _, d, node = heapq.heappop(heap)
+            if node in settled or d > cost[node]:
+                continue
+            settled.add(node)
+            self.stats['abstract_expansions'] += 1
+            cluster = self.cluster_of(node)
+            is_node = node in self.cluster_nodes[cluster]
+            if node in remaining:
+                remaining.discard(node)
+                if not is_node:
+                    continue  # 目标点不是抽象节点，不再向外扩展
+            neighbors = [(other, 1) for other in self.inter.get(node, ())]
+            if node == start:
+                neighbors.extend(start_links)
+            elif is_node:
+                neighbors.extend(self.intra[cluster][node].items())
+            neighbors.extend(goal_links.get(node, ()))
+            for other, step in neighbors:
+                nd = d + step
+                if nd < cost.get(other, float('inf')):
+                    cost[other] = nd
+                    parent[other] = node
+                    heapq.heappush(heap, (nd + heuristic(other), nd, other))
+
+        distances = {}
+        best_goal = None
+        for goal in goals:
+            d = cost.get(goal) if goal in goal_set and (goal in settled or goal == start) else None
+            distances[goal] = d
+            if d is not None and (best_goal is None or d < distances[best_goal]):
+                best_goal = goal
+        if best_goal is None:
+            return None, distances
+        return self.refine(best_goal, parent), distances
+
+    def refine(self, goal, parent):
+        """把抽象路径（parent链）细化为格子路径"""
+        waypoints = [goal]
+        while parent[waypoints[-1]] is not None:
+            waypoints.append(parent[waypoints[-1]])
+        waypoints.reverse()
+
+        path = [waypoints[0]]
+        last = len(waypoints) - 2
+        for i, (a, b) in enumerate(zip(waypoints, waypoints[1:])):
+            if b in self.inter.get(a, ()):
+                path.append(b)  # 跨边界的一步
+                continue
+            # 同簇内的一段；从起点出发和到达目标的段不缓存
+            segment = self.cluster_path(self.cluster_of(a), a, b, cache=0 < i < last)
+            path.extend(segment[1:])
+        return path
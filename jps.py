@@ -0,0 +1,272 @@
+"""
+
+Jump Point Search grid planning
+
+Same grid, obstacle inflation and 8-connected motion model (diagonal
+moves may cut corners) as AStarPlanner, but straight and diagonal runs
+are jumped over instead of expanded node by node, so only jump points
+enter the open set. Paths are optimal with the same cost as A*, though
+ties between equal-cost paths may be broken differently.
+
+See: D. Harabor and A. Grastien, "Online Graph Pruning for Pathfinding
+on Grid Maps", AAAI 2011.
+
+"""
+
+import heapq
+import math
+import time
+from array import array
+
+import matplotlib.pyplot as plt
+
+from a_star import AStarPlanner
+from generate_map import MAP_CACHE_DIR, generate_map_from_json
+
+show_animation = False
+
+SQRT2 = math.sqrt(2)
+
+
+class JPSPlanner(AStarPlanner):
+
+    def planning(self, sx, sy, gx, gy):
+        """
+        Jump point search
+
+        input:
+            s_x: start x position [m]
+            s_y: start y position [m]
+            gx: goal x position [m]
+            gy: goal y position [m]
+
+        output:
+            rx: x position list of the final path
+            ry: y position list of the final path
+        """
+        t0 = time.perf_counter()
+        start_x = self.calc_xy_index(sx, self.min_x)
+        start_y = self.calc_xy_index(sy, self.min_y)
+        goal = (self.calc_xy_index(gx, self.min_x),
+                self.calc_xy_index(gy, self.min_y))
+
+        x_width = self.x_width
+        n_cells = x_width * self.y_width
+        hypot = math.hypot
+
+        cost = array("d", [math.inf]) * n_cells
+        parent = array("l", [-1]) * n_cells
+        order = array("l", [0]) * n_cells
+        closed = bytearray(n_cells)
+
+        start_id = start_y * x_width + start_x
+        cost[start_id] = 0.0
+        open_heap = [(hypot(goal[0] - start_x, goal[1] - start_y), 0, 0.0,
+                      start_id)]
+        n_discovered = 1
+        n_expanded = 0
+        goal_parent = -1
+
+        while True:
+            if not open_heap:
+                print("Open set is empty..")
+                break
+
+            _, _, c_cost, c_id = heapq.heappop(open_heap)
+            if closed[c_id] or c_cost != cost[c_id]:
+                continue  # stale heap entry
+            cx, cy = c_id % x_width, c_id // x_width
+
+            if show_animation:  # pragma: no cover
+                plt.plot(self.calc_grid_position(cx, self.min_x),
+                         self.calc_grid_position(cy, self.min_y), "xc")
+                if n_expanded % 10 == 0:
+                    plt.pause(0.001)
+
+            if (cx, cy) == goal:
+                print("Find goal")
+                goal_parent = parent[c_id]
+                break
+
+            closed[c_id] = 1
+            n_expanded += 1
+
+            for dx, dy in self.prune_directions(cx, cy, parent[c_id]):
+                jump_point = self.jump(cx, cy, dx, dy, goal)
+                if jump_point is None:
+                    continue
+                nx, ny = jump_point
+                n_id = ny * x_width + nx
+                if closed[n_id]:
+                    continue
+
+                steps = max(abs(nx - cx), abs(ny - cy))
+                n_cost = c_cost + steps * (SQRT2 if dx and dy else 1.0)
+                old_cost = cost[n_id]
+                if old_cost == math.inf:
+                    order[n_id] = n_discovered
+                    n_discovered += 1
+                elif old_cost <= n_cost:
+                    continue
+                cost[n_id] = n_cost
+                parent[n_id] = c_id
+                heapq.heappush(open_heap, (
+                    n_cost + hypot(goal[0] - nx, goal[1] - ny),
+                    order[n_id], n_cost, n_id))
+
+        rx, ry = self.calc_jump_path(goal, goal_parent, parent)
+        self.n_expanded = n_expanded
+        self.planning_time = time.perf_counter() - t0
+        return rx, ry
+
+    def is_free(self, x, y):
+        return (0 <= x < self.x_width and 0 <= y < self.y_width
+                and self.free_map[y * self.x_width + x] == 1)
+
+    def prune_directions(self, x, y, parent_id):
+        """
+        Natural and forced successor directions of a jump point reached
+        from parent_id (all eight directions for the start node)
+        """
+        if parent_id == -1:
+            return [(int(dx), int(dy)) for dx, dy, _ in self.motion]
+
+        px, py = parent_id % self.x_width, parent_id // self.x_width
+        dx = (x > px) - (x < px)
+        dy = (y > py) - (y < py)
+        free = self.is_free
+
+        if dx and dy:
+            directions = [(dx, 0), (0, dy), (dx, dy)]
+            if not free(x - dx, y) and free(x - dx, y + dy):
+                directions.append((-dx, dy))
+            if not free(x, y - dy) and free(x + dx, y - dy):
+                directions.append((dx, -dy))
+        elif dx:
+            directions = [(dx, 0)]
+            for side in (1, -1):
+                if not free(x, y + side) and free(x + dx, y + side):
+                    directions.append((dx, side))
+        else:
+            directions = [(0, dy)]
+            for side in (1, -1):
+                if not free(x + side, y) and free(x + side, y + dy):
+                    directions.append((side, dy))
+        return directions
+
+    def calc_free_map(self):
+        super().calc_free_map()
+        # free_map with a blocked one-node border, so jumps need no
+        # bounds checks: node (x, y) is at (y + 1) * (x_width + 2) + x + 1
+        width = self.x_width + 2
+        padded = bytearray(width * (self.y_width + 2))
+        for y in range(self.y_width):
+            row = y * self.x_width
+            padded[(y + 1) * width + 1:(y + 1) * width + 1 + self.x_width] = \
+                self.free_map[row:row + self.x_width]
+        self.padded_free_map = bytes(padded)
+
+    def jump(self, x, y, dx, dy, goal):
+        """
+        Walk from (x, y) in direction (dx, dy) until a jump point, the goal
+        or an obstacle; return the jump point or None.
+        """
+        width = self.x_width + 2
+        p = (y + 1) * width + x + 1
+        goal_p = -1
+        if 0 <= goal[0] < self.x_width and 0 <= goal[1] < self.y_width:
+            goal_p = (goal[1] + 1) * width + goal[0] + 1
+
+        if dx and dy:
+            p = self.jump_diagonal(p, dx, dy * width, goal_p)
+        elif dx:
+            p = self.jump_straight(p, dx, width, goal_p)
+        else:
+            p = self.jump_straight(p, dy * width, 1, goal_p)
+        if p == -1:
+            return None
+        return p % width - 1, p // width - 1
+
+    def jump_straight(self, p, step, side, goal_p):
+        """
+        Straight jump over the padded map from index p; step is the index
+        delta of the move and side the delta to the perpendicular neighbour
+        """
+        free = self.padded_free_map
+        while True:
+            p += step
+            if not free[p]:
+                return -1
+            if p == goal_p:
+                return p
+            if ((not free[p + side] and free[p + side + step])
+                    or (not free[p - side] and free[p - side + step])):
+                return p
+
+    def jump_diagonal(self, p, step_x, step_y, goal_p):
+        """
+        Diagonal jump over the padded map; step_x / step_y are the index
+        deltas of the horizontal / vertical move components
+        """
+        free = self.padded_free_map
+        width = abs(step_y)
+        while True:
+            p += step_x + step_y
+            if not free[p]:
+                return -1
+            if p == goal_p:
+                return p
+            if ((not free[p - step_x] and free[p - step_x + step_y])
+                    or (not free[p - step_y] and free[p + step_x - step_y])):
+                return p
+            if (self.jump_straight(p, step_x, width, goal_p) != -1
+                    or self.jump_straight(p, step_y, 1, goal_p) != -1):
+                return p
+
+    def calc_jump_path(self, goal, goal_parent, parent):
+        """
+        Expand the chain of jump points into every grid node on the way,
+        from the goal back to the start, as AStarPlanner.planning returns.
+        """
+        x, y = goal
+        rx = [self.calc_grid_position(x, self.min_x)]
+        ry = [self.calc_grid_position(y, self.min_y)]
+        parent_index = goal_parent
+        while parent_index != -1:
+            px, py = parent_index % self.x_width, parent_index // self.x_width
+            dx = (px > x) - (px < x)
+            dy = (py > y) - (py < y)
+            while (x, y) != (px, py):
+                x += dx
+                y += dy
+                rx.append(self.calc_grid_position(x, self.min_x))
+                ry.append(self.calc_grid_position(y, self.min_y))
+            parent_index = parent[parent_index]
+
+        return rx, ry
+
+
+def main():
+    print(__file__ + " start!!")
+
+    # start and goal position
+    sx = 10.0  # [m]
+    sy = 12.0  # [m]
+    gx = 48.0  # [m]
+    gy = 50.0  # [m]
+    grid_size = 2.0  # [m]
+    robot_radius = 1.0  # [m]
+
+    map, _ = generate_map_from_json("map1.json", cache_dir=MAP_CACHE_DIR)
+
+    jps = JPSPlanner.from_grid(map, grid_size, robot_radius)
+    rx, ry = jps.planning(sx, sy, gx, gy)
+    print(f"expanded {jps.n_expanded} nodes in {jps.planning_time * 1000:.1f} ms")
+    if show_animation:  # pragma: no cover
+        plt.plot(rx, ry, "-r")
+        plt.pause(0.001)
+        plt.show()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+地图图像渲染
+
+把每个格子的显示状态（二维整数数组）按调色板渲染成NumPy RGB图像，
+放大到cell_size后作为一张PhotoImage贴到画布上；之后状态变化时只重新
+渲染变化格子的包围矩形，并拷贝到图像的对应位置。
+"""
+import tkinter as tk
+import numpy as np
+
+# 支持的颜色名称（其余颜色使用 '#rrggbb'）
+NAMED_COLORS = {
+    'black': (0, 0, 0),
+    'white': (255, 255, 255),
+}
+
+
+def parse_color(color):
+    """把 '#rrggbb' 或NAMED_COLORS中的颜色名称转换为 (r, g, b)"""
+    if color in NAMED_COLORS:
+        return NAMED_COLORS[color]
+    if len(color) == 7 and color.startswith('#'):
+        return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+    raise ValueError(f"不支持的颜色: {color!r}")
+
+
+def make_tiles(styles, cell_size):
+    """
+    为每种显示状态生成一个格子图块
+
+    与Tk矩形相邻排列时的效果一致：outline只在格子的上边和左边可见
+    （右边和下边被相邻格子覆盖），outline为空字符串时不画边框。
+
+    Args:
+        styles: 按状态索引的 (fill, outline)
+        cell_size: 格子边长（像素）
+
+    Returns:
+        tiles: uint8数组，形状为 (状态数, cell_size, cell_size, 3)
+    """
+    tiles = np.empty((len(styles), cell_size, cell_size, 3), dtype=np.uint8)
+    for value, (fill, outline) in enumerate(styles):
+        tiles[value] = parse_color(fill)
+        if outline:
+            tiles[value, 0, :] = parse_color(outline)
+            tiles[value, :, 0] = parse_color(outline)
+    return tiles
+
+
+def render_cells(state, tiles):
+    """
+    把格子状态渲染为RGB图像
+
+    Args:
+        state: 二维整数数组，每个格子的显示状态
+        tiles: make_tiles生成的图块
+
+    Returns:
+        rgb: uint8数组，形状为 (行数 * cell_size, 列数 * cell_size, 3)
+    """
+    height, width = state.shape
+    cell_size = tiles.shape[1]
+    return tiles[state].transpose(0, 2, 1, 3, 4).reshape(height * cell_size, width * cell_size, 3)
+
+
+def to_ppm(rgb):
+    """把RGB图像编码为二进制PPM（P6），可直接作为PhotoImage的data"""
+    height, width, _ = rgb.shape
+    return b'P6 %d %d 255\n' % (width, height) + np.ascontiguousarray(rgb).tobytes()
+
+
+class MapImage:
+    """画布上的一张地图图像，按格子状态增量更新"""
+
+    def __init__(self, canvas, styles, cell_size):
+        """
+        Args:
+            canvas: 画布
+            styles: 按状态索引的 (fill, outline)
+            cell_size: 格子边长（像素）
+        """
+        self.canvas = canvas
+        self.cell_size = cell_size
+        self.tiles = make_tiles(styles, cell_size)
+        self.state = None
+        self.photo = None
+        self.item = None
+
+    def update(self, state):
+        """
+        把格子状态同步到图像
+
+        第一次调用时渲染整张图像并在画布上创建图像项；之后只重新渲染
+        状态变化格子的包围矩形，用Tk的photo copy贴到原图像上。
+
+        Args:
+            state: 二维整数数组，每个格子的显示状态
+
+        Returns:
+            重新渲染的格子数
+        """
+        if self.state is None:
+            self.photo = tk.PhotoImage(data=to_ppm(render_cells(state, self.tiles)), format='PPM')
+            self.item = self.canvas.create_image(0, 0, image=self.photo, anchor='nw')
+            self.state = state
+            return state.size
+
+        changed = state != self.state
+        self.state = state
+        rows = np.flatnonzero(changed.any(axis=1))
+        if len(rows) == 0:
+            return 0
+        cols = np.flatnonzero(changed.any(axis=0))
+        row0, row1 = rows[0], rows[-1] + 1
+        col0, col1 = cols[0], cols[-1] + 1
+
+        region = tk.PhotoImage(
+            data=to_ppm(render_cells(state[row0:row1, col0:col1], self.tiles)), format='PPM'
+        )
+        self.photo.tk.call(self.photo.name, 'copy', region.name,
+                           '-to', int(col0) * self.cell_size, int(row0) * self.cell_size)
+        return (row1 - row0) * (col1 - col0)
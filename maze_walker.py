@@ -1,17 +1,30 @@
 import tkinter as tk
 import numpy as np
-import math
-from generate_map import generate_map_from_json
-from radar import Radar
+from explorer import Explorer
+from generate_map import MAP_CACHE_DIR, generate_map_from_json
+from map_render import MapImage
+from radar import get_ray_table
+
+# 格子按显示状态索引的 (fill, outline)
+BRIGHT_CELL_STYLES = [('white', ''), ('black', '')]  # 通道、墙壁
+DARK_CELL_STYLES = [('black', 'black'), ('#c0c0c0', '#808080'), ('#404040', '#606060')]  # 未探索、已探索通道、已探索墙壁
+
+# 格子数超过该值时默认用一张图像绘制地图，而不是每个格子一个矩形
+IMAGE_BACKEND_MIN_CELLS = 200 * 200
+# 格子数超过该值时回家/寻路用分层寻路（HPA*，路径近似最短），否则用精确的整图BFS
+HIERARCHICAL_PLANNER_MIN_CELLS = 200 * 200
 
 class MazeWalker:
     def __init__(self, target_pos=None):
         self.root = tk.Tk()
         self.root.title("迷宫行走游戏 - 使用WASD或方向键控制")
         
-        # 创建迷宫（先生成迷宫以获取实际尺寸）
-        self.maze, self.player_pos = self.generate_maze()
-        self.start_pos = self.player_pos
+        # 创建迷宫（先生成迷宫以获取实际尺寸），探索逻辑由Explorer负责
+        maze, start_pos = self.generate_maze()
+        path_planner = 'hpa' if maze.size >= HIERARCHICAL_PLANNER_MIN_CELLS else 'bfs'
+        self.explorer = Explorer(maze, start_pos, path_planner=path_planner)
+        self.maze = self.explorer.maze
+        self.explored_map = self.explorer.explored_map
         self.maze_height, self.maze_width = self.maze.shape
         
         # 动态计算格子大小和窗口尺寸
@@ -21,41 +34,75 @@ class MazeWalker:
         self.root.geometry(f"{self.window_width}x{self.window_height}")
         # self.root.resizable(False, False)  # 不允许调整大小
         
-        
-        # 初始化雷达
-        self.radar_range = 30
-        self.radar = Radar(self.maze, self.player_pos, self.radar_range)
-        
-        # 创建探索地图（记录哪些区域被雷达扫描过）
-        self.explored_map = np.zeros_like(self.maze, dtype=bool)
-        
-        # 雷达设置
-        self.scan_angle_step = 3
+        # 雷达显示设置
         self.show_rays = False
         
         # 游戏状态
-        self.moves = 0
         self.game_won = False
         self.is_auto_exploring = False
-        self.last_positions = []  # 记录最近的位置，防止来回移动
-        self.player_trail = [tuple(self.player_pos)]  # 记录玩家轨迹
-        self.exits = []  # 记录找到的出口位置
-        self.planned_path = []  # A*算法规划的路径
+        self.planned_path = []  # 回家/寻路规划的路径
         self.is_auto_moving = False  # 是否正在自动移动
-        self.auto_move_path = []  # 自动移动的路径
-        self.auto_move_index = 0  # 自动移动的当前索引
+        self.auto_move_path = []  # 自动移动开始时规划的路径（终点为自动移动的目标）
+        
+        # 保留模式绘制：画布图元只创建一次，之后按变化更新
+        # 'items' 每个格子一个矩形 / 'image' 整张地图为一张PhotoImage（适合大地图）
+        self.render_backend = 'image' if self.maze.size >= IMAGE_BACKEND_MIN_CELLS else 'items'
+        self.map_images = {}  # 画布名称 -> MapImage（'image'后端）
+        self.cell_items = {}  # 画布名称 -> 按(row, col)索引的格子矩形item id
+        self.cell_states = {}  # 画布名称 -> 当前画布上格子的显示状态
+        self.layer_markers = {}  # 画布名称 -> {图层: 隐藏的标记item id}
+        self.player_items = {}  # 画布名称 -> 玩家圆形item id
+        self.drawn_trail = (None, 0)  # 已绘制的轨迹列表及其点数
+        self.drawn_exits = None
+        self.drawn_path = None
+        self.start_drawn = False
+        self.rays_drawn = False
         
         self.setup_gui()
         self.bind_keys()
         
-        # 初始雷达扫描
-        self.update_radar_scan()
-        
         self.update_display()
-        
+    
+    # 探索状态由Explorer持有，显示层只读取
+    @property
+    def player_pos(self):
+        return self.explorer.player_pos
+    
+    @property
+    def start_pos(self):
+        return self.explorer.start_pos
+    
+    @property
+    def player_trail(self):
+        return self.explorer.player_trail
+    
+    @property
+    def exits(self):
+        return self.explorer.exits
+    
+    @property
+    def moves(self):
+        return self.explorer.moves
+    
+    @property
+    def radar(self):
+        return self.explorer.radar
+    
+    @property
+    def radar_range(self):
+        return self.explorer.radar_range
+    
+    @property
+    def scan_angle_step(self):
+        return self.explorer.scan_angle_step
+    
+    @property
+    def scan_method(self):
+        return self.explorer.scan_method
+
     def generate_maze(self):
         """生成迷宫"""
-        maze, start_pos = generate_map_from_json('1.json')
+        maze, start_pos = generate_map_from_json('1.json', cache_dir=MAP_CACHE_DIR)
         return maze, start_pos
     
     def calculate_display_parameters(self):
@@ -261,8 +308,8 @@ class MazeWalker:
         
         # 说明文字
         instruction_text = """
-控制说明: W/A/S/D或方向键移动 | 蓝色圆点=角色 | 红色线条=移动轨迹 | 绿色圆圈=出口 | 黄色方块=起点 | 橙色路径=A*规划路径
-明图显示完整地图+雷达射线 | 暗图显示探索区域+出口+规划路径 | 回家/寻路=A*寻路并自动移动 | 停止&清空=中断移动并清空轨迹
+控制说明: W/A/S/D或方向键移动 | 蓝色圆点=角色 | 红色线条=移动轨迹 | 绿色圆圈=出口 | 黄色方块=起点 | 橙色路径=规划路径
+明图显示完整地图+雷达射线 | 暗图显示探索区域+出口+规划路径 | 回家/寻路=规划路径并自动移动 | 停止&清空=中断移动并清空轨迹
         """
         
         instruction_label = tk.Label(
@@ -322,143 +369,31 @@ class MazeWalker:
         """开始自动探索"""
         self.is_auto_exploring = True
         self.explore_button.config(text="停止探索", bg='orange')
-        self.status_label.config(text="开始自动探索（使用A*算法）...")
+        self.status_label.config(text="开始自动探索（走向路径最近的frontier）...")
         self.auto_explore_step()
     
     def auto_explore_step(self):
         """执行一步自动探索"""
         if not self.is_auto_exploring:
             return
-            
-        # 寻找所有frontier点
-        frontiers = []
-        for i in range(self.maze_height):
-            for j in range(self.maze_width):
-                if self.is_frontier(i, j):
-                    frontiers.append((i, j))
-        
-        if len(frontiers) == 0:
-            self.status_label.config(text="探索完成！正在寻找出口...")
-            self.find_exits()
-            exit_count = len(self.exits)
-            self.status_label.config(text=f"探索完成！找到 {exit_count} 个可能的出口")
-            self.is_auto_exploring = False
-            self.explore_button.config(text="开始自动探索", bg='lightgreen')
-            self.update_display()
-            return
         
-        # 按距离排序，选择最近的frontier
-        frontiers.sort(key=lambda x: self.calc_dist(x[0], x[1], self.player_pos[0], self.player_pos[1]))
-        
-        # 尝试找到路径到最近的frontier
-        for frontier in frontiers:
-            print(f"尝试到达frontier: {frontier}, 当前位置: {self.player_pos}")
-            # 使用A*算法寻路到frontier，避开最近访问的位置
-            current_pos = tuple(self.player_pos)
-            path = self.astar_pathfinding(current_pos, frontier, avoid_recent=True)
+        if self.explorer.explore_step():
+            self.update_display()
             
-            if path and len(path) >= 2:
-                # 向目标移动一步
-                next_pos = path[1]  # path[0]是当前位置，path[1]是下一步
-                dy = next_pos[0] - self.player_pos[0]  # 行的变化
-                dx = next_pos[1] - self.player_pos[1]  # 列的变化
-                
-                print(f"下一步位置: {next_pos}, 移动方向: dy={dy}, dx={dx}")
-                
-                # 记录当前位置，防止来回移动
-                current_pos = tuple(self.player_pos)
-                if current_pos not in self.last_positions[-3:]:  # 避免最近3步的重复
-                    self.last_positions.append(current_pos)
-                    if len(self.last_positions) > 10:  # 只保留最近10个位置
-                        self.last_positions.pop(0)
-                
-                self.move_player(dy, dx)
-                
-                # 快速继续下一步探索
-                self.root.after(1, self.auto_explore_step)  # 1ms延迟，既快速又不卡顿
-                return
+            # 快速继续下一步探索
+            self.root.after(1, self.auto_explore_step)  # 1ms延迟，既快速又不卡顿
+            return
         
-        # 如果没有找到可达的frontier，结束探索
-        self.status_label.config(text="探索完成！正在寻找出口...")
-        self.find_exits()
+        # 没有可达的frontier，探索结束（Explorer已寻找出口）
         exit_count = len(self.exits)
         self.status_label.config(text=f"探索完成！找到 {exit_count} 个可能的出口")
         self.is_auto_exploring = False
         self.explore_button.config(text="开始自动探索", bg='lightgreen')
         self.update_display()
-            
-    def calc_dist(self, i1, j1, i2, j2):
-        return abs(i1 - i2) + abs(j1 - j2)
-    
-    def astar_pathfinding(self, start, goal, avoid_recent=False):
-        """A*算法寻路"""
-        import heapq
-        
-        def heuristic(pos):
-            return self.calc_dist(pos[0], pos[1], goal[0], goal[1])
-        
-        # 开放列表和关闭列表
-        open_list = []
-        closed_set = set()
-        
-        # 存储每个节点的父节点和成本
-        came_from = {}
-        g_score = {start: 0}
-        f_score = {start: heuristic(start)}
-        
-        heapq.heappush(open_list, (f_score[start], start))
-        
-        while open_list:
-            current_f, current = heapq.heappop(open_list)
-            
-            if current == goal:
-                # 重构路径
-                path = []
-                while current in came_from:
-                    path.append(current)
-                    current = came_from[current]
-                path.append(start)
-                return path[::-1]
-            
-            closed_set.add(current)
-            
-            # 检查四个方向的邻居
-            for dy, dx in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                neighbor = (current[0] + dy, current[1] + dx)
-                
-                # 检查边界
-                if (neighbor[0] < 0 or neighbor[0] >= self.maze_height or 
-                    neighbor[1] < 0 or neighbor[1] >= self.maze_width):
-                    continue
-                
-                # 检查是否是墙壁
-                if self.maze[neighbor[0], neighbor[1]] == 1:
-                    continue
-                
-                # 检查是否已经在关闭列表中
-                if neighbor in closed_set:
-                    continue
-                
-                # 在探索模式下，给最近访问的位置增加额外成本
-                extra_cost = 0
-                if avoid_recent and neighbor in self.last_positions[-3:]:
-                    extra_cost = 5  # 增加成本，但不完全禁止
-                
-                tentative_g_score = g_score[current] + 1 + extra_cost
-                
-                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = tentative_g_score + heuristic(neighbor)
-                    
-                    if neighbor not in [item[1] for item in open_list]:
-                        heapq.heappush(open_list, (f_score[neighbor], neighbor))
-        
-        return None  # 没有找到路径
     
     def clear_trail(self):
         """清空轨迹"""
-        self.player_trail = [tuple(self.player_pos)]
+        self.explorer.clear_trail()
         self.planned_path = []
         self.update_display()
     
@@ -469,10 +404,7 @@ class MazeWalker:
             return
             
         self.clear_trail()
-        current_pos = tuple(self.player_pos)
-        start_pos = tuple(self.start_pos)
-        
-        path = self.astar_pathfinding(current_pos, start_pos)
+        path = self.explorer.path_home()
         
         if path:
             self.planned_path = path
@@ -498,16 +430,9 @@ class MazeWalker:
             self.status_label.config(text="请先完成探索以找到出口")
             return
         
-        current_pos = tuple(self.player_pos)
-        best_path = None
-        shortest_distance = float('inf')
-        
-        # 寻找到最近出口的路径
-        for exit_pos in self.exits:
-            path = self.astar_pathfinding(current_pos, exit_pos)
-            if path and len(path) < shortest_distance:
-                best_path = path
-                shortest_distance = len(path)
+        # 一次多目标搜索求出到所有出口的距离和最近出口的路径（小地图用BFS，
+        # 大地图用近似最短的分层寻路，见HIERARCHICAL_PLANNER_MIN_CELLS）
+        best_path = self.explorer.path_to_exit()
         
         if best_path:
             self.planned_path = best_path
@@ -522,44 +447,39 @@ class MazeWalker:
             self.update_display()
     
     def start_auto_move(self, path):
-        """开始自动移动"""
+        """开始自动移动：沿规划好的路径走向终点，新墙壁挡住剩余路径时改用D* Lite局部修补"""
         if not path or len(path) < 2:
             return
         
         self.is_auto_moving = True
         self.auto_move_path = path
-        self.auto_move_index = 1  # 从第1个位置开始（第0个是当前位置）
+        self.explorer.start_replanning([path[-1]], path)
         self.auto_move_step()
     
     def auto_move_step(self):
         """执行一步自动移动"""
-        if not self.is_auto_moving or self.auto_move_index >= len(self.auto_move_path):
-            # 移动完成
+        if not self.is_auto_moving:
+            return
+        
+        if not self.explorer.replan_step():
+            # 到达终点，或已知地图上没有可达路径
+            arrived = tuple(self.player_pos) == tuple(self.auto_move_path[-1])
             self.is_auto_moving = False
             self.auto_move_path = []
-            self.auto_move_index = 0
-            self.status_label.config(text="移动完成！")
+            self.explorer.stop_replanning()
+            self.status_label.config(text="移动完成！" if arrived else "自动移动遇到障碍，已停止")
+            self.update_display()
             return
         
-        # 获取下一个位置
-        next_pos = self.auto_move_path[self.auto_move_index]
-        current_pos = tuple(self.player_pos)
-        
-        # 计算移动方向
-        dy = next_pos[0] - current_pos[0]
-        dx = next_pos[1] - current_pos[1]
-        
-        # 执行移动
-        self.move_player(dy, dx)
-        
-        # 更新索引
-        self.auto_move_index += 1
+        # 显示修补后的剩余路径
+        self.planned_path = self.explorer.replan_path() or []
+        self.update_display()
         
         # 更新状态显示
-        remaining_steps = len(self.auto_move_path) - self.auto_move_index
+        remaining_steps = len(self.planned_path) - 1
         self.status_label.config(text=f"自动移动中... 还剩 {remaining_steps} 步")
         
-                # 继续下一步移动
+        # 继续下一步移动
         self.root.after(200, self.auto_move_step)  # 200ms延迟，让用户看到移动过程
     
     def stop_auto_move(self):
@@ -567,7 +487,7 @@ class MazeWalker:
         if self.is_auto_moving:
             self.is_auto_moving = False
             self.auto_move_path = []
-            self.auto_move_index = 0
+            self.explorer.stop_replanning()
             self.status_label.config(text="自动移动已停止，轨迹已清空")
         else:
             self.status_label.config(text="当前没有自动移动")
@@ -575,87 +495,25 @@ class MazeWalker:
         # 清空轨迹和规划路径
         self.clear_trail()
  
-    def find_exits(self):
-        """寻找迷宫的可能出口"""
-        self.exits = []
-        
-        # 检查四个边界上的可通行点
-        for i in range(self.maze_height):
-            for j in range(self.maze_width):
-                # 只检查边界位置
-                is_boundary = (i == 0 or i == self.maze_height - 1 or 
-                              j == 0 or j == self.maze_width - 1)
-                
-                if is_boundary and self.maze[i, j] == 0 and self.calc_dist(self.start_pos[0], self.start_pos[1], i, j) > 10:  # 可通行的边界点
-                    # 检查是否被探索过（如果要求只标记探索过的出口）
-                    # 或者直接标记所有边界出口
-                    self.exits.append((i, j))
-        
-        print(f"找到 {len(self.exits)} 个可能的出口: {self.exits}")
-
-    def is_frontier(self, i, j):
-        if self.explored_map[i, j] == 0:
-            for dy, dx in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                if not (0 <= i + dy < self.maze_height and 0 <= j + dx < self.maze_width):
-                    continue
-                if self.explored_map[i + dy, j + dx] == 1 and self.maze[i + dy, j + dx] == 0:
-                    return True
-        return False
+    def set_maze_cell(self, row, col, value):
+        """修改迷宫中的一个格子（0通道，1墙壁），雷达缓存和frontier随之更新"""
+        self.explorer.set_maze_cell(row, col, value)
+        self.update_display()
     
     def on_range_change(self, value):
         """雷达范围改变"""
-        self.radar_range = int(value)
-        self.radar = Radar(self.maze, self.player_pos, self.radar_range)
+        self.explorer.set_radar_range(int(value))
         self.radar_info_label.config(text=f"雷达范围: {self.radar_range}")
-        self.update_radar_scan()
         self.update_display()
     
-    def update_radar_scan(self):
-        """更新雷达扫描并记录探索区域"""
-        if hasattr(self, 'radar'):
-            self.radar.move_radar(self.player_pos)
-            scan_data = self.radar.scan_360(self.scan_angle_step)
-            
-            # 标记雷达扫描过的区域
-            for angle, (distance, hit_point) in scan_data.items():
-                # 使用Bresenham算法标记射线路径上的所有点
-                self.mark_ray_path(self.player_pos, angle, distance)
-    
-    def mark_ray_path(self, start_pos, angle, distance):
-        """标记射线路径上的所有点为已探索"""
-        start_y, start_x = start_pos
-        angle_rad = math.radians(angle)
-        
-        # 沿射线路径标记点
-        for step in range(int(distance) + 1):
-            y = start_y + step * math.sin(angle_rad)
-            x = start_x + step * math.cos(angle_rad)
-            
-            grid_y = int(round(y))
-            grid_x = int(round(x))
-            
-            if (0 <= grid_y < self.maze_height and 0 <= grid_x < self.maze_width):
-                self.explored_map[grid_y, grid_x] = True
-
     def move_player(self, dy, dx):
         """移动玩家"""
         current_row, current_col = self.player_pos
-        new_row = current_row + dy
-        new_col = current_col + dx
         
         # 检查边界
-        if (0 <= new_row < self.maze_height and 0 <= new_col < self.maze_width):
-            # 检查是否是通道（0表示可通行，1表示墙壁）
-            if self.maze[new_row, new_col] == 0:
-                self.player_pos = [new_row, new_col]
-                self.moves += 1
-                
-                # 记录轨迹
-                self.player_trail.append(tuple(self.player_pos))
-                
-                # 更新雷达扫描
-                self.update_radar_scan()
-                
+        if self.explorer.in_bounds(current_row + dy, current_col + dx):
+            # 检查是否是通道（0表示可通行，1表示墙壁），移动后Explorer会更新雷达扫描
+            if self.explorer.move(dy, dx):
                 self.update_display()
 
             else:
@@ -686,104 +544,134 @@ class MazeWalker:
     
     def update_bright_map(self):
         """更新明图 - 显示完整地图和雷达射线"""
-        self.bright_canvas.delete("all")
-        
-        # 绘制完整迷宫
-        for row in range(self.maze_height):
-            for col in range(self.maze_width):
-                x1 = col * self.cell_size
-                y1 = row * self.cell_size
-                x2 = x1 + self.cell_size
-                y2 = y1 + self.cell_size
-                
-                if self.maze[row, col] == 1:
-                    # 墙壁 - 黑色
-                    self.bright_canvas.create_rectangle(
-                        x1, y1, x2, y2,
-                        fill='black', outline=''
-                    )
-                else:
-                    # 通道 - 白色
-                    self.bright_canvas.create_rectangle(
-                        x1, y1, x2, y2,
-                        fill='white', outline=''
-                    )
+        canvas = self.bright_canvas
         
-        # 绘制雷达射线
+        # 格子矩形只创建一次，之后只修改状态变化的格子
+        self.sync_cell_items('bright', canvas, (self.maze == 1).astype(np.int8),
+                             BRIGHT_CELL_STYLES, ['rays', 'trail'])
+        
+        # 绘制雷达射线（随位置变化，整体重画）
+        if self.rays_drawn:
+            canvas.delete('rays')
+            self.rays_drawn = False
         if self.show_rays and hasattr(self, 'radar'):
-            scan_data = self.radar.scan_360(self.scan_angle_step)
+            scan_data = self.radar.scan_360(self.scan_angle_step, method=self.scan_method)
             player_x = self.player_pos[1] * self.cell_size + self.cell_size // 2
             player_y = self.player_pos[0] * self.cell_size + self.cell_size // 2
             
-            for angle, (distance, hit_point) in scan_data.items():
+            table = get_ray_table(self.radar.max_range, self.scan_angle_step)
+            
+            for ray, (angle, (distance, hit_point)) in enumerate(scan_data.items()):
                 if angle % (self.scan_angle_step * 2) == 0:  # 减少射线密度
-                    angle_rad = math.radians(angle)
-                    end_x = player_x + distance * self.cell_size * math.cos(angle_rad) / 10
-                    end_y = player_y + distance * self.cell_size * math.sin(angle_rad) / 10
+                    end_x = player_x + distance * self.cell_size * table.cos[ray] / 10
+                    end_y = player_y + distance * self.cell_size * table.sin[ray] / 10
                     
-                    self.bright_canvas.create_line(
+                    canvas.create_line(
                         player_x, player_y, end_x, end_y,
-                        fill='cyan', width=1, stipple='gray25'
+                        fill='cyan', width=1, stipple='gray25', tags='rays'
                     )
+            canvas.tag_lower('rays', self.layer_markers['bright']['rays'])
+            self.rays_drawn = True
         
         # 绘制目标点
-        self.draw_target_on_canvas(self.bright_canvas)
-        
-        # 绘制玩家轨迹
-        self.draw_player_trail_on_canvas(self.bright_canvas)
+        self.draw_target_on_canvas(canvas)
+        
+        # 绘制玩家轨迹（只补画新增的轨迹段，轨迹被清除时整体重画）
+        trail, drawn = self.drawn_trail
+        if trail is not self.player_trail or drawn > len(self.player_trail):
+            canvas.delete('trail')
+            drawn = 0
+        marker = self.layer_markers['bright']['trail']
+        for item in self.draw_player_trail_on_canvas(canvas, max(drawn - 1, 0)):
+            canvas.tag_lower(item, marker)
+        self.drawn_trail = (self.player_trail, len(self.player_trail))
         
         # 绘制玩家
-        self.draw_player_on_canvas(self.bright_canvas)
+        self.draw_player_on_canvas('bright', canvas)
     
     def update_dark_map(self):
         """更新暗图 - 只显示探索过的区域"""
-        self.dark_canvas.delete("all")
-        
-        # 绘制探索过的区域
-        for row in range(self.maze_height):
-            for col in range(self.maze_width):
-                x1 = col * self.cell_size
-                y1 = row * self.cell_size
-                x2 = x1 + self.cell_size
-                y2 = y1 + self.cell_size
-                
-                if self.explored_map[row, col]:
-                    # 已探索区域
-                    if self.maze[row, col] == 1:
-                        # 墙壁 - 深灰色
-                        self.dark_canvas.create_rectangle(
-                            x1, y1, x2, y2,
-                            fill='#404040', outline='#606060'
-                        )
-                    else:
-                        # 通道 - 浅灰色
-                        self.dark_canvas.create_rectangle(
-                            x1, y1, x2, y2,
-                            fill='#c0c0c0', outline='#808080'
-                        )
-                else:
-                    # 未探索区域 - 黑色
-                    self.dark_canvas.create_rectangle(
-                        x1, y1, x2, y2,
-                        fill='black', outline='black'
-                    )
+        canvas = self.dark_canvas
+        
+        # 未探索为0，已探索通道为1，已探索墙壁为2
+        state = np.where(self.explored_map, 1 + (self.maze == 1), 0).astype(np.int8)
+        self.sync_cell_items('dark', canvas, state, DARK_CELL_STYLES, ['exits', 'start', 'path'])
+        markers = self.layer_markers['dark']
         
         # 绘制目标点（如果在探索区域内）
         # target_row, target_col = self.target_pos
         # if self.explored_map[target_row, target_col]:
         #     self.draw_target_on_canvas(self.dark_canvas)
         
-        # 绘制出口
-        self.draw_exits_on_canvas(self.dark_canvas)
-        
-        # 绘制起始位置
-        self.draw_start_position_on_canvas(self.dark_canvas)
-        
-        # 绘制规划路径
-        self.draw_planned_path_on_canvas(self.dark_canvas)
+        # 绘制出口（出口列表变化时才重画）
+        if self.exits != self.drawn_exits:
+            canvas.delete('exits')
+            self.draw_exits_on_canvas(canvas)
+            canvas.tag_lower('exits', markers['exits'])
+            self.drawn_exits = list(self.exits)
+        
+        # 绘制起始位置（只画一次）
+        if not self.start_drawn:
+            self.draw_start_position_on_canvas(canvas)
+            canvas.tag_lower('start', markers['start'])
+            self.start_drawn = True
+        
+        # 绘制规划路径（规划出新路径时才重画）
+        if self.planned_path is not self.drawn_path:
+            canvas.delete('path')
+            self.draw_planned_path_on_canvas(canvas)
+            canvas.tag_lower('path', markers['path'])
+            self.drawn_path = self.planned_path
         
         # 绘制玩家
-        self.draw_player_on_canvas(self.dark_canvas)
+        self.draw_player_on_canvas('dark', canvas)
+    
+    def sync_cell_items(self, name, canvas, state, styles, layers):
+        """
+        把每个格子的显示状态同步到画布
+        
+        'items'后端在第一次调用时为每个格子创建一个矩形并按索引保存item id，
+        之后只对状态发生变化的格子itemconfig；'image'后端把整张地图作为一张
+        PhotoImage，之后只重新渲染变化区域。第一次调用时还会在格子之上按
+        layers的顺序为每个图层创建一个隐藏的标记项，叠加图元插到对应标记
+        之下即可保持层次。
+        
+        Args:
+            name: 画布名称（'bright' 或 'dark'）
+            canvas: 画布
+            state: 二维整数数组，每个格子的显示状态
+            styles: 按状态索引的 (fill, outline)
+            layers: 格子之上、玩家之下的叠加图层，从下到上
+        """
+        first = name not in self.layer_markers
+        if self.render_backend == 'image':
+            if first:
+                self.map_images[name] = MapImage(canvas, styles, self.cell_size)
+            self.map_images[name].update(state)
+        elif first:
+            items = np.empty(state.shape, dtype=np.int64)
+            for row in range(self.maze_height):
+                for col in range(self.maze_width):
+                    x1 = col * self.cell_size
+                    y1 = row * self.cell_size
+                    fill, outline = styles[state[row, col]]
+                    items[row, col] = canvas.create_rectangle(
+                        x1, y1, x1 + self.cell_size, y1 + self.cell_size,
+                        fill=fill, outline=outline
+                    )
+            self.cell_items[name] = items
+        else:
+            items = self.cell_items[name]
+            changed = np.flatnonzero(state != self.cell_states[name])
+            for item, value in zip(items.flat[changed].tolist(), state.flat[changed].tolist()):
+                fill, outline = styles[value]
+                canvas.itemconfig(item, fill=fill, outline=outline)
+        self.cell_states[name] = state
+        
+        if first:
+            self.layer_markers[name] = {
+                layer: canvas.create_line(0, 0, 0, 0, state='hidden') for layer in layers
+            }
     
     def draw_exits_on_canvas(self, canvas):
         """在指定画布上绘制出口"""
@@ -796,7 +684,7 @@ class MazeWalker:
             canvas.create_oval(
                 exit_x - radius, exit_y - radius,
                 exit_x + radius, exit_y + radius,
-                fill='green', outline='darkgreen', width=2
+                fill='green', outline='darkgreen', width=2, tags='exits'
             )
             
             # 在出口上添加文字标记
@@ -804,7 +692,7 @@ class MazeWalker:
                 exit_x, exit_y,
                 text="EXIT",
                 fill='white',
-                font=("Arial", max(6, self.cell_size // 4), "bold")
+                font=("Arial", max(6, self.cell_size // 4), "bold"), tags='exits'
             )
     
     def draw_start_position_on_canvas(self, canvas):
@@ -818,7 +706,7 @@ class MazeWalker:
         canvas.create_rectangle(
             start_x - radius, start_y - radius,
             start_x + radius, start_y + radius,
-            fill='yellow', outline='orange', width=2
+            fill='yellow', outline='orange', width=2, tags='start'
         )
         
         # 在起始位置上添加文字标记
@@ -826,7 +714,7 @@ class MazeWalker:
             start_x, start_y,
             text="HOME",
             fill='black',
-            font=("Arial", max(6, self.cell_size // 4), "bold")
+            font=("Arial", max(6, self.cell_size // 4), "bold"), tags='start'
         )
     
     def draw_planned_path_on_canvas(self, canvas):
@@ -847,7 +735,7 @@ class MazeWalker:
             # 使用橙色线条绘制规划路径
             canvas.create_line(
                 start_x, start_y, end_x, end_y,
-                fill='orange', width=3
+                fill='orange', width=3, tags='path'
             )
         
         # 在路径点上绘制小圆点
@@ -859,16 +747,15 @@ class MazeWalker:
             canvas.create_oval(
                 x - radius, y - radius,
                 x + radius, y + radius,
-                fill='orange', outline='darkorange'
+                fill='orange', outline='darkorange', tags='path'
             )
 
-    def draw_player_trail_on_canvas(self, canvas):
-        """在指定画布上绘制玩家轨迹"""
-        if len(self.player_trail) < 2:
-            return
-            
+    def draw_player_trail_on_canvas(self, canvas, first=0):
+        """在指定画布上绘制玩家轨迹中从第first段开始的线段，返回新建的item id"""
+        items = []
+        
         # 绘制轨迹线条
-        for i in range(len(self.player_trail) - 1):
+        for i in range(first, len(self.player_trail) - 1):
             start_row, start_col = self.player_trail[i]
             end_row, end_col = self.player_trail[i + 1]
             
@@ -877,23 +764,28 @@ class MazeWalker:
             end_x = end_col * self.cell_size + self.cell_size // 2
             end_y = end_row * self.cell_size + self.cell_size // 2
             
-            canvas.create_line(
+            items.append(canvas.create_line(
                 start_x, start_y, end_x, end_y,
-                fill='red', width=2
-            )
+                fill='red', width=2, tags='trail'
+            ))
+        return items
 
-    def draw_player_on_canvas(self, canvas):
-        """在指定画布上绘制玩家"""
+    def draw_player_on_canvas(self, name, canvas):
+        """在指定画布上绘制玩家：圆形只创建一次，之后移动其坐标"""
         player_row, player_col = self.player_pos
         player_x = player_col * self.cell_size + self.cell_size // 2
         player_y = player_row * self.cell_size + self.cell_size // 2
         radius = max(3, self.cell_size // 3)
+        bbox = (player_x - radius, player_y - radius,
+                player_x + radius, player_y + radius)
         
-        canvas.create_oval(
-            player_x - radius, player_y - radius,
-            player_x + radius, player_y + radius,
-            fill='blue', outline='darkblue', width=2
-        )
+        item = self.player_items.get(name)
+        if item is None:
+            self.player_items[name] = canvas.create_oval(
+                *bbox, fill='blue', outline='darkblue', width=2
+            )
+        else:
+            canvas.coords(item, *bbox)
     
     def draw_target_on_canvas(self, canvas):
         """在指定画布上绘制目标点"""
@@ -0,0 +1,172 @@
+"""
+紧凑的占据栅格
+
+墙壁/通道地图按位压缩存储（np.packbits，每格1位），也可以选择每格1字节
+（uint8）。支持单格查询、花式索引、行列切片，以及转换为Radar、
+AStarPlanner和visualize_map使用的稠密数组。
+"""
+import numpy as np
+
+from generate_map import generate_map_from_json
+
+# 每个字节中1的个数
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class OccupancyGrid:
+    """
+    占据栅格，1表示墙壁，0表示通道
+
+    按[行, 列]索引，语义与二维NumPy数组相同：两个整数返回单个格子的值；
+    含切片或数组时返回uint8数组。Radar可以直接使用（只用到shape和索引），
+    np.asarray(grid)得到稠密的uint8数组。
+    """
+
+    def __init__(self, data, width, packed=True):
+        """
+        Args:
+            data: 存储数组；packed时为 (行数, ceil(列数 / 8)) 的按位压缩数组
+                  （高位在前），否则为 (行数, 列数) 的uint8数组
+            width: 列数
+            packed: 是否按位压缩
+        """
+        self.data = data
+        self.packed = packed
+        self.height = data.shape[0]
+        self.width = width
+
+    @classmethod
+    def zeros(cls, height, width, packed=True):
+        """全部为通道的栅格"""
+        if packed:
+            return cls(np.zeros((height, (width + 7) // 8), dtype=np.uint8), width, True)
+        return cls(np.zeros((height, width), dtype=np.uint8), width, False)
+
+    @classmethod
+    def from_array(cls, array, packed=True):
+        """由二维数组（非0即墙壁）构建"""
+        cells = np.asarray(array) != 0
+        if packed:
+            return cls(np.packbits(cells, axis=1), cells.shape[1], True)
+        return cls(cells.astype(np.uint8), cells.shape[1], False)
+
+    @classmethod
+    def from_json(cls, json_file, packed=True, **kwargs):
+        """
+        由地图JSON生成栅格
+
+        Args:
+            json_file: 地图JSON文件
+            packed: 是否按位压缩
+            **kwargs: 传给generate_map_from_json的参数（resolution、wall_thickness、cache_dir）
+
+        Returns:
+            grid: OccupancyGrid
+            start_pos: 起始位置 [row, col]
+        """
+        array, start_pos = generate_map_from_json(json_file, **kwargs)
+        return cls.from_array(array, packed), start_pos
+
+    @classmethod
+    def load(cls, filename):
+        """读取save保存的.npz文件"""
+        with np.load(filename) as f:
+            return cls(f['data'], int(f['width']), bool(f['packed']))
+
+    def save(self, filename):
+        """保存为.npz（存储数组原样保存）"""
+        np.savez(filename, data=self.data, width=self.width, packed=self.packed)
+
+    @property
+    def shape(self):
+        return (self.height, self.width)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def __len__(self):
+        return self.height
+
+    def normalize_columns(self, col):
+        """把列索引（整数、数组或切片）转换为非负整数索引，越界时抛出IndexError"""
+        if isinstance(col, slice):
+            return np.arange(self.width)[col]
+        if isinstance(col, (int, np.integer)):
+            if not -self.width <= col < self.width:
+                raise IndexError(f"列索引 {col} 超出范围 [0, {self.width})")
+            return col + self.width if col < 0 else col
+        col = np.asarray(col, dtype=np.int64)
+        if col.size and (col.min() < -self.width or col.max() >= self.width):
+            raise IndexError(f"列索引超出范围 [0, {self.width})")
+        return np.where(col < 0, col + self.width, col)
+
+    def __getitem__(self, key):
+        row, col = key
+        if not self.packed:
+            return self.data[row, col]
+        if isinstance(col, slice):
+            # 先取出行，再按列取位（切片的列与行是外积关系）
+            col = self.normalize_columns(col)
+            return (self.data[row][..., col >> 3] >> (7 - (col & 7))) & 1
+        col = self.normalize_columns(col)
+        return (self.data[row, col >> 3] >> (7 - (col & 7))) & 1
+
+    def __setitem__(self, key, value):
+        row, col = key
+        if not self.packed:
+            self.data[row, col] = value
+            return
+        if isinstance(row, slice):
+            row = np.arange(self.height)[row]
+            if isinstance(col, slice):
+                row = row[:, None]
+        col = self.normalize_columns(col)
+        row, col = np.broadcast_arrays(row, col)
+        value = np.broadcast_to(np.asarray(value) != 0, row.shape).ravel()
+        row, col = row.ravel(), col.ravel()
+        row = np.where(row < 0, row + self.height, row)
+        # 同一格子被赋值多次时与NumPy一致，以最后一次为准
+        _, last = np.unique((row * self.width + col)[::-1], return_index=True)
+        keep = len(row) - 1 - last
+        row, col, value = row[keep], col[keep], value[keep]
+        mask = (0x80 >> (col & 7)).astype(np.uint8)
+        byte = col >> 3
+        # 同一字节中的多个格子用 ufunc.at 逐个累积
+        np.bitwise_or.at(self.data, (row[value], byte[value]), mask[value])
+        np.bitwise_and.at(self.data, (row[~value], byte[~value]), ~mask[~value])
+
+    def to_array(self, dtype=np.uint8):
+        """转换为稠密的二维数组"""
+        if self.packed:
+            array = np.unpackbits(self.data, axis=1, count=self.width)
+        else:
+            array = self.data
+        return array.astype(dtype, copy=False)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_array(np.uint8 if dtype is None else dtype)
+
+    def count_walls(self):
+        """墙壁格子数（不解压）"""
+        if self.packed:
+            return int(POPCOUNT[self.data].sum(dtype=np.int64))
+        return int(np.count_nonzero(self.data))
+
+    def obstacle_points(self):
+        """
+        墙壁格子的坐标，按行分块解压，不需要整张稠密地图
+
+        Returns:
+            ox, oy: 列坐标和行坐标数组（AStarPlanner的障碍物点 x = 列, y = 行）
+        """
+        rows_per_block = max(1, (1 << 20) // max(self.width, 1))
+        ox, oy = [], []
+        for begin in range(0, self.height, rows_per_block):
+            block = self[begin:begin + rows_per_block, :]
+            rows, cols = np.nonzero(block == 1)
+            oy.append(rows + begin)
+            ox.append(cols)
+        if not ox:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(ox), np.concatenate(oy)
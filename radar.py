@@ -1,9 +1,97 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import math
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from distance_field import FIELD_EPS, compute_distance_field
+
+# 向量化扫描结果的结构化数组类型
+SCAN_DTYPE = np.dtype([
+    ('angle', np.int32),       # 角度（度）
+    ('distance', np.float64),  # 碰撞距离，无碰撞时为max_range
+    ('hit', np.bool_),         # 是否碰到障碍物或地图边界
+    ('hit_y', np.int64),       # 碰撞点行坐标，无碰撞时为-1
+    ('hit_x', np.int64),       # 碰撞点列坐标，无碰撞时为-1
+    ('out', np.bool_),         # 碰撞点是否在地图外
+])
+
+# 射线偏移表：每行对应一个角度，每列对应一个步长（0..max_range）
+#   angles: 角度数组；sin/cos: 每个角度的方向
+#   step_y/step_x: 各步的浮点偏移 sin*step / cos*step
+#   offset_y/offset_x: 各步取整后的格子偏移（整数位置时直接平移使用）
+#   near_half: 浮点偏移的小数部分接近0.5的位置，平移后取整可能不同，需按实际位置重算
+RayTable = namedtuple('RayTable', ['angles', 'sin', 'cos', 'step_y', 'step_x',
+                                   'offset_y', 'offset_x', 'near_half'])
+
+RAY_TABLE_CACHE_SIZE = 16
+
+
+@lru_cache(maxsize=RAY_TABLE_CACHE_SIZE)
+def get_ray_table(max_range, angle_step):
+    """
+    获取 (max_range, angle_step) 对应的射线偏移表（LRU缓存）
+    
+    同样的雷达设置在每次移动后都会重复扫描，偏移表只需计算一次，
+    之后在新位置扫描时只要把表平移到当前位置即可。
+    
+    Returns:
+        RayTable，数组均为只读
+    """
+    angles = np.arange(0, 360, angle_step)
+    # 与cast_ray一样使用math计算方向，保证结果一致
+    sin = np.array([math.sin(math.radians(a)) for a in angles.tolist()])
+    cos = np.array([math.cos(math.radians(a)) for a in angles.tolist()])
+    steps = np.arange(max(max_range, 0) + 1)
+    step_y = sin[:, None] * steps
+    step_x = cos[:, None] * steps
+    near_half = ((np.abs(np.abs(step_y) % 1 - 0.5) < 1e-6) |
+                 (np.abs(np.abs(step_x) % 1 - 0.5) < 1e-6))
+    table = RayTable(angles, sin, cos, step_y, step_x,
+                     np.rint(step_y).astype(np.int32), np.rint(step_x).astype(np.int32),
+                     near_half)
+    for array in table:
+        array.flags.writeable = False
+    return table
+
+
+def translate_ray_table(table, position, rays, begin, end):
+    """
+    把偏移表平移到雷达位置，得到采样点所在的格子
+    
+    Args:
+        table: get_ray_table返回的RayTable
+        position: 雷达位置 [y, x]
+        rays: 射线（表中的行）索引数组
+        begin, end: 步长范围 [begin, end)
+        
+    Returns:
+        grid_y, grid_x: 形状为 (len(rays), end - begin) 的格子坐标，
+                        与 int(round(y + sin * step)) 逐点计算的结果相同
+    """
+    y, x = position
+    step_y = table.step_y[rays, begin:end]
+    step_x = table.step_x[rays, begin:end]
+    if not (float(y).is_integer() and float(x).is_integer()):
+        return np.rint(y + step_y).astype(np.int64), np.rint(x + step_x).astype(np.int64)
+    
+    # 整数位置：直接平移整数偏移；小数部分接近0.5的点按实际位置重新取整
+    grid_y = int(y) + table.offset_y[rays, begin:end].astype(np.int64)
+    grid_x = int(x) + table.offset_x[rays, begin:end].astype(np.int64)
+    near_half = table.near_half[rays, begin:end]
+    if near_half.any():
+        grid_y[near_half] = np.rint(y + step_y[near_half])
+        grid_x[near_half] = np.rint(x + step_x[near_half])
+    return grid_y, grid_x
+
+
+def ray_table_cache_info():
+    """射线偏移表缓存的命中/未命中统计 (hits, misses, maxsize, currsize)"""
+    return get_ray_table.cache_info()
+
 
 class Radar:
-    def __init__(self, map_array, position, max_range=None):
+    def __init__(self, map_array, position, max_range=None, distance_field=None):
         """
         初始化雷达
         
@@ -11,8 +99,13 @@ class Radar:
             map_array: 二维numpy数组，0表示空白，1表示障碍物
             position: 雷达位置 [y, x] （行，列）
             max_range: 最大扫描距离，如果为None则使用地图对角线长度
+            distance_field: 可选，地图的距离场（见distance_field.py），'sdf'扫描使用；
+                            为None时在第一次'sdf'扫描时计算（map_array不是ndarray时
+                            只计算雷达周围的窗口，见sdf_field）
         """
         self.map = map_array
+        self.distance_field = distance_field
+        self.window_field = None  # ((row0, row1, col0, col1, 地图版本), 窗口的距离场)
         self.position = position  # [y, x]
         self.height, self.width = map_array.shape
         
@@ -24,18 +117,90 @@ class Radar:
         
         # 存储扫描结果
         self.scan_results = {}
+        
+        # 地图版本号：地图每次被修改时加1，作为扫描缓存键的一部分
+        self.map_version = 0
+        # 扫描结果缓存 {(位置, 最大距离, 角度步长, 方法, 地图版本): (scan_data, visited)}
+        self.scan_cache = OrderedDict()
+        self.scan_cache_size = 8
+        self.scan_cache_hits = 0
+        self.scan_cache_misses = 0
+    
+    def set_cell(self, y, x, value):
+        """修改地图中的一个格子（0空白，1障碍物）"""
+        self.map[y, x] = value
+        self.mark_map_changed()
     
-    def cast_ray(self, angle_degrees):
+    def mark_map_changed(self):
+        """地图被修改后调用，使之前缓存的扫描结果和距离场失效"""
+        self.map_version += 1
+        self.scan_cache.clear()
+        self.distance_field = None
+        self.window_field = None
+    
+    def get_distance_field(self):
+        """整张地图的距离场（没有时现算，会读取整张地图）"""
+        if self.distance_field is None:
+            self.distance_field = compute_distance_field(self.map)
+        return self.distance_field
+    
+    def sdf_field(self):
+        """
+        'sdf'扫描使用的距离场及其左上角 (field, row0, col0)
+        
+        地图是ndarray或已有整张地图的距离场时直接使用整张地图的距离场；
+        TiledMap、OccupancyGrid等地图只对雷达位置 ± (max_range + 1) 的窗口计算
+        （同一窗口复用），扫描只读取窗口覆盖的瓦片。窗口外的墙壁在窗口的距离场
+        中看不到，scan_360_sdf跳步时把窗口边界和地图边界一样计入，结果不变。
+        """
+        if self.distance_field is not None or isinstance(self.map, np.ndarray):
+            return self.get_distance_field(), 0, 0
+        y, x = self.position
+        reach = self.max_range + 1
+        row0 = max(math.floor(y) - reach, 0)
+        row1 = min(math.ceil(y) + reach + 1, self.height)
+        col0 = max(math.floor(x) - reach, 0)
+        col1 = min(math.ceil(x) + reach + 1, self.width)
+        key = (row0, row1, col0, col1, self.map_version)
+        if self.window_field is None or self.window_field[0] != key:
+            self.window_field = (key, compute_distance_field(self.map[row0:row1, col0:col1]))
+        return self.window_field[1], row0, col0
+    
+    def scan_cache_key(self, angle_step, method):
+        y, x = self.position
+        return (float(y), float(x), self.max_range, angle_step, method, self.map_version)
+    
+    def get_cached_scan(self, key):
+        """读取缓存的扫描结果，未命中时返回None"""
+        entry = self.scan_cache.get(key)
+        if entry is None:
+            self.scan_cache_misses += 1
+            return None
+        self.scan_cache_hits += 1
+        self.scan_cache.move_to_end(key)
+        return entry
+    
+    def put_cached_scan(self, key, scan_data, visited=None):
+        self.scan_cache[key] = (scan_data, visited)
+        self.scan_cache.move_to_end(key)
+        while len(self.scan_cache) > self.scan_cache_size:
+            self.scan_cache.popitem(last=False)
+    
+    def cast_ray(self, angle_degrees, method='loop'):
         """
         向指定角度发射射线
         
         Args:
             angle_degrees: 射线角度（度）
+            method: 'loop' 按单位步长逐步推进并取整；'dda' 精确网格遍历（见cast_ray_dda）
             
         Returns:
             distance: 射线到达障碍物的距离，如果没有遇到障碍物则返回max_range
             hit_point: 碰撞点坐标 [y, x]，如果没有碰撞则为None
         """
+        if method == 'dda':
+            return self.cast_ray_dda(angle_degrees)
+        
         # 将角度转换为弧度
         angle_rad = math.radians(angle_degrees)
         
@@ -69,25 +234,318 @@ class Radar:
         # 如果没有碰撞，返回最大距离
         return self.max_range, None
     
-    def scan_360(self, angle_step=1):
+    def cast_ray_dda(self, angle_degrees):
+        """
+        用Amanatides-Woo（DDA）算法发射射线
+        
+        格子(i, j)覆盖 [i-0.5, i+0.5) x [j-0.5, j+0.5)，射线按穿过格子边界的
+        顺序逐格前进，只访问射线真正经过的格子，代价与经过的格子数成正比。
+        射线恰好穿过格子角点时，两侧的格子也会检查，不会斜着穿过墙角。
+        
+        Args:
+            angle_degrees: 射线角度（度）
+            
+        Returns:
+            distance: 射线进入碰撞格子时的精确距离，如果没有遇到障碍物则返回max_range
+            hit_point: 碰撞格子坐标 [y, x]（越界时为地图外的格子），如果没有碰撞则为None
+        """
+        angle_rad = math.radians(angle_degrees)
+        dy = math.sin(angle_rad)
+        dx = math.cos(angle_rad)
+        
+        y, x = self.position
+        grid_y = int(round(y))
+        grid_x = int(round(x))
+        
+        # 每个方向上：步进方向、到下一条格子边界的距离、跨过一个格子的距离
+        step_y = 1 if dy > 0 else -1
+        step_x = 1 if dx > 0 else -1
+        if abs(dy) > 1e-12:
+            t_max_y = (grid_y + 0.5 * step_y - y) / dy
+            t_delta_y = 1.0 / abs(dy)
+        else:
+            t_max_y = t_delta_y = math.inf
+        if abs(dx) > 1e-12:
+            t_max_x = (grid_x + 0.5 * step_x - x) / dx
+            t_delta_x = 1.0 / abs(dx)
+        else:
+            t_max_x = t_delta_x = math.inf
+        
+        t = 0.0
+        grid, height, width = self.map, self.height, self.width
+        max_range = self.max_range
+        while True:
+            if (grid_y < 0 or grid_y >= height or grid_x < 0 or grid_x >= width or
+                    grid[grid_y, grid_x] == 1):
+                return t, [grid_y, grid_x]
+            
+            if t_max_x < t_max_y - 1e-9:
+                t = t_max_x
+                grid_x += step_x
+                t_max_x += t_delta_x
+            elif t_max_y < t_max_x - 1e-9:
+                t = t_max_y
+                grid_y += step_y
+                t_max_y += t_delta_y
+            else:
+                # 穿过角点：检查相邻的两个格子
+                t = t_max_x
+                if t >= max_range:
+                    return max_range, None
+                for cell_y, cell_x in ((grid_y, grid_x + step_x), (grid_y + step_y, grid_x)):
+                    if self.is_blocked(cell_y, cell_x):
+                        return t, [cell_y, cell_x]
+                grid_y += step_y
+                grid_x += step_x
+                t_max_x += t_delta_x
+                t_max_y += t_delta_y
+            
+            if t >= max_range:
+                return max_range, None
+    
+    def is_blocked(self, grid_y, grid_x):
+        """格子越界或是障碍物"""
+        return (grid_y < 0 or grid_y >= self.height or
+                grid_x < 0 or grid_x >= self.width or
+                self.map[grid_y, grid_x] == 1)
+    
+    def scan_360(self, angle_step=1, method='loop', use_cache=True):
         """
         进行360度扫描
         
         Args:
             angle_step: 角度步长（度）
+            method: 'loop' 逐条射线逐步推进；'numpy' 所有射线一次向量化计算；
+                    'dda' 逐条射线精确网格遍历；'sdf' 按距离场跳步的球面追踪
+                    （结果与'loop'相同）
+            use_cache: 同一位置、同一设置、地图未修改时是否直接返回缓存的扫描结果
             
         Returns:
             scan_data: 字典，键为角度，值为 (距离, 碰撞点)
         """
-        scan_data = {}
+        key = self.scan_cache_key(angle_step, method)
+        cached = self.get_cached_scan(key) if use_cache else None
+        if cached is not None:
+            self.scan_results = cached[0]
+            return cached[0]
         
-        for angle in range(0, 360, angle_step):
-            distance, hit_point = self.cast_ray(angle)
-            scan_data[angle] = (distance, hit_point)
+        if method == 'numpy':
+            scan_data = self.scan_array_to_dict(self.scan_360_array(angle_step))
+        elif method == 'sdf':
+            scan_data = self.scan_array_to_dict(self.scan_360_sdf(angle_step))
+        else:
+            scan_data = {}
+            for angle in range(0, 360, angle_step):
+                distance, hit_point = self.cast_ray(angle, method)
+                scan_data[angle] = (distance, hit_point)
         
+        self.put_cached_scan(key, scan_data)
         self.scan_results = scan_data
         return scan_data
     
+    def scan_360_array(self, angle_step=1, return_visited=False):
+        """
+        向量化360度扫描，结果与逐条cast_ray相同
+        
+        所有射线的采样点组成二维坐标数组（行=射线，列=步），越界或碰到
+        障碍物的位置组成掩码，用argmax取每条射线的第一个碰撞。采样偏移
+        取自get_ray_table缓存的偏移表，不再重复计算三角函数。
+        
+        Args:
+            angle_step: 角度步长（度）
+            return_visited: 是否同时返回射线经过的格子
+            
+        Returns:
+            scan: 结构化数组，字段为 angle, distance, hit（是否碰撞）,
+                  hit_y, hit_x（无碰撞时为-1）
+            visited: （仅当return_visited为True）射线经过的地图内格子的一维索引
+                     (row * width + col)，已去重；每条射线包含步长 0..int(distance)
+        """
+        table = get_ray_table(self.max_range, angle_step)
+        angles = table.angles
+        scan = np.zeros(len(angles), dtype=SCAN_DTYPE)
+        scan['angle'] = angles
+        scan['distance'] = self.max_range
+        scan['hit_y'] = -1
+        scan['hit_x'] = -1
+        visited = []
+        
+        # 采样点坐标按步长分块计算：每块是 (仍未碰撞的射线数, 块长) 的二维数组，
+        # 已碰撞的射线不再参与后续块，块长逐次翻倍
+        y, x = self.position
+        active = np.arange(len(angles))
+        begin, chunk = 0, 16
+        while begin < self.max_range and len(active) > 0:
+            end = min(begin + chunk, self.max_range)
+            steps = np.arange(begin, end)
+            step_y = table.step_y[active, begin:end]
+            step_x = table.step_x[active, begin:end]
+            grid_y, grid_x = translate_ray_table(table, self.position, active, begin, end)
+            
+            # 越界或碰到障碍物即为碰撞
+            out = (grid_y < 0) | (grid_y >= self.height) | (grid_x < 0) | (grid_x >= self.width)
+            blocked = out.copy()
+            inside = ~out
+            blocked[inside] = self.map[grid_y[inside], grid_x[inside]] == 1
+            
+            # 每条射线在本块中的第一个碰撞
+            first = blocked.argmax(axis=1)
+            rows = np.nonzero(blocked[np.arange(len(active)), first])[0]
+            k = first[rows]
+            rays = active[rows]
+            
+            current_y = y + step_y[rows, k]
+            current_x = x + step_x[rows, k]
+            distance = np.sqrt((current_y - y)**2 + (current_x - x)**2)
+            # 越界时距离为步数
+            distance = np.where(out[rows, k], steps[k], distance)
+            
+            scan['hit'][rays] = True
+            scan['distance'][rays] = distance
+            scan['hit_y'][rays] = grid_y[rows, k]
+            scan['hit_x'][rays] = grid_x[rows, k]
+            scan['out'][rays] = out[rows, k]
+            
+            if return_visited:
+                # 本块中经过的格子：已碰撞的射线只到 int(distance) 步
+                limit = np.full(len(active), end)
+                limit[rows] = distance.astype(np.int64)
+                passed = inside & (steps[None, :] <= limit[:, None])
+                visited.append(grid_y[passed] * self.width + grid_x[passed])
+            
+            active = np.delete(active, rows)
+            begin = end
+            chunk *= 2
+        
+        if not return_visited:
+            return scan
+        
+        # 没有碰撞的射线距离为max_range，还要包含第max_range步
+        if len(active) > 0 and self.max_range >= 0:
+            grid_y, grid_x = translate_ray_table(table, self.position, active,
+                                                 self.max_range, self.max_range + 1)
+            inside = (grid_y >= 0) & (grid_y < self.height) & (grid_x >= 0) & (grid_x < self.width)
+            visited.append(grid_y[inside] * self.width + grid_x[inside])
+        visited = np.unique(np.concatenate(visited)) if visited else np.zeros(0, dtype=np.int64)
+        return scan, visited
+    
+    def scan_360_sdf(self, angle_step=1, return_visited=False):
+        """
+        用距离场做球面追踪的向量化360度扫描，结果与逐条cast_ray相同
+        
+        射线仍在整数步长处采样，但第s步的格子c离墙壁（和地图边界外的格子）
+        至少为E时，之后第s'步的格子与c相距不超过 (s' - s) + sqrt(2)
+        （两次取整各偏差不超过sqrt(2)/2），所以 s' - s < E - sqrt(2) 的采样
+        都不会碰撞，可以直接跳过。空旷区域一次跳过许多步。
+        
+        Args:
+            angle_step: 角度步长（度）
+            return_visited: 是否同时返回射线经过的格子
+            
+        Returns:
+            scan: 结构化数组，格式与scan_360_array相同
+            visited: （仅当return_visited为True）与scan_360_array相同；跳过的采样
+                     不必检查碰撞，经过的格子在得到距离后由偏移表一次求出
+        """
+        table = get_ray_table(self.max_range, angle_step)
+        field, row0, col0 = self.sdf_field()
+        row1, col1 = row0 + field.shape[0], col0 + field.shape[1]
+        angles = table.angles
+        scan = np.zeros(len(angles), dtype=SCAN_DTYPE)
+        scan['angle'] = angles
+        scan['distance'] = self.max_range
+        scan['hit_y'] = -1
+        scan['hit_x'] = -1
+        
+        y, x = self.position
+        active = np.arange(len(angles))
+        step = np.zeros(len(angles), dtype=np.int64)
+        while len(active) > 0:
+            current_y = y + table.sin[active] * step
+            current_x = x + table.cos[active] * step
+            grid_y = np.rint(current_y).astype(np.int64)
+            grid_x = np.rint(current_x).astype(np.int64)
+            
+            out = (grid_y < 0) | (grid_y >= self.height) | (grid_x < 0) | (grid_x >= self.width)
+            blocked = out.copy()
+            inside = ~out
+            blocked[inside] = self.map[grid_y[inside], grid_x[inside]] == 1
+            
+            rays = active[blocked]
+            distance = np.sqrt((current_y[blocked] - y)**2 + (current_x[blocked] - x)**2)
+            scan['hit'][rays] = True
+            scan['distance'][rays] = np.where(out[blocked], step[blocked], distance)
+            scan['hit_y'][rays] = grid_y[blocked]
+            scan['hit_x'][rays] = grid_x[blocked]
+            scan['out'][rays] = out[blocked]
+            
+            # 未碰撞的射线：按到墙壁和距离场范围（地图或窗口）之外的距离跳步
+            free = ~blocked
+            grid_y, grid_x = grid_y[free], grid_x[free]
+            clearance = np.minimum.reduce([
+                np.asarray(field[grid_y - row0, grid_x - col0], dtype=np.float64),
+                grid_y - row0 + 1.0, grid_x - col0 + 1.0, row1 - grid_y, col1 - grid_x])
+            jump = np.maximum(np.floor(clearance - math.sqrt(2) - FIELD_EPS), 1).astype(np.int64)
+            step = step[free] + jump
+            active = active[free]
+            within = step < self.max_range
+            active, step = active[within], step[within]
+        
+        if not return_visited:
+            return scan
+        
+        # 每条射线经过第 0..int(distance) 步（没有碰撞时到第max_range步）
+        grid_y, grid_x = translate_ray_table(table, self.position, np.arange(len(angles)),
+                                             0, self.max_range + 1)
+        limit = scan['distance'].astype(np.int64)
+        passed = ((np.arange(self.max_range + 1)[None, :] <= limit[:, None]) &
+                  (grid_y >= 0) & (grid_y < self.height) & (grid_x >= 0) & (grid_x < self.width))
+        return scan, np.unique(grid_y[passed] * self.width + grid_x[passed])
+    
+    def scan_and_mark(self, angle_step=1, explored_map=None, method='numpy'):
+        """
+        一次向量化扫描同时得到碰撞结果和射线经过的格子
+        
+        Args:
+            angle_step: 角度步长（度）
+            explored_map: 可选，与地图同形状的布尔数组；经过的格子会直接写入其中
+            method: 'numpy' 逐步向量化扫描（scan_360_array）/ 'sdf' 球面追踪（scan_360_sdf）
+            
+        Returns:
+            scan_data: 与scan_360相同的字典 {角度: (距离, 碰撞点)}
+            cells: 经过的格子的一维索引；传入explored_map时只返回本次新探索的格子
+        """
+        key = self.scan_cache_key(angle_step, method)
+        cached = self.get_cached_scan(key)
+        if cached is not None and cached[1] is not None:
+            scan_data, cells = cached
+        else:
+            scan_function = self.scan_360_sdf if method == 'sdf' else self.scan_360_array
+            scan, cells = scan_function(angle_step, return_visited=True)
+            scan_data = self.scan_array_to_dict(scan)
+            self.put_cached_scan(key, scan_data, cells)
+        
+        if explored_map is not None:
+            cells = cells[~explored_map.flat[cells]]
+            explored_map.flat[cells] = True
+        self.scan_results = scan_data
+        return scan_data, cells
+    
+    @staticmethod
+    def scan_array_to_dict(scan):
+        """
+        把结构化扫描结果转换为scan_360的字典格式 {角度: (距离, 碰撞点)}
+        """
+        scan_data = {}
+        for angle, distance, hit, hit_y, hit_x, out in scan.tolist():
+            if not hit:
+                scan_data[angle] = (int(distance), None)
+            elif out:
+                scan_data[angle] = (int(distance), [hit_y, hit_x])
+            else:
+                scan_data[angle] = (distance, [hit_y, hit_x])
+        return scan_data
+    
     def get_scan_distances(self, angle_step=1):
         """
         获取360度扫描的距离数组
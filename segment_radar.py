@@ -0,0 +1,162 @@
+"""
+基于线段的矢量雷达
+
+直接用地图JSON中的墙壁线段求射线交点，不生成栅格地图：距离是精确的
+浮点值（不受格子取整影响），内存只与线段数有关，适合超大地图。
+线段用SegmentIndex（均匀网格）索引，扫描时只检查max_range范围内的线段。
+
+坐标与Radar一致：位置和碰撞点为 [y, x]，单位为格子（JSON坐标乘以resolution），
+角度0度指向x正方向，90度指向y正方向。给出bounds时与Radar一样把地图边界
+（格子外沿）当作墙壁。
+"""
+import math
+
+import numpy as np
+
+from generate_map import segment_index_from_json
+from spatial_index import ray_segment_distances
+
+# 一次求交的 射线数 x 线段数 上限，超过时按线段分块
+INTERSECT_CHUNK = 1 << 20
+
+
+class SegmentRadar:
+    def __init__(self, index, position, max_range=None, bounds=None):
+        """
+        Args:
+            index: 墙壁线段的SegmentIndex
+            position: 雷达位置 [y, x]
+            max_range: 最大扫描距离，None时使用地图（或线段包围盒）的对角线长度
+            bounds: 地图形状 (行数, 列数)，射线在格子外沿 y = -0.5 / 行数 - 0.5、
+                    x = -0.5 / 列数 - 0.5 处停止；None表示没有边界
+        """
+        self.index = index
+        self.position = position  # [y, x]
+        self.bounds = bounds
+        if max_range is None:
+            extent = bounds if bounds is not None else index.max_corner - index.min_corner
+            self.max_range = int(math.hypot(*extent)) + 1
+        else:
+            self.max_range = max_range
+        self.scan_results = {}
+
+    @classmethod
+    def from_json(cls, json_file, position=None, max_range=None, resolution=5, cell_size=None):
+        """
+        由地图JSON构建雷达（坐标与generate_map_from_json生成的地图一致）
+
+        Args:
+            json_file: 地图JSON文件
+            position: 雷达位置 [y, x]，None时使用JSON中的起始点
+            max_range: 最大扫描距离
+            resolution: 每个JSON坐标单位对应的格子数
+            cell_size: 索引的桶边长，None时自动选择
+        """
+        index, shape, start_pos = segment_index_from_json(json_file, resolution, cell_size)
+        return cls(index, start_pos if position is None else position, max_range, shape)
+
+    def move_radar(self, new_position):
+        self.position = new_position
+        self.scan_results = {}
+
+    def origin(self):
+        """雷达位置的 [x, y] 坐标（索引使用的坐标顺序）"""
+        return np.array([self.position[1], self.position[0]], dtype=float)
+
+    def boundary_distances(self, directions):
+        """射线到地图外沿的距离（没有bounds时为inf）"""
+        if self.bounds is None:
+            return np.full(len(directions), np.inf)
+        origin = self.origin()
+        upper = np.array([self.bounds[1], self.bounds[0]]) - 0.5
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(directions > 0, (upper - origin) / directions,
+                         np.where(directions < 0, (-0.5 - origin) / directions, np.inf))
+        return np.maximum(t.min(axis=1), 0.0)
+
+    def cast_ray(self, angle_degrees):
+        """
+        向指定角度发射射线，沿索引的桶逐个检查线段
+
+        Returns:
+            distance: 碰撞距离，无碰撞时为max_range
+            hit_point: 碰撞点 [y, x]（浮点），无碰撞时为None
+        """
+        angle = math.radians(angle_degrees)
+        direction = (math.cos(angle), math.sin(angle))
+        boundary = float(self.boundary_distances(np.array([direction]))[0])
+        distance, _ = self.index.ray_cast(self.origin(), direction, min(self.max_range, boundary))
+        if distance is None:
+            distance = boundary
+        if distance > self.max_range:
+            return self.max_range, None
+        y, x = self.position
+        return distance, [y + distance * direction[1], x + distance * direction[0]]
+
+    def scan_arrays(self, angle_step=1):
+        """
+        向量化360度扫描：先取出max_range范围内的线段，再一次求出所有射线的交点
+
+        Returns:
+            angles: 角度数组
+            distances: 碰撞距离数组，无碰撞时为max_range
+            hit: 是否碰到线段或地图边界
+            segments: 碰到的线段编号数组，没有碰到线段时为-1
+        """
+        angles = np.arange(0, 360, angle_step)
+        radians = np.radians(angles)
+        directions = np.column_stack([np.cos(radians), np.sin(radians)])
+        origin = self.origin()
+
+        r = self.max_range
+        candidates = self.index.query_box(origin[0] - r, origin[1] - r, origin[0] + r, origin[1] + r)
+        best = np.full(len(angles), np.inf)
+        segments = np.full(len(angles), -1, dtype=np.int64)
+        chunk = max(1, INTERSECT_CHUNK // len(angles))
+        for begin in range(0, len(candidates), chunk):
+            items = candidates[begin:begin + chunk]
+            t = ray_segment_distances(origin, directions, self.index.starts[items], self.index.ends[items])
+            k = np.argmin(t, axis=1)
+            t_min = t[np.arange(len(angles)), k]
+            closer = t_min < best
+            best[closer] = t_min[closer]
+            segments[closer] = items[k[closer]]
+
+        boundary = self.boundary_distances(directions)
+        segments[boundary < best] = -1
+        best = np.minimum(best, boundary)
+        hit = best <= r
+        segments[~hit] = -1
+        distances = np.where(hit, best, r)
+        return angles, distances, hit, segments
+
+    def scan_360(self, angle_step=1):
+        """
+        进行360度扫描
+
+        Returns:
+            scan_data: 字典，键为角度，值为 (距离, 碰撞点)，格式与Radar.scan_360相同
+                       （碰撞点为浮点坐标）
+        """
+        angles, distances, hit, _ = self.scan_arrays(angle_step)
+        radians = np.radians(angles)
+        y, x = self.position
+        hit_y = y + distances * np.sin(radians)
+        hit_x = x + distances * np.cos(radians)
+        scan_data = {}
+        for angle, distance, is_hit, py, px in zip(angles.tolist(), distances.tolist(), hit.tolist(),
+                                                   hit_y.tolist(), hit_x.tolist()):
+            scan_data[angle] = (distance, [py, px]) if is_hit else (self.max_range, None)
+        self.scan_results = scan_data
+        return scan_data
+
+    def get_scan_points(self, angle_step=1):
+        """
+        获取扫描碰撞点
+
+        Returns:
+            points: 碰撞点列表 [(y, x), ...]
+        """
+        if not self.scan_results:
+            self.scan_360(angle_step)
+        return [tuple(hit_point) for _, hit_point in self.scan_results.values() if hit_point is not None]
@@ -0,0 +1,279 @@
+"""
+墙壁线段的空间索引
+
+均匀网格（桶）索引：平面按cell_size划分为桶，每条线段登记在其包围盒
+覆盖的所有桶中（CSR格式：cell_start给出每个桶在cell_items中的起止位置）。
+查询只检查相关桶里的线段，不必遍历全部线段：
+    nearest        离一点最近的墙壁（按桶环向外扩展）
+    within_radius  一点周围半径内的墙壁
+    ray_cast       射线碰到的第一面墙壁（按DDA逐桶推进）
+坐标为 [x, y]。由地图JSON构建见 generate_map.segment_index_from_json。
+"""
+import math
+
+import numpy as np
+
+
+def ray_segment_distances(origin, directions, starts, ends):
+    """
+    射线与线段求交（向量化）
+
+    Args:
+        origin: 射线起点 [x, y]
+        directions: 单位方向数组 (R, 2)，每行为 [dx, dy]
+        starts, ends: 线段端点数组 (S, 2)
+
+    Returns:
+        t: (R, S) 数组，射线到线段的距离（沿射线），不相交为inf；
+           共线重叠时为到重叠部分最近点的距离
+    """
+    directions = np.asarray(directions, dtype=float).reshape(-1, 2)
+    a = np.asarray(starts, dtype=float).reshape(-1, 2) - origin
+    e = np.asarray(ends, dtype=float).reshape(-1, 2) - np.asarray(starts, dtype=float).reshape(-1, 2)
+    dx, dy = directions[:, 0:1], directions[:, 1:2]
+    ax, ay, ex, ey = a[:, 0], a[:, 1], e[:, 0], e[:, 1]
+
+    denom = dx * ey - dy * ex                 # cross(d, e)
+    cross_ae = ax * ey - ay * ex              # cross(a, e)
+    cross_ad = ax * dy - ay * dx              # cross(a, d)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = cross_ae / denom
+        u = cross_ad / denom
+    eps = 1e-12
+    hit = (np.abs(denom) > eps) & (t >= -eps) & (u >= -eps) & (u <= 1 + eps)
+    t = np.where(hit, np.maximum(t, 0.0), np.inf)
+
+    # 平行：只有共线（包括退化为点的线段落在射线上）时才相交
+    parallel = np.abs(denom) <= eps
+    if parallel.any():
+        collinear = parallel & (np.abs(cross_ad) <= 1e-9)
+        t_a = dx * ax + dy * ay               # 端点在射线上的投影
+        t_b = dx * (ax + ex) + dy * (ay + ey)
+        near = np.minimum(t_a, t_b)
+        far = np.maximum(t_a, t_b)
+        t = np.where(collinear & (far >= -eps), np.maximum(near, 0.0), t)
+    return t
+
+
+def point_segment_distances(point, starts, ends):
+    """
+    点到线段的距离（向量化）
+
+    Returns:
+        distances: (S,) 数组
+        closest: (S, 2) 数组，线段上离点最近的位置
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    e = np.asarray(ends, dtype=float).reshape(-1, 2) - starts
+    length2 = (e * e).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        u = ((np.asarray(point, dtype=float) - starts) * e).sum(axis=1) / length2
+    u = np.clip(np.nan_to_num(u), 0.0, 1.0)
+    closest = starts + u[:, None] * e
+    return np.hypot(*(closest - point).T), closest
+
+
+class SegmentIndex:
+    """线段的均匀网格索引"""
+
+    def __init__(self, starts, ends, cell_size=None):
+        """
+        Args:
+            starts, ends: 线段端点数组 (N, 2)，每行为 [x, y]
+            cell_size: 桶的边长，None时取使桶数与线段数同一量级的大小
+                       （但不小于线段的平均包围盒边长）
+        """
+        self.starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        self.ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        n = len(self.starts)
+        lo = np.minimum(self.starts, self.ends)
+        hi = np.maximum(self.starts, self.ends)
+        self.min_corner = lo.min(axis=0) if n else np.zeros(2)
+        self.max_corner = hi.max(axis=0) if n else np.zeros(2)
+
+        if cell_size is None:
+            extent = np.maximum(self.max_corner - self.min_corner, 1.0)
+            cell_size = max(math.sqrt(extent[0] * extent[1] / max(n, 1)),
+                            float((hi - lo).max(axis=1).mean()) if n else 1.0, 1e-9)
+        self.cell_size = float(cell_size)
+        self.nx, self.ny = (np.floor((self.max_corner - self.min_corner) / self.cell_size)
+                            .astype(np.int64) + 1).tolist()
+
+        # 每条线段登记在其包围盒覆盖的桶中
+        c0 = self.cell_of(lo)
+        c1 = self.cell_of(hi)
+        span_x = c1[:, 0] - c0[:, 0] + 1
+        span_y = c1[:, 1] - c0[:, 1] + 1
+        counts = span_x * span_y
+        segment = np.repeat(np.arange(n), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cx = c0[segment, 0] + k % span_x[segment]
+        cy = c0[segment, 1] + k // span_x[segment]
+        cell = cy * self.nx + cx
+        order = np.argsort(cell, kind='stable')
+        self.cell_items = segment[order]
+        self.cell_start = np.zeros(self.nx * self.ny + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell, minlength=self.nx * self.ny), out=self.cell_start[1:])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def cell_of(self, points):
+        """点所在的桶坐标 [cx, cy]（裁剪到网格内）"""
+        cells = np.floor((np.asarray(points, dtype=float) - self.min_corner) / self.cell_size)
+        return np.clip(cells, 0, [self.nx - 1, self.ny - 1]).astype(np.int64)
+
+    def cell_segments(self, cx, cy):
+        """一个桶中的线段编号"""
+        cell = cy * self.nx + cx
+        return self.cell_items[self.cell_start[cell]:self.cell_start[cell + 1]]
+
+    def row_items(self, cy, cx0, cx1):
+        """第cy行中第cx0..cx1个桶的线段编号（相邻的桶在cell_items中是连续的）"""
+        row = cy * self.nx
+        return self.cell_items[self.cell_start[row + cx0]:self.cell_start[row + cx1 + 1]]
+
+    def query_box(self, x0, y0, x1, y1):
+        """包围盒可能与矩形 [x0, x1] x [y0, y1] 相交的线段编号（已去重）"""
+        if (len(self) == 0 or x1 < self.min_corner[0] or y1 < self.min_corner[1] or
+                x0 > self.max_corner[0] or y0 > self.max_corner[1]):
+            return np.zeros(0, dtype=np.int64)
+        (cx0, cy0), (cx1, cy1) = self.cell_of([[x0, y0], [x1, y1]]).tolist()
+        items = np.concatenate([self.row_items(cy, cx0, cx1) for cy in range(cy0, cy1 + 1)])
+        return np.unique(items)
+
+    def ring_items(self, cx, cy, k):
+        """与桶 (cx, cy) 的切比雪夫距离恰好为k的桶中的线段编号（可能重复）"""
+        cx0, cx1 = max(cx - k, 0), min(cx + k, self.nx - 1)
+        parts = []
+        for cy_edge in {cy - k, cy + k}:
+            if 0 <= cy_edge < self.ny:
+                parts.append(self.row_items(cy_edge, cx0, cx1))
+        if k > 0:
+            for row in range(max(cy - k + 1, 0), min(cy + k, self.ny)):
+                for cx_edge in (cx - k, cx + k):
+                    if 0 <= cx_edge < self.nx:
+                        parts.append(self.cell_segments(cx_edge, row))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def nearest(self, point, max_distance=math.inf):
+        """
+        离一点最近的线段
+
+        从点所在的桶开始逐环向外检查：检查完第k环后，其余线段离点至少
+        k * cell_size，当前最近距离不超过它时即可停止。
+
+        Args:
+            point: 查询点 [x, y]（可以在网格外）
+            max_distance: 只查找此距离内的线段
+
+        Returns:
+            distance: 最近距离，没有时为None
+            segment: 线段编号，没有时为None
+            closest: 线段上的最近点 [x, y]，没有时为None
+        """
+        if len(self) == 0:
+            return None, None, None
+        point = np.asarray(point, dtype=float)
+        (cx, cy), = self.cell_of([point]).tolist()
+        best = (math.inf, None, None)
+        max_ring = max(cx, self.nx - 1 - cx, cy, self.ny - 1 - cy)
+        for k in range(max_ring + 1):
+            if k > 0 and (best[0] <= (k - 1) * self.cell_size or (k - 1) * self.cell_size > max_distance):
+                break
+            items = self.ring_items(cx, cy, k)
+            if len(items):
+                distances, closest = point_segment_distances(point, self.starts[items], self.ends[items])
+                i = int(np.argmin(distances))
+                if distances[i] < best[0]:
+                    best = (float(distances[i]), int(items[i]), closest[i])
+        if best[0] > max_distance:
+            return None, None, None
+        return best
+
+    def within_radius(self, point, radius):
+        """
+        与点的距离不超过radius的线段
+
+        Returns:
+            segments: 线段编号数组（升序）
+            distances: 对应的距离数组
+        """
+        point = np.asarray(point, dtype=float)
+        items = self.query_box(point[0] - radius, point[1] - radius, point[0] + radius, point[1] + radius)
+        distances, _ = point_segment_distances(point, self.starts[items], self.ends[items])
+        inside = distances <= radius
+        return items[inside], distances[inside]
+
+    def ray_cast(self, origin, direction, max_range=math.inf):
+        """
+        求射线碰到的第一条线段
+
+        沿射线按穿过桶边界的顺序（DDA）逐桶检查，桶内找到的交点不超过
+        当前桶的出口距离时即可停止。
+
+        Args:
+            origin: 射线起点 [x, y]
+            direction: 单位方向 [dx, dy]
+            max_range: 最大距离
+
+        Returns:
+            distance: 碰撞距离，没有碰撞时为None
+            segment: 碰到的线段编号，没有碰撞时为None
+        """
+        if len(self) == 0:
+            return None, None
+        origin = np.asarray(origin, dtype=float)
+        dx, dy = float(direction[0]), float(direction[1])
+
+        # 把射线裁剪到网格包围盒（slab法）
+        t_enter, t_exit = 0.0, max_range
+        for o, d, lo, hi in ((origin[0], dx, self.min_corner[0], self.max_corner[0]),
+                             (origin[1], dy, self.min_corner[1], self.max_corner[1])):
+            if abs(d) < 1e-15:
+                if o < lo or o > hi:
+                    return None, None
+                continue
+            t0, t1 = (lo - o) / d, (hi - o) / d
+            t_enter, t_exit = max(t_enter, min(t0, t1)), min(t_exit, max(t0, t1))
+        if t_enter > t_exit:
+            return None, None
+
+        start = origin + t_enter * np.array([dx, dy])
+        (cx, cy), = self.cell_of([start]).tolist()
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        size = self.cell_size
+        if abs(dx) > 1e-15:
+            t_max_x = (self.min_corner[0] + (cx + (dx > 0)) * size - origin[0]) / dx
+            t_delta_x = size / abs(dx)
+        else:
+            t_max_x = t_delta_x = math.inf
+        if abs(dy) > 1e-15:
+            t_max_y = (self.min_corner[1] + (cy + (dy > 0)) * size - origin[1]) / dy
+            t_delta_y = size / abs(dy)
+        else:
+            t_max_y = t_delta_y = math.inf
+
+        best_t, best_segment = math.inf, None
+        ray = np.array([[dx, dy]])
+        while 0 <= cx < self.nx and 0 <= cy < self.ny:
+            items = self.cell_segments(cx, cy)
+            if len(items):
+                t = ray_segment_distances(origin, ray, self.starts[items], self.ends[items])[0]
+                k = int(np.argmin(t))
+                if t[k] < best_t:
+                    best_t, best_segment = float(t[k]), int(items[k])
+            cell_exit = min(t_max_x, t_max_y)
+            if best_t <= cell_exit or cell_exit > t_exit:
+                break
+            if t_max_x < t_max_y:
+                cx += step_x
+                t_max_x += t_delta_x
+            else:
+                cy += step_y
+                t_max_y += t_delta_y
+
+        if best_t > max_range:
+            return None, None
+        return best_t, best_segment
@@ -0,0 +1,245 @@
+"""
+分块（瓦片）存储的地图
+
+地图切成 tile_size x tile_size 的瓦片，保存在一个目录中：
+    tiles.npy  形状为 (瓦片行数, 瓦片列数, tile_size, tile_size) 的uint8数组，
+               每个瓦片在文件中连续，以内存映射方式按需读取
+    meta.json  地图尺寸、瓦片大小和起始位置
+最近使用的瓦片读入内存后放在有容量上限的LRU缓存中。按[行, 列]索引的
+接口与二维数组相同，Radar可以直接使用：扫描只会读取max_range范围内的
+少数几个瓦片。
+"""
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+TILE_SIZE = 256
+TILE_CACHE_SIZE = 64
+
+
+class TiledMap:
+    """内存映射的瓦片地图，1表示墙壁，0表示通道"""
+
+    def __init__(self, path, mode='r', cache_tiles=TILE_CACHE_SIZE):
+        """
+        Args:
+            path: 瓦片地图目录
+            mode: 内存映射模式，'r' 只读 / 'r+' 修改写回文件 / 'c' 修改只保留在内存中
+            cache_tiles: LRU中最多保留的瓦片数
+        """
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        self.height = meta['height']
+        self.width = meta['width']
+        self.tile_size = meta['tile_size']
+        self.start_pos = meta.get('start_pos')
+        self.tiles = np.load(os.path.join(path, 'tiles.npy'), mmap_mode=mode)
+        self.tiles_y, self.tiles_x = self.tiles.shape[:2]
+
+        self.cache = OrderedDict()  # (瓦片行, 瓦片列) -> 读入内存的瓦片
+        self.cache_size = cache_tiles
+        self.tile_hits = 0
+        self.tile_misses = 0
+
+    @classmethod
+    def create(cls, path, height, width, tile_size=TILE_SIZE, start_pos=None):
+        """
+        创建全部为通道的瓦片地图文件，返回以'r+'模式打开的TiledMap
+
+        Args:
+            path: 瓦片地图目录（不存在时创建）
+            height, width: 地图行数和列数
+            tile_size: 瓦片边长
+            start_pos: 起始位置 [row, col]，保存在meta.json中
+        """
+        os.makedirs(path, exist_ok=True)
+        shape = (-(-height // tile_size), -(-width // tile_size), tile_size, tile_size)
+        tiles = np.lib.format.open_memmap(os.path.join(path, 'tiles.npy'), mode='w+',
+                                          dtype=np.uint8, shape=shape)
+        del tiles
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'height': height, 'width': width, 'tile_size': tile_size,
+                       'start_pos': start_pos}, f)
+        return cls(path, mode='r+')
+
+    @property
+    def shape(self):
+        return (self.height, self.width)
+
+    def __len__(self):
+        return self.height
+
+    def tile(self, tile_y, tile_x):
+        """读取一个瓦片（经过LRU缓存）"""
+        key = (tile_y, tile_x)
+        tile = self.cache.get(key)
+        if tile is not None:
+            self.tile_hits += 1
+            self.cache.move_to_end(key)
+            return tile
+        self.tile_misses += 1
+        tile = np.array(self.tiles[tile_y, tile_x])
+        self.cache[key] = tile
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return tile
+
+    def cache_info(self):
+        """瓦片缓存统计"""
+        return {'hits': self.tile_hits, 'misses': self.tile_misses,
+                'cached': len(self.cache), 'max_cached': self.cache_size}
+
+    def check_index(self, row, col):
+        if not (-self.height <= row < self.height and -self.width <= col < self.width):
+            raise IndexError(f"索引 ({row}, {col}) 超出地图范围 {self.shape}")
+        return row % self.height, col % self.width
+
+    def lookup(self, rows, cols):
+        """按坐标数组读取格子，同一瓦片中的格子一起读取"""
+        rows, cols = np.broadcast_arrays(np.asarray(rows, dtype=np.int64),
+                                         np.asarray(cols, dtype=np.int64))
+        if rows.size and (rows.min() < -self.height or rows.max() >= self.height or
+                          cols.min() < -self.width or cols.max() >= self.width):
+            raise IndexError(f"索引超出地图范围 {self.shape}")
+        rows, cols = rows % self.height, cols % self.width
+        tile_y, offset_y = np.divmod(rows.ravel(), self.tile_size)
+        tile_x, offset_x = np.divmod(cols.ravel(), self.tile_size)
+
+        out = np.empty(rows.size, dtype=np.uint8)
+        tile_ids, inverse = np.unique(tile_y * self.tiles_x + tile_x, return_inverse=True)
+        for k, tile_id in enumerate(tile_ids.tolist()):
+            in_tile = inverse == k
+            tile = self.tile(*divmod(tile_id, self.tiles_x))
+            out[in_tile] = tile[offset_y[in_tile], offset_x[in_tile]]
+        return out.reshape(rows.shape)
+
+    def window(self, row0, row1, col0, col1):
+        """读取矩形区域 [row0, row1) x [col0, col1)，只读取与之相交的瓦片"""
+        size = self.tile_size
+        out = np.empty((max(row1 - row0, 0), max(col1 - col0, 0)), dtype=np.uint8)
+        for tile_y in range(row0 // size, (row1 - 1) // size + 1 if row1 > row0 else 0):
+            for tile_x in range(col0 // size, (col1 - 1) // size + 1 if col1 > col0 else 0):
+                y0, y1 = max(row0, tile_y * size), min(row1, (tile_y + 1) * size)
+                x0, x1 = max(col0, tile_x * size), min(col1, (tile_x + 1) * size)
+                tile = self.tile(tile_y, tile_x)
+                out[y0 - row0:y1 - row0, x0 - col0:x1 - col0] = \
+                    tile[y0 - tile_y * size:y1 - tile_y * size, x0 - tile_x * size:x1 - tile_x * size]
+        return out
+
+    def __getitem__(self, key):
+        row, col = key
+        if isinstance(row, (int, np.integer)) and isinstance(col, (int, np.integer)):
+            row, col = self.check_index(row, col)
+            return self.tile(row // self.tile_size, col // self.tile_size)[
+                row % self.tile_size, col % self.tile_size]
+        if isinstance(row, slice) or isinstance(col, slice):
+            # 切片：先读出覆盖的矩形区域，再按步长取出
+            row_range = range(self.height)[row] if isinstance(row, slice) else None
+            col_range = range(self.width)[col] if isinstance(col, slice) else None
+            if row_range is None:
+                row, _ = self.check_index(row, 0)
+                row_range = range(row, row + 1)
+            if col_range is None:
+                _, col = self.check_index(0, col)
+                col_range = range(col, col + 1)
+            if len(row_range) == 0 or len(col_range) == 0:
+                out = np.zeros((len(row_range), len(col_range)), dtype=np.uint8)
+            else:
+                row0, row1 = min(row_range[0], row_range[-1]), max(row_range[0], row_range[-1]) + 1
+                col0, col1 = min(col_range[0], col_range[-1]), max(col_range[0], col_range[-1]) + 1
+                out = self.window(row0, row1, col0, col1)[
+                    np.asarray(row_range) - row0][:, np.asarray(col_range) - col0]
+            if not isinstance(key[0], slice):
+                out = out[0]
+            elif not isinstance(key[1], slice):
+                out = out[:, 0]
+            return out
+        return self.lookup(row, col)
+
+    def __setitem__(self, key, value):
+        """修改单个格子，同时更新缓存中的瓦片和内存映射"""
+        row, col = self.check_index(*key)
+        tile_y, offset_y = divmod(row, self.tile_size)
+        tile_x, offset_x = divmod(col, self.tile_size)
+        self.tiles[tile_y, tile_x, offset_y, offset_x] = value
+        tile = self.cache.get((tile_y, tile_x))
+        if tile is not None:
+            tile[offset_y, offset_x] = value
+
+    def write_rows(self, row0, rows):
+        """
+        从第row0行开始写入整行数据（生成地图时按瓦片行写入），写回内存映射
+
+        Args:
+            row0: 起始行，必须是tile_size的整数倍
+            rows: 二维数组，形状为 (行数, width)，行数不超过tile_size
+        """
+        size = self.tile_size
+        tile_y = row0 // size
+        for tile_x in range(self.tiles_x):
+            part = rows[:, tile_x * size:(tile_x + 1) * size]
+            self.tiles[tile_y, tile_x, :part.shape[0], :part.shape[1]] = part
+            self.cache.pop((tile_y, tile_x), None)
+
+    def flush(self):
+        if isinstance(self.tiles, np.memmap):
+            self.tiles.flush()
+
+    def to_array(self):
+        """转换为稠密的二维数组（地图需能放入内存），直接读取文件，不经过LRU"""
+        size = self.tile_size
+        array = self.tiles.transpose(0, 2, 1, 3).reshape(self.tiles_y * size, self.tiles_x * size)
+        return np.array(array[:self.height, :self.width])
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.to_array()
+        return array if dtype is None else array.astype(dtype)
+
+    def overview(self, factor):
+        """
+        缩小factor倍的概览图，逐个瓦片读取（不经过LRU），内存只与结果大小有关
+
+        每个像素对应地图中 factor x factor 的一块，块中有墙壁即为1。
+        factor不超过tile_size时须能整除tile_size，超过时须是tile_size的整数倍
+        （块与瓦片边界对齐）。
+
+        Returns:
+            uint8数组，形状为 (ceil(height / factor), ceil(width / factor))
+        """
+        size = self.tile_size
+        if (factor <= size and size % factor) or (factor > size and factor % size):
+            raise ValueError(f"factor {factor} 与瓦片大小 {size} 不对齐")
+        out = np.zeros((-(-self.height // factor), -(-self.width // factor)), dtype=np.uint8)
+        for tile_y in range(self.tiles_y):
+            for tile_x in range(self.tiles_x):
+                tile = np.asarray(self.tiles[tile_y, tile_x])
+                if factor <= size:
+                    n = size // factor
+                    block = tile.reshape(n, factor, n, factor).max(axis=(1, 3))
+                    part = out[tile_y * n:(tile_y + 1) * n, tile_x * n:(tile_x + 1) * n]
+                    part[...] = block[:part.shape[0], :part.shape[1]]
+                else:
+                    k = factor // size
+                    out[tile_y // k, tile_x // k] |= tile.max()
+        return out
+
+    def obstacle_points(self):
+        """
+        墙壁格子的坐标，逐个瓦片读取（不经过LRU）
+
+        Returns:
+            ox, oy: 列坐标和行坐标数组，按行优先顺序排列
+        """
+        size = self.tile_size
+        ox, oy = [], []
+        for tile_y in range(self.tiles_y):
+            band = self.tiles[tile_y].transpose(1, 0, 2).reshape(size, self.tiles_x * size)
+            rows, cols = np.nonzero(band[:, :self.width] == 1)
+            ox.append(cols)
+            oy.append(rows + tile_y * size)
+        if not ox:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(ox), np.concatenate(oy)
@@ -1,12 +1,44 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.colors as colors
+import os
+from occupancy_grid import OccupancyGrid
+from tiled_map import TiledMap
+
+# 瓦片地图显示时的最大边长（像素），更大的地图按块缩小
+MAX_DISPLAY_SIZE = 4096
+
+def load_map_array(map_file, max_size=MAX_DISPLAY_SIZE):
+    """
+    加载地图为稠密数组：.npy直接加载，.npz按OccupancyGrid.save的格式读取并解压，
+    目录按TiledMap瓦片地图读取
+
+    瓦片地图边长超过max_size时逐个瓦片读取并缩小（每个像素表示一块格子，
+    块中有墙壁即为墙壁），不需要把整张地图读入内存
+    """
+    if os.path.isdir(map_file):
+        tiled = TiledMap(map_file)
+        longest = max(tiled.shape)
+        if longest <= max_size:
+            return tiled.to_array()
+        # 缩小倍数取与瓦片边界对齐的值：能整除瓦片边长，或是瓦片边长的整数倍
+        factor = -(-longest // max_size)
+        size = tiled.tile_size
+        if factor <= size:
+            factor = next(f for f in range(factor, size + 1) if size % f == 0)
+        else:
+            factor = -(-factor // size) * size
+        print(f"地图 {tiled.shape[0]} 行 x {tiled.shape[1]} 列，按 {factor}x{factor} 的块缩小显示")
+        return tiled.overview(factor)
+    if map_file.endswith('.npz'):
+        return OccupancyGrid.load(map_file).to_array()
+    return np.load(map_file)
 
 def load_and_visualize_map(npy_file):
     """加载npy文件并可视化地图"""
     
     # 加载numpy数组
-    map_array = np.load(npy_file)
+    map_array = load_map_array(npy_file)
     
     print(f"地图大小: {map_array.shape[0]} 行 x {map_array.shape[1]} 列")
     print(f"线段像素数: {np.sum(map_array == 1)}")
@@ -38,7 +70,7 @@ def save_visualization(npy_file, output_file='map_visualization.png', dpi=300):
     """加载地图并保存可视化图像"""
     
     # 加载numpy数组
-    map_array = np.load(npy_file)
+    map_array = load_map_array(npy_file)
     
     # 创建自定义颜色映射
     cmap = colors.ListedColormap(['white', 'black'])
@@ -71,7 +103,7 @@ def visualize_map_with_coordinates(npy_file):
     """带坐标信息的地图可视化"""
     
     # 加载numpy数组
-    map_array = np.load(npy_file)
+    map_array = load_map_array(npy_file)
     
     # 创建自定义颜色映射
     cmap = colors.ListedColormap(['white', 'black'])